@@ -0,0 +1,72 @@
+import time
+from multiprocessing.connection import wait
+
+BOOT_TIMEOUT = 30.0  # Longest a start waits on dependencies and readiness, however many workers there are
+
+# ----------------------------------------
+# Startup Orchestrator
+# ----------------------------------------
+def _dependency_state(dependency, waiting):
+    if dependency.ready.is_set():
+        return "ready"
+    if dependency in waiting or (dependency.pid is not None and dependency.is_alive()):
+        return "pending"
+    return "failed"  # Exited before it was ready, or was never going to start
+
+
+def start_processes(processes, timeout=BOOT_TIMEOUT, logger=None):
+    """Start every process as soon as the workers in its `depends_on` are ready.
+
+    Independent processes start at once, dependents start when the last of
+    their dependencies signals ready. Nothing polls: the wait wakes on a ready
+    signal or a process exit. A process whose dependency exits first is never
+    started. Returns once every started process is ready, or at the timeout.
+    """
+    start = time.monotonic()
+    deadline = start + timeout
+    waiting = list(processes)
+    started = []
+    while True:
+        for process in list(waiting):
+            states = {d.name: _dependency_state(d, waiting) for d in getattr(process, "depends_on", [])}
+            failed = [name for name, state in states.items() if state == "failed"]
+            if failed:
+                waiting.remove(process)
+                if logger is not None:
+                    logger.error(f"❌ Not starting {process.name}, {', '.join(failed)} failed to start")
+            elif all(state == "ready" for state in states.values()):
+                waiting.remove(process)
+                process.start()
+                started.append(process)
+
+        # Wait on whatever can still change: a dependency or a started process becoming ready, or exiting
+        watched = [p for p in started if not p.ready.is_set() and p.is_alive()]
+        watched += [d for p in waiting for d in p.depends_on if d.pid is not None and not d.ready.is_set()]
+        remaining = deadline - time.monotonic()
+        if not watched or remaining <= 0:
+            break
+        handles = {h for p in watched for h in (p.ready_signal, p.sentinel)}
+        wait(list(handles), timeout=remaining)
+
+    if logger is not None:
+        for process in waiting:
+            logger.error(f"❌ {process.name} not started, dependencies not ready after {timeout}s")
+        late = [p.name if p.is_alive() else f"{p.name} (exited)" for p in started if not p.ready.is_set()]
+        if late:
+            logger.warning(f"⚠️ Not ready after {time.monotonic() - start:.2f}s: {', '.join(late)}")
+    return started
+
+# ----------------------------------------
+# Boot Timeline
+# ----------------------------------------
+def boot_timeline(processes, since):
+    """[(seconds after `since`, worker name, milestone)] for every milestone reached, oldest first"""
+    events = []
+    for process in processes:
+        for milestone, at in process.milestones_reached().items():
+            events.append((round(at - since, 3), process.name, milestone))
+    return sorted(events)
+
+
+def format_timeline(events):
+    return "\n".join(f"  +{seconds:7.3f}s  {name} {milestone}" for seconds, name, milestone in events)
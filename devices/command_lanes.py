@@ -0,0 +1,228 @@
+import heapq
+import itertools
+import logging
+import threading
+from collections import Counter, deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+# ----------------------------------------
+# Concurrency Classes and Priorities
+# ----------------------------------------
+EXCLUSIVE = "exclusive"  # Runs alone, waits for every serialized and exclusive command
+SERIAL = "serial"        # One at a time per resource
+FREE = "free"            # Runs alongside anything, never waits
+
+# Lower runs first. Control commands skip the lane limit and use the reserved lane.
+PRIORITY_CONTROL = 0
+PRIORITY_HIGH = 5
+PRIORITY_NORMAL = 10
+
+Command_Policy = namedtuple("Command_Policy", ["concurrency", "resource", "priority"], defaults=(None, PRIORITY_NORMAL))
+
+# Unclassified commands share one lane, matching the old single-thread behaviour
+DEFAULT_POLICY = Command_Policy(SERIAL, "device")
+CONTROL_POLICY = Command_Policy(FREE, None, PRIORITY_CONTROL)
+
+# ----------------------------------------
+# Lane Gate
+# ----------------------------------------
+class _Lane_Gate:
+    """Admits commands according to their concurrency class.
+
+    Order within a resource is kept by Command_Lanes, which only submits a
+    serialized command once the one before it on its resource has finished.
+    """
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._exclusive = False
+        self._exclusive_waiting = 0
+        self._serial_running = 0
+
+    @contextmanager
+    def enter(self, policy):
+        if policy.concurrency == FREE:
+            yield
+            return
+
+        with self._cond:
+            if policy.concurrency == EXCLUSIVE:
+                self._exclusive_waiting += 1
+                self._cond.wait_for(lambda: not self._exclusive and self._serial_running == 0)
+                self._exclusive_waiting -= 1
+                self._exclusive = True
+            else:
+                self._cond.wait_for(lambda: not self._exclusive and not self._exclusive_waiting)
+                self._serial_running += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                if policy.concurrency == EXCLUSIVE:
+                    self._exclusive = False
+                else:
+                    self._serial_running -= 1
+                self._cond.notify_all()
+
+# ----------------------------------------
+# Command Lanes
+# ----------------------------------------
+class _Serial_Queue:
+    """One resource's queued commands, oldest first, and how many of each priority"""
+    __slots__ = ("entries", "priorities")
+
+    def __init__(self):
+        self.entries = deque()
+        self.priorities = Counter()
+
+    def append(self, entry):
+        self.entries.append(entry)
+        self.priorities[entry[0]] += 1
+
+    def popleft(self):
+        entry = self.entries.popleft()
+        self.priorities[entry[0]] -= 1
+        if not self.priorities[entry[0]]:
+            del self.priorities[entry[0]]
+        return entry
+
+    def rank(self):
+        """The best priority queued here, then the age of the oldest command"""
+        return min(self.priorities), self.entries[0][1]
+
+
+class Command_Lanes:
+    """Priority queue in front of a bounded thread pool.
+
+    Ordinary commands are only handed out while a lane is free, so anything
+    still queued can be overtaken by a higher-priority command of another
+    resource. Serialized commands keep their submission order per resource:
+    they queue in one FIFO each, and a command handed out while another of its
+    resource runs is chained behind it. A chained command gives its lane back
+    and later runs on the lane of the command ahead of it, so a burst on one
+    resource holds one lane, never all of them. Control commands are handed
+    out immediately and run on a reserved extra thread.
+    """
+    def __init__(self, max_lanes=4):
+        self.max_lanes = max_lanes
+        self._cond = threading.Condition()
+        self._heap = []  # Free and exclusive commands
+        self._serial = {}  # resource -> _Serial_Queue
+        self._chains = {}  # resource -> deque of (policy, fn, args) waiting for its running command
+        self._queued = 0
+        self._seq = itertools.count()
+        self._free = max_lanes
+        self._gate = _Lane_Gate()
+        self._executor = ThreadPoolExecutor(max_workers=max_lanes + 1, thread_name_prefix="command_lane")
+        self.closed = False
+
+    def put(self, policy, item):
+        with self._cond:
+            entry = (policy.priority, next(self._seq), policy, item)
+            if policy.concurrency == SERIAL:
+                queue = self._serial.get(policy.resource)
+                if queue is None:
+                    queue = self._serial[policy.resource] = _Serial_Queue()
+                queue.append(entry)
+            else:
+                heapq.heappush(self._heap, entry)
+            self._queued += 1
+            self._cond.notify()
+
+    def qsize(self):
+        return self._queued
+
+    def _next(self):
+        """The entry to hand out next and its resource (None for the heap), or None.
+
+        A resource competes with its oldest command at the best priority queued
+        for it: a queued stop moves its resource ahead of others, but never
+        ahead of the start it was sent after.
+        """
+        if self._heap and self._heap[0][0] <= PRIORITY_CONTROL:
+            return self._heap[0], None
+        best, best_rank, best_resource = None, None, None
+        if self._heap:
+            best, best_rank = self._heap[0], self._heap[0][:2]
+        for resource, queue in self._serial.items():
+            rank = queue.rank()
+            if best_rank is None or rank < best_rank:
+                best, best_rank, best_resource = queue.entries[0], rank, resource
+        return None if best is None else (best, best_resource)
+
+    def _runnable(self):
+        if self.closed:
+            return True
+        head = self._next()
+        return head is not None and (head[0][0] <= PRIORITY_CONTROL or self._free > 0)
+
+    def get(self, timeout=None):
+        """Block until a command can run, returns (policy, item) or None on timeout/close"""
+        with self._cond:
+            if not self._cond.wait_for(self._runnable, timeout) or self.closed:
+                return None
+            _, resource = self._next()
+            if resource is None:
+                priority, _, policy, item = heapq.heappop(self._heap)
+            else:
+                queue = self._serial[resource]
+                priority, _, policy, item = queue.popleft()
+                if not queue.entries:
+                    del self._serial[resource]
+            self._queued -= 1
+            if priority > PRIORITY_CONTROL:
+                self._free -= 1
+            return policy, item
+
+    def submit(self, policy, fn, *args):
+        """Run fn(*args) for a command from get(), after the earlier commands of its resource"""
+        if policy.concurrency == SERIAL:
+            with self._cond:
+                chain = self._chains.get(policy.resource)
+                if chain is not None:
+                    chain.append((policy, fn, args))
+                    if policy.priority > PRIORITY_CONTROL:
+                        self._free += 1  # It will run on the lane of the command it is chained behind
+                        self._cond.notify()
+                    return
+                self._chains[policy.resource] = deque()
+        self._executor.submit(self._run, policy, fn, args)
+
+    def _run(self, policy, fn, args):
+        """One command, then on this same thread and lane whatever got chained behind it on its resource"""
+        lane = policy  # The lane belongs to the first command, the chained ones gave theirs back
+        following = (policy, fn, args)
+        try:
+            while following is not None:
+                policy, fn, args = following
+                try:
+                    with self._gate.enter(policy):
+                        fn(*args)
+                except Exception:
+                    # The commands chained behind must still run, Device._run_command logs its own errors
+                    logging.getLogger(__name__).exception(f"Command lane task failed: {fn}")
+                following = self._chained(policy) if policy.concurrency == SERIAL else None
+        finally:
+            self.release(lane)
+
+    def _chained(self, policy):
+        """Next command chained on the resource, or None and the resource is idle again"""
+        with self._cond:
+            chain = self._chains[policy.resource]
+            if chain and not self.closed:  # Closing drops queued work, chained work too
+                return chain.popleft()
+            del self._chains[policy.resource]
+            return None
+
+    def release(self, policy):
+        """Hand back the lane taken by get(), for work that is dropped instead of submitted"""
+        if policy.priority > PRIORITY_CONTROL:
+            with self._cond:
+                self._free += 1
+                self._cond.notify()
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+        self._executor.shutdown(wait=False, cancel_futures=True)
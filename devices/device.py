@@ -2,17 +2,32 @@ import time
 import uuid
 import socket
 from pathlib import Path
-import json
 import zenoh
 import threading
+import logging
 import os
-import signal
+from types import MappingProxyType
 
 from .workers import Health_Monitor, Config_Controller
 from utils.setup_logger import setup_logger
-
-import queue
-from multiprocessing import Manager, Lock, Value
+from utils.command_stats import Command_Stats, LATENCY_BUCKETS_MS
+from utils.command_protocol import (
+    ACCEPTED, REJECTED, COMPLETED, FAILED,
+    new_correlation_id, make_reply, to_payload, encode, decode_command,
+)
+from utils.codec import is_binary
+from utils.config_store import Config_Store
+from utils.file_index import File_Index
+from .reply_batcher import Reply_Batcher
+from .health_block import Health_Block, MAX_SLOTS
+from .health_history import Health_History
+from .metrics import Shared_Metrics, Log_Counter
+from .shutdown import STOP_DEADLINE, stop_processes
+from .boot import BOOT_TIMEOUT, start_processes, boot_timeline, format_timeline
+from .worker_context import Worker_Context
+from .command_lanes import Command_Lanes, Command_Policy, DEFAULT_POLICY, CONTROL_POLICY, SERIAL, EXCLUSIVE
+
+from multiprocessing import Manager, Value
 
 # ----------------------------------------
 # Config and Paths
@@ -20,35 +35,56 @@ from multiprocessing import Manager, Lock, Value
 
 CONFIG_PATH = Path("device.cfg")
 
+# Idle wake-up for the command thread, only needed to notice a stop flag set by another process
+COMMAND_IDLE_TIMEOUT = 1.0
+# Concurrent command lanes, control commands get one extra reserved lane
+COMMAND_LANES = 4
+# Results to the same requester inside this window go out as one message,
+# ACCEPTED and REJECTED are never held back
+ACK_BATCH_WINDOW = 0.02
+
 # ----------------------------------------
 # Base Device Class
 # ----------------------------------------
 
 class Device():
     def __init__(self, logger = None, DEBUG=False):
+        # device.cfg is parsed once here and shared with every worker process
+        self.config = Config_Store(CONFIG_PATH)
         self.device_id = self.get_device_id()
-        self.group_id = "default_group"
+        self.group_id = self.config.group_id
 
         if logger is None:
             self.logger = setup_logger(self.device_id)
         else:
             self.logger = logger
+        self.config.logger = self.logger
+        if self.device_id != self.config.device_id:
+            self.logger.warning("device.cfg has no device_id, using temporary device_id.")
 
         self.DEBUG = DEBUG  # Set to True for verbose logging during development
         self.boot_time = time.time()
         self.uptime = lambda : time.time() - self.boot_time
 
         self.ip = self.check_ip()
+        self.wire_format = self.config.wire_format  # "json" (default) or "binary"
+        self.file_index = File_Index(logger=self.logger)  # Trials listing, kept current by the Config API
 
         # Control and health values
         self.is_stopped = Value('b', False)  # Shared flag to signal processes to stop
+        self.health = Health_Block()  # Allocated before any worker forks
+        self.health_slot = self.health.slot("device")
+        self.health_slot.field("pid", int, os.getpid())
+        self.health_history = Health_History(self.health)  # Written by the Config API's metrics sampler
+        self.metrics = Shared_Metrics()  # Served by the Config API at /metrics
+        self._register_metrics()
+        self.context = Worker_Context(self)  # All a worker process gets of this device
+
+        # Shared state lives in the fixed layout blocks above, a Manager only starts if shared_dict() is used
+        self._manager = None
 
-        # Shared memory manager for inter-process communication
-        self.manager = Manager()
-        self.lock = Lock()
-        self.shared_data = self.manager.dict({
-            'device_name': "Device Template",
-        })
+        self.command_lanes = Command_Lanes(max_lanes=COMMAND_LANES)
+        self.command_stats = Command_Stats()
 
         # Zenoh
         config = zenoh.Config()
@@ -59,15 +95,15 @@ class Device():
             self.session.declare_subscriber(f"{self.device_id}/COMMAND", self.listener)
         ]
 
+        # Replies only go to the requester (reply_to) or this device's own ACK topic,
+        # never to a shared global/group topic every node is subscribed to.
+        self.ack_key = f"{self.device_id}/ACK"
         self.publishers = [
-            self.session.declare_publisher("global/ACK"),
-            self.session.declare_publisher(f"{self.group_id}/ACK"),
-            self.session.declare_publisher(f"{self.device_id}/ACK")
+            self.session.declare_publisher(self.ack_key)
         ]
-
-        self.message_queue = queue.Queue()
-        self.worker_thread = threading.Thread(target=self._handle_command, daemon=True)
-        self.worker_thread.start()
+        self.ack_publisher = self.publishers[0]
+        self.reply_batcher = Reply_Batcher(self._send_reply, window=ACK_BATCH_WINDOW, logger=self.logger)
+        self.ignored_reply_keys = set()  # Our own outgoing requests echoed back on global/group topics
 
         # Required base processes
         self._processes = [
@@ -79,14 +115,50 @@ class Device():
         self._commands = {
             "stop": lambda **properties: self.stop(**properties),
             "start": lambda **properties: self.start(**properties),
-            "status": lambda **properties: self.logger.info(f"Device status: {self.name} (ID: {self.device_id}, IP: {self.ip})"),
+            "status": lambda **properties: self.get_status(),
             "rename": lambda **properties: setattr(self, 'name', properties.get('new_name', self.name)),
             "health": lambda **properties: self.get_health_values(**properties),
         }
+        self._command_policies = {
+            "stop": CONTROL_POLICY,
+            "status": CONTROL_POLICY,
+            "health": CONTROL_POLICY,
+            "start": Command_Policy(EXCLUSIVE),
+            "rename": Command_Policy(SERIAL, "config"),
+        }
+        self._compile_commands()
+
+        self.worker_thread = threading.Thread(target=self._handle_command, daemon=True)
+        self.worker_thread.start()
 
     def __setup__(self):
         self.logger.info("Setting up device...")
 
+    def _register_metrics(self):
+        """Device-wide metric families, every label set must exist before the workers fork"""
+        buckets = [ms / 1000 for ms in LATENCY_BUCKETS_MS]
+        self.metric_queue_depth = self.metrics.gauge(
+            "herd_command_queue_depth", "Commands waiting for a free lane")
+        self.metric_commands = self.metrics.counter(
+            "herd_commands_total", "Commands by final status", ["status"])
+        for status in (REJECTED, COMPLETED, FAILED):
+            self.metric_commands.labels(status=status)
+        self.metric_queue_wait = self.metrics.histogram(
+            "herd_command_queue_wait_seconds", "Time commands spent queued", buckets)
+        self.metric_execution = self.metrics.histogram(
+            "herd_command_execution_seconds", "Time command handlers ran", buckets)
+        self.metrics.counter("herd_worker_starts_total", "Worker process starts, restarts are starts past the first", ["worker"])
+        self.metrics.counter("herd_upload_bytes_total", "Bytes uploaded, rate() gives bytes/sec")
+        self.metrics.counter("herd_upload_retries_total", "Upload chunk retries")
+        self.metrics.counter("herd_upload_failures_total", "Uploads that gave up")
+
+        # Every logger propagates to root, so one handler there sees all log records. One row per
+        # health slot: each process counts into its own, workers install theirs when they unpickle
+        log_records = self.metrics.sharded_counter("herd_log_records_total", "Log records by level", "level",
+                                                   Log_Counter.LEVELS, MAX_SLOTS)
+        if not any(isinstance(h, Log_Counter) for h in logging.getLogger().handlers):
+            logging.getLogger().addHandler(Log_Counter(log_records, self.health_slot.index))
+
     @property
     def process_list(self):
         processes = getattr(self, "processes", [])
@@ -95,37 +167,48 @@ class Device():
         return self._processes + processes
 
     def start(self):
+        """Start the workers in dependency order, returns once they are all ready"""
         self.logger.info(f"\n\nStarting {len(self.process_list)} processes...")
-        for process in self.process_list:
-            process.start()
-            time.sleep(0.1)  # Small delay to allow processes to initialize
-        self.logger.info("Device started.")
+        start_processes(self.process_list, BOOT_TIMEOUT, self.logger)
+        self.logger.info(f"Device started.\n⏱️ Boot timeline:\n{format_timeline(self.boot_timeline())}")
+
+    def boot_timeline(self):
+        """[(seconds since the device was created, worker, milestone)]"""
+        return boot_timeline(self.process_list, self.boot_time)
 
     def stop(self):
         self.is_stopped.value = True  # Signal processes to stop
+        self.command_lanes.close()  # Wake the command thread so it can exit
         self.logger.info(f"Stop Flag Set: {self.is_stopped.value}")
 
         # Undeclare subscribers and clean up.
         for sub in self.subscribers:
             sub.undeclare()
         self.subscribers.clear()
+        self.reply_batcher.flush()
+        if not self.config.flush():  # Don't lose a rename still waiting for its coalesced write
+            self.logger.warning(f"⚠️ Config keys never written to {self.config.path}: {', '.join(self.config.pending())}")
         self.session.close()
         self.logger.info("Undeclared all subscribers and closed Zenoh session.")
 
-        for process in self.process_list:
-            self.is_stopped.value = True  # Signal processes to stop
-            process.stop()
-            process.join(timeout=1)  # Wait for process to finish
+        # Every worker already saw is_stopped, wait for all of them under one deadline
+        report = stop_processes(self.process_list, STOP_DEADLINE, self.logger)
+        if self._manager is not None:
+            self._manager.shutdown()  # After the workers, they may still hold proxies
+        self.logger.info("Device stopped.")
+        return report
 
-        time.sleep(1)  # Allow some time for processes to stop gracefully
-        for process in self.process_list:
-            if process.is_alive():
-                self.logger.info(f"Process {process.name} is still running.")
-                os.kill(process.pid, signal.SIGTERM)
-            else:
-                self.logger.info(f"Process {process.name} has stopped.")
+    def shared_dict(self, initial=None):
+        """A dict shared with the workers, for state with no fixed layout.
 
-        self.logger.info("Device stopped.")
+        Opt-in: the first call starts a Manager server process, and every access
+        is an IPC round trip. Flags and numbers belong in the health block
+        instead. Create it before the workers that use it start.
+        """
+        if self._manager is None:
+            self._manager = Manager()
+            self.logger.info("Started a Manager for shared dicts.")
+        return self._manager.dict(initial or {})
 
     # Logistics and Utility Methods
 
@@ -142,135 +225,226 @@ class Device():
         return ip
     
     def get_device_id(self):
-        if CONFIG_PATH.exists():
-            try:
-                with CONFIG_PATH.open("r") as f:
-                    data = json.load(f)
-                    return data.get("device_id", str(uuid.uuid4()))
-            except Exception as e:
-                self.logger.warning(f"Failed to read device.cfg for device_id: {e}")
-                return str(uuid.uuid4())
-        else:
-            self.logger.warning("device.cfg not found, using temporary device_id.")
-            return str(uuid.uuid4())
+        return self.config.device_id or str(uuid.uuid4())
+
+    def get_status(self):
+        status = {
+            "device_id": self.device_id,
+            "name": self.name,
+            "ip": self.ip,
+            "uptime": round(self.uptime(), 1),
+        }
+        self.logger.info(f"Device status: {status['name']} (ID: {self.device_id}, IP: {self.ip})")
+        return status
 
     # Health Monitoring
 
     def get_health_values(self):
+        """One consistent snapshot of the shared health block, no per-value locks"""
+        slots = self.health.snapshot()
         health_values = {
-            k: v
-            for k, v in vars(self).items()
-            if k.startswith('_health_')
+            "device": slots.pop("device"),
+            "workers": {},
+            "uptime": round(self.uptime(), 1),
         }
-        self.logger.info(f"Health Values:")
-        for key, value in health_values.items():
-            # Handle Synchronized wrapper types (multiprocessing.Value, etc.)
-            if hasattr(value, "value"):
-                self.logger.info(f"{key}: {value.value}")
-            else:
-                self.logger.info(f"{key}: {value}")
-
         for process in self.process_list:
-            self.logger.info(f"  {process} Alive: {process.is_alive()}")  # Ensure process is running
-            try:
-                process.get_health_values()  # Call health method if available
-            except AttributeError:
-                self.logger.warning(f"⚠️ Process {process} does not have health check implemented.")
+            worker = slots.get(process.name, {})
+            worker["alive"] = process.is_alive()
+            health_values["workers"][process.name] = worker
+        self.logger.info(f"Health Values: {health_values['device']}")
+        for name, worker in health_values["workers"].items():
+            self.logger.info(f"  {name}: {worker}")
+
+        command_latency = self.command_stats.snapshot()
+        for command, stats in command_latency.items():
+            wait, execution = stats["queue_wait"], stats["execution"]
+            self.logger.info(
+                f"Command {command}: n={execution['count']} "
+                f"wait p50/p99={wait['p50_ms']}/{wait['p99_ms']} ms, "
+                f"exec p50/p99={execution['p50_ms']}/{execution['p99_ms']} ms"
+            )
+        health_values["command_latency"] = command_latency
+        health_values["boot_timeline"] = self.boot_timeline()
         return health_values
 
     # Device Lifecycle
 
     @property
     def name(self):
-        """Get name from device.cfg JSON file"""
-        with self.lock:
-            try:
-                if CONFIG_PATH.exists():
-                    with CONFIG_PATH.open("r") as f:
-                        data = json.load(f)
-                        name = str(data.get("device_name", "unknown"))
-                        return name
-                else:
-                    return "unknown"
-            except Exception as e:
-                self.logger.warning(f"Failed to get device name from device.cfg: {e}")
-                return "unknown"
-        
+        """Get name from the in-memory device.cfg store"""
+        return self.config.device_name
+
     @name.setter
     def name(self, value):
-        """Safely update only the device_name property in device.cfg JSON file"""
-        with self.lock:
-            data = {}
-            # Read existing config if it exists
-            if CONFIG_PATH.exists():
-                try:
-                    with CONFIG_PATH.open("r") as f:
-                        data = json.load(f)
-                except Exception as e:
-                    self.logger.warning(f"Failed to read device.cfg: {e}")
-            old_name = data.get('device_name', 'unknown')
-            # Only update the device_name property
-            if data.get('device_name') != value:
-                data['device_name'] = value
-                try:
-                    # Write back the updated config (preserving other keys)
-                    with CONFIG_PATH.open("w") as f:
-                        json.dump(data, f, indent=2)
-                    self.logger.info(f"SETTER FIRED: Device renamed from '{old_name}' to '{value}'")
-                except Exception as e:
-                    self.logger.warning(f"Failed to write device.cfg: {e}")
-                self._on_name_changed(old_name, value)
-            else:
-                self.logger.info("Device name unchanged; no write performed.")
-    
+        """Update only the device_name key, the write to device.cfg is coalesced and atomic"""
+        old_name = self.config.device_name
+        if old_name == value:
+            self.logger.info("Device name unchanged; no write performed.")
+            return
+        self.config.update(device_name=value)
+        self.logger.info(f"SETTER FIRED: Device renamed from '{old_name}' to '{value}'")
+        self._on_name_changed(old_name, value)
+
     def _on_name_changed(self, old_name, new_name):
         """Called whenever name changes"""
         if self.DEBUG:
             self.logger.info(f"Name change event: {old_name} -> {new_name}")
 
     # Command Lifecycle
+    @property
+    def commands(self):
+        """Child-defined command handlers, merged after the base commands"""
+        return self.__dict__.get("_child_commands", {})
+
+    @commands.setter
+    def commands(self, value):
+        if not isinstance(value, dict):
+            raise TypeError("Child must define `commands` as a dict.")
+        self._child_commands = dict(value)
+        self._invalidate_command_handlers()
+
+    @property
+    def command_policies(self):
+        """Child-defined Command_Policy per command, unlisted commands use DEFAULT_POLICY"""
+        return self.__dict__.get("_child_policies", {})
+
+    @command_policies.setter
+    def command_policies(self, value):
+        if not isinstance(value, dict):
+            raise TypeError("Child must define `command_policies` as a dict.")
+        self._child_policies = dict(value)
+        self._invalidate_command_handlers()
+
+    def register_command(self, command, handler, policy=None):
+        """Add or replace a child command handler"""
+        self._child_commands = {**self.commands, command: handler}
+        if policy is not None:
+            self._child_policies = {**self.command_policies, command: policy}
+        self._invalidate_command_handlers()
+
+    def remove_command(self, command):
+        """Remove a child command handler, base commands cannot be removed"""
+        if command in self.commands:
+            self._child_commands = {k: v for k, v in self.commands.items() if k != command}
+            self._child_policies = {k: v for k, v in self.command_policies.items() if k != command}
+            self._invalidate_command_handlers()
+
     @property
     def command_handlers(self):
-        commands = getattr(self, "commands", {})
-        if not isinstance(commands, dict):
-            raise TypeError("Child must define `command_handlers` as a dict.")
-        combined = self._commands.copy()
-        for k, v in commands.items():
+        """Compiled, read-only command table, rebuilt only after a handler change"""
+        if self._command_handlers is None:
+            self._compile_commands()
+        return self._command_handlers
+
+    def command_policy(self, command):
+        if self._command_handlers is None:
+            self._compile_commands()
+        return self._command_policy_table.get(command, DEFAULT_POLICY)
+
+    def _invalidate_command_handlers(self):
+        self._command_handlers = None
+
+    def _compile_commands(self):
+        combined = dict(getattr(self, "_commands", {}))
+        for k, v in self.commands.items():
             if k not in combined:
                 combined[k] = v
             else:
                 self.logger.warning(f"Duplicate command found: {k} cannot ovveride")
-        return combined
+        policies = {**self.command_policies, **getattr(self, "_command_policies", {})}
+        self._command_policy_table = MappingProxyType(policies)
+        self._command_handlers = MappingProxyType(combined)
 
     def _handle_command(self):
         while not self.is_stopped.value:
-            if not self.message_queue.empty():
-                self.logger.info("Processing command...")
-                command, properties = self.message_queue.get()
-                self.logger.info(f"Received command: {command}, properties: {properties}")
-                handler = self.command_handlers.get(command)
-                if handler:
-                    try:
-                        self.logger.info(f"Executing handler for command: {command}")
-                        if properties is None:
-                            properties = {}
-                        handler(**properties)
-                    except Exception as e:
-                        self.logger.error(f"Error occurred while executing command '{command}': {e}")
-                else:
-                    self.logger.warning(f"No handler found for command: {command}")
-            else:
-                time.sleep(0.1)
+            entry = self.command_lanes.get(timeout=COMMAND_IDLE_TIMEOUT)
+            if self.command_lanes.closed:  # Woken by stop()
+                break
+            if entry is None:
+                continue
+
+            policy, (command, properties, enqueued_at, route) = entry
+            self.metric_queue_depth.set(self.command_lanes.qsize())
+            self.logger.info(f"Received command: {command}, properties: {properties}")
+            handler = self.command_handlers.get(command)
+            if handler is None:
+                self.logger.warning(f"No handler found for command: {command}")
+                self.command_lanes.release(policy)
+                continue
+            try:
+                self.command_lanes.submit(policy, self._run_command, command, handler, properties, enqueued_at, route)
+            except RuntimeError:
+                break  # Lanes shut down underneath us
 
-    def put_command(self, command, properties=None):
-        self.message_queue.put((command, properties))
+    def _run_command(self, command, handler, properties, enqueued_at, route=None):
+        started_at = time.monotonic()
+        try:
+            self.logger.info(f"Executing handler for command: {command}")
+            result = handler(**(properties or {}))
+            status, fields = COMPLETED, {"result": to_payload(result)}
+        except Exception as e:
+            self.logger.error(f"Error occurred while executing command '{command}': {e}")
+            status, fields = FAILED, {"error": str(e)}
+        finished_at = time.monotonic()
+        self.command_stats.record(command, started_at - enqueued_at, finished_at - started_at)
+        self.metric_queue_wait.observe(started_at - enqueued_at)
+        self.metric_execution.observe(finished_at - started_at)
+        self.metric_commands.labels(status=status).inc()
+
+        if route is not None:
+            correlation_id, reply_to, binary = route
+            self._reply(make_reply(
+                status, correlation_id, self.device_id, command,
+                queue_ms=round((started_at - enqueued_at) * 1000, 3),
+                exec_ms=round((finished_at - started_at) * 1000, 3),
+                **fields,
+            ), reply_to, binary)
+
+    def put_command(self, command, properties=None, correlation_id=None, reply_to=None, binary=False):
+        """Queue a command, a correlation_id makes the device reply when it completes"""
+        route = (correlation_id, reply_to, binary) if correlation_id is not None else None
+        self.command_lanes.put(self.command_policy(command), (command, properties, time.monotonic(), route))
+        self.metric_queue_depth.set(self.command_lanes.qsize())
         self.logger.info(f"Message sent: {command}, {properties}")
 
+    def _reply(self, message, reply_to=None, binary=False, immediate=False):
+        key = (reply_to or self.ack_key, binary)
+        if immediate:
+            self.reply_batcher.send_now(key, message)
+        else:
+            self.reply_batcher.add(key, message)
+
+    def _send_reply(self, key, message):
+        # Replies use the request's format, so JSON-only tools keep working
+        destination, binary = key
+        if destination == self.ack_key:
+            self.ack_publisher.put(encode(message, binary))
+        else:
+            self.session.put(destination, encode(message, binary))
+
     def listener(self, sample):
-        payload = bytes(sample.payload).decode("utf-8")
-        #self.logger.info(f"Received message: {payload}")
-        json_data = json.loads(payload)
-        self.message_queue.put((json_data.get("command"), json_data.get("properties")))
+        payload = bytes(sample.payload)
+        binary = is_binary(payload)
+        try:
+            json_data = decode_command(payload)
+        except ValueError as e:  # Codec_Error included: malformed, or a health/IFF/reply payload
+            self.logger.warning(f"Dropping command payload: {e}")
+            return
+        command = json_data.get("command")
+        correlation_id = json_data.get("correlation_id") or new_correlation_id()
+        reply_to = json_data.get("reply_to")
+        if reply_to in self.ignored_reply_keys:
+            return
         self.logger.info(f"Message received: {json_data}")
-        self.publishers[0].put("ACK")
 
+        if command not in self.command_handlers:
+            self.logger.warning(f"No handler found for command: {command}")
+            self.metric_commands.labels(status=REJECTED).inc()
+            self._reply(make_reply(REJECTED, correlation_id, self.device_id, command, error="unknown command"),
+                        reply_to, binary, immediate=True)
+            return
+
+        # Accept before queueing so a fast handler can't complete ahead of it
+        self._reply(make_reply(ACCEPTED, correlation_id, self.device_id, command), reply_to, binary, immediate=True)
+        self.put_command(command, json_data.get("properties"), correlation_id=correlation_id,
+                         reply_to=reply_to, binary=binary)
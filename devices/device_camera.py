@@ -1,10 +1,12 @@
 from datetime import datetime
 from .device import Device
+from .command_lanes import Command_Policy, SERIAL, PRIORITY_HIGH
+from .shutdown import STOP_DEADLINE, ESCALATION_GRACE, stop_processes
+from .boot import BOOT_TIMEOUT, start_processes
 from .workers import Camera_Controller
 from .workers import Camera_Recorder
 from .workers import Camera_RTPS
 
-from multiprocessing import Value
 import time
 
 # -----------------------------------------------------------------------
@@ -18,11 +20,11 @@ class Camera(Device):
         self.recorders = []
 
         # Health Flags
-        self._health_camera_is_ready = Value('b', False)
-        self._health_in_trial = Value('b', False)
-        self._health_is_passive = Value('b', False)
-        self._health_is_recording = Value('b', False)
-        self._health_is_streaming = Value('b', False)
+        self._health_camera_is_ready = self.health_slot.field("camera_is_ready", bool, False)
+        self._health_in_trial = self.health_slot.field("in_trial", bool, False)
+        self._health_is_passive = self.health_slot.field("is_passive", bool, False)
+        self._health_is_recording = self.health_slot.field("is_recording", bool, False)
+        self._health_is_streaming = self.health_slot.field("is_streaming", bool, False)
 
         # Multi Camera Support
         # TODO need to add discovery for multiple cameras, manual for now
@@ -34,13 +36,18 @@ class Camera(Device):
             else:
                 raise ValueError(f"cameras must be a list of integers, got: {cameras}")
 
+        self._register_camera_metrics()
+
         # Processes
         # TODO Need to include LETHAL flag for critical processes that fail to start
         self.processes = []
+        self.controllers = {}  # camera -> Camera_Controller, whose SHM socket the stream and recorders read
 
         for camera in self.cameras:
             camera_worker = Camera_Controller(self, f"Camera_Controller_{camera}", DEBUG=self.DEBUG, camera_device=camera, LETHAL=True)
             rtps_worker = Camera_RTPS(self, f"Camera_RTPS_{camera}", DEBUG=self.DEBUG, camera_device=camera)
+            rtps_worker.depends_on.append(camera_worker)
+            self.controllers[camera] = camera_worker
             self.processes.append(camera_worker)
             self.processes.append(rtps_worker)
 
@@ -51,9 +58,62 @@ class Camera(Device):
             "stop_trial": lambda **properties: self.stop_trial(),
         }
 
+        # Recorder commands run one at a time in the order sent, a queued stop moves them ahead of other resources
+        self.command_policies = {
+            "start_recorder": Command_Policy(SERIAL, "recorder"),
+            "stop_recorder": Command_Policy(SERIAL, "recorder", PRIORITY_HIGH),
+            "start_trial": Command_Policy(SERIAL, "recorder"),
+            "stop_trial": Command_Policy(SERIAL, "recorder", PRIORITY_HIGH),
+        }
+
     def __setup__(self):
         self.logger.info("Setting up device...")
 
+    def start(self):
+        super().start()
+        for camera, milestones in self.camera_boot_times().items():
+            first_frame, rtsp_ready = milestones["first_frame"], milestones["rtsp_ready"]
+            self.logger.info(
+                f"⏱️ Camera {camera}: first frame "
+                f"{'pending' if first_frame is None else f'after {first_frame:.2f}s'}, RTSP "
+                f"{'not ready' if rtsp_ready is None else f'ready after {rtsp_ready:.2f}s'}"
+            )
+
+    def camera_boot_times(self):
+        """{camera: {"first_frame", "rtsp_ready"}} in seconds since the device was created, None until reached"""
+        times = {camera: {"first_frame": None, "rtsp_ready": None} for camera in self.cameras}
+        for seconds, name, milestone in self.boot_timeline():
+            for camera in self.cameras:
+                if (name, milestone) == (f"Camera_Controller_{camera}", "first_frame"):
+                    times[camera]["first_frame"] = seconds
+                elif (name, milestone) == (f"Camera_RTPS_{camera}", "ready"):
+                    times[camera]["rtsp_ready"] = seconds
+        return times
+
+    def _register_camera_metrics(self):
+        """Per-camera series, plus the recorder slots so other processes can see recorders"""
+        frames = self.metrics.counter("herd_camera_frames_total", "Frames per camera and pipeline stage", ["camera", "stage"])
+        rtsp_clients = self.metrics.gauge("herd_rtsp_clients", "Connected RTSP clients", ["camera"])
+        recording_bytes = self.metrics.counter("herd_recording_bytes_total", "Bytes written to recordings", ["camera"])
+        starts = self.metrics.families["herd_worker_starts_total"]
+
+        self.camera_metrics = {}
+        for camera in self.cameras:
+            recorder_name = f"Camera_Recorder_{camera}"
+            recorder_slot = self.health.slot(recorder_name)
+            recorder_slot.field("status")
+            recorder_slot.field("pid")
+            recorder_slot.field("started_at", float, 0.0)  # Boot milestones, see Worker.milestone
+            recorder_slot.field("ready_at", float, 0.0)
+            starts.labels(worker=recorder_name)
+            self.camera_metrics[camera] = {
+                "captured": frames.labels(camera=camera, stage="captured"),
+                "encoded": frames.labels(camera=camera, stage="encoded"),
+                "dropped": frames.labels(camera=camera, stage="dropped"),
+                "rtsp_clients": rtsp_clients.labels(camera=camera),
+                "recording_bytes": recording_bytes.labels(camera=camera),
+            }
+
 # -----------------------------------------------------------------------
 # Device Specific Methods
 # -----------------------------------------------------------------------
@@ -66,11 +126,11 @@ class Camera(Device):
             for camera in self.cameras:
                 self.logger.info(f"Creating recorder for camera {camera}...")
                 recorder = Camera_Recorder(self, f"Camera_Recorder_{camera}", camera_device=camera, file_base=file_base)
+                recorder.depends_on.append(self.controllers[camera])
                 self.processes.append(recorder)
                 self.recorders.append(recorder)
-            for recorder in self.recorders:
-                recorder.start()
-            self.logger.info(f"{len(self.recorders)} started successfully.")
+            started = start_processes(self.recorders, BOOT_TIMEOUT, self.logger)
+            self.logger.info(f"{len(started)} of {len(self.recorders)} recorder(s) started.")
 
         else:
             self.logger.warning("Recorder is already running.")
@@ -80,45 +140,30 @@ class Camera(Device):
             self._health_is_recording.value = False
             self.logger.info("Stopping recorder...")
 
+            # Every recorder finishes its file at the same time, uploads then carry on in the background
             for recorder in self.recorders:
                 recorder.stand_down()
 
-            for recorder in self.recorders:
-                self.logger.info("Stopping recorder process...")
-                try:
-                    # First try graceful stop
-                    returned = recorder.stop()
-                    self.logger.info(f"Manager: Recorder stopped gracefully: {returned}")
-                    
-                    if not recorder.is_alive():
-                        self.logger.info("Recorder process is confirmed dead.")
-                    else:
-                        self.logger.warning("Recorder process is still alive after stop attempt.")
-                    
-                    # Wait for process to terminate gracefully
-                    recorder.join(timeout=0.5)
-                    
-                    # If still alive, force terminate
-                    if recorder.is_alive():
-                        self.logger.warning("Recorder didn't stop gracefully, terminating...")
-                        recorder.terminate()
-                        recorder.join(timeout=0.5)
-                        
-                    # Final check - kill if necessary
-                    if recorder.is_alive():
-                        self.logger.error("Force killing recorder process...")
-                        recorder.kill()
-                        recorder.join()
-                    else:
-                        self.logger.info("✅ Its dead Jim... ✅")
-                        
-                except Exception as e:
-                    self.logger.error(f"Error stopping recorder: {e}")
+            # Only recorders that are running can still finish a file, the rest would cost the whole deadline
+            running = [recorder for recorder in self.recorders if recorder.pid is not None and recorder.is_alive()]
+            lost = [recorder.name for recorder in self.recorders
+                    if recorder not in running and not recorder.finalized.is_set()]
+            if lost:
+                self.logger.warning(f"⚠️ Recorder(s) never started or exited without a file: {', '.join(lost)}")
+
+            deadline = time.monotonic() + STOP_DEADLINE
+            late = [recorder for recorder in running
+                    if not recorder.finalized.wait(max(0.0, deadline - time.monotonic()))]
+            if late:
+                self.logger.error(f"{len(late)} recorder(s) did not finish their file in {STOP_DEADLINE}s, stopping them.")
+                stop_processes(late, 3 * ESCALATION_GRACE, self.logger)
+            elif not lost:
+                self.logger.info("✅ All recordings closed.")
 
             # Clear the recorders list
             self.recorders.clear()
             
-            # Remove stopped recorders from processes list
+            # Remove finished recorders from processes list, the ones still uploading stay until they exit
             self.processes = [p for p in self.processes if not isinstance(p, Camera_Recorder) or p.is_alive()]
         
         else:
@@ -127,17 +172,7 @@ class Camera(Device):
     def cleanup_all_processes(self):
         """Clean up all processes including recorders"""
         self.stop_recorder()
-        
-        for process in self.processes:
-            if process.is_alive():
-                try:
-                    process.stop()
-                    process.join(timeout=5)
-                    if process.is_alive():
-                        process.terminate()
-                        process.join()
-                except Exception as e:
-                    self.logger.error(f"Error cleaning up process {process.name}: {e}")
+        stop_processes(self.processes, STOP_DEADLINE, self.logger)
 
 # -----------------------------------------------------------------------
 # Use Specific Methods
@@ -1,6 +1,8 @@
 import os
 from datetime import datetime
 from .device import Device
+from .command_lanes import Command_Policy, FREE
+from utils.command_client import Command_Client, summarize_replies
 
 from multiprocessing import Value
 import time
@@ -10,24 +12,44 @@ import time
 # # ----------------------------------------
 
 class Master_Server(Device):
-    def __init__(self, logger=None, DEBUG=False):
+    def __init__(self, logger=None, DEBUG=False, summary_ack="counts"):
         super().__init__(logger=logger, DEBUG=DEBUG)
 
         self.port = 8088
 
         # Control flags
+        self.summary_ack = summary_ack  # "counts" or "full", see summarize_replies
 
         # Health Flags
 
+        # Fleet replies come back on the master's own key, the controller only sees the summary
+        self.fleet_client = Command_Client(session=self.session, reply_to=f"{self.device_id}/FLEET",
+                                           binary=self.wire_format == "binary")
+        self.ignored_reply_keys.add(self.fleet_client.reply_to)
+
         # TODO Need to include LETHAL flag for critical processes that fail to start
         self.processes = []
 
-        self.commands = {}
+        self.commands = {
+            "fleet": lambda **properties: self.fleet_command(**properties),
+        }
+        # Only waits on the network, so it must not hold up other lanes
+        self.command_policies = {
+            "fleet": Command_Policy(FREE),
+        }
 
     def __setup__(self):
         pass
 
     # Device Specific Methods
+    def fleet_command(self, command, properties=None, target="global", expected=None, timeout=2.0, summary=None):
+        """Forward a command to the fleet and answer the requester with one aggregated reply"""
+        self.logger.info(f"Fleet command: {command} -> {target}")
+        replies = self.fleet_client.request(command, properties, target=target, expected=expected, timeout=timeout)
+        result = summarize_replies(replies, mode=summary or self.summary_ack)
+        result.update({"command": command, "target": target})
+        self.logger.info(f"Fleet command {command}: {result['statuses']} from {result['devices']} device(s)")
+        return result
 
     ### Use Specific Methods for Camera Device
     # Trial Camera
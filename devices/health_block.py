@@ -0,0 +1,124 @@
+import ctypes
+import time
+from multiprocessing import Lock
+from multiprocessing.sharedctypes import RawArray
+
+MAX_SLOTS = 16  # Device + one per worker
+MAX_FIELDS = 16  # Health values per slot
+READ_TIMEOUT = 0.1  # A writer killed mid-write must not hang readers forever
+
+# ----------------------------------------
+# Shared Layout
+# ----------------------------------------
+# One RawArray of fixed size slots, allocated before the workers fork.
+# Each slot is a seqlock: writers make `seq` odd while they write, readers
+# retry until they see the same even `seq` before and after copying values.
+# Values are stored as doubles and cast back to the field's type on read.
+
+class _Slot(ctypes.Structure):
+    _fields_ = [
+        ("seq", ctypes.c_uint64),
+        ("values", ctypes.c_double * MAX_FIELDS),
+    ]
+
+
+class Health_Field:
+    """One typed health value, keeps the `.value` API of multiprocessing.Value"""
+    __slots__ = ("slot", "index", "cast")
+
+    def __init__(self, slot, index, cast):
+        self.slot = slot
+        self.index = index
+        self.cast = cast
+
+    @property
+    def value(self):
+        return self.cast(self.slot.block._slots[self.slot.index].values[self.index])
+
+    @value.setter
+    def value(self, value):
+        self.slot.block.write(self.slot.index, {self.index: value})
+
+    def __repr__(self):
+        return f"Health_Field({self.slot.name}.{self.index}={self.value!r})"
+
+
+class Health_Slot:
+    """The health values owned by one device or worker"""
+    def __init__(self, block, index, name):
+        self.block = block
+        self.index = index
+        self.name = name
+        self.fields = {}  # field name -> Health_Field
+
+    def field(self, name, cast=int, default=0):
+        """Register a value in this slot. Must happen before the workers start."""
+        if name in self.fields:
+            return self.fields[name]
+        if len(self.fields) >= MAX_FIELDS:
+            raise ValueError(f"Health slot '{self.name}' is full ({MAX_FIELDS} fields)")
+        field = Health_Field(self, len(self.fields), cast)
+        self.fields[name] = field
+        field.value = default
+        return field
+
+    def update(self, **values):
+        """Set several fields in one consistent write"""
+        self.block.write(self.index, {self.fields[name].index: value for name, value in values.items()})
+
+    def read(self):
+        return self.block.read(self.name)
+
+
+class Health_Block:
+    """Fixed layout shared memory health struct for one device.
+
+    Reads take no locks, so a snapshot of every slot costs a few copies.
+    """
+    def __init__(self, slots=MAX_SLOTS):
+        self._slots = RawArray(_Slot, slots)
+        self._write_lock = Lock()  # Writers only, a slot may be written from several processes
+        self.slots = {}  # slot name -> Health_Slot
+
+    def slot(self, name):
+        if name in self.slots:
+            return self.slots[name]
+        if len(self.slots) >= len(self._slots):
+            raise ValueError(f"Health block is full ({len(self._slots)} slots)")
+        slot = Health_Slot(self, len(self.slots), name)
+        self.slots[name] = slot
+        return slot
+
+    def write(self, index, values):
+        shared = self._slots[index]
+        with self._write_lock:
+            shared.seq += 1
+            for i, value in values.items():
+                shared.values[i] = value
+            shared.seq += 1
+
+    def _read_raw(self, index):
+        shared = self._slots[index]
+        deadline = None
+        while True:
+            seq = shared.seq
+            if not seq & 1:
+                values = shared.values[:]
+                if shared.seq == seq:
+                    return values
+            # Writer in progress, let it finish
+            now = time.monotonic()
+            if deadline is None:
+                deadline = now + READ_TIMEOUT
+            elif now > deadline:
+                return shared.values[:]
+            time.sleep(0)
+
+    def read(self, name):
+        slot = self.slots[name]
+        values = self._read_raw(slot.index)
+        return {name: field.cast(values[field.index]) for name, field in slot.fields.items()}
+
+    def snapshot(self):
+        """{slot name: {field: value}} for every slot, each slot internally consistent"""
+        return {name: self.read(name) for name in self.slots}
@@ -0,0 +1,124 @@
+import ctypes
+import math
+from multiprocessing.sharedctypes import RawArray, RawValue
+
+from utils.codec import pack_flags, unpack_flags
+from .health_block import MAX_SLOTS
+
+HISTORY_CAPACITY = 3600  # Two hours at the default 2 s sample interval
+
+# ----------------------------------------
+# Shared Ring Buffer
+# ----------------------------------------
+# Fixed size records in one RawArray plus a shared count of records ever written.
+# There is one writer (the metrics sampler); it fills record `count % capacity`
+# in place and only then bumps `count`. Readers copy a range and drop anything
+# the writer may have lapped while they were copying, so they never lock.
+# Per-worker columns are indexed by the worker's Health_Block slot.
+
+class _Sample(ctypes.Structure):
+    _fields_ = [
+        ("time", ctypes.c_double),
+        ("cpu_percent", ctypes.c_float),
+        ("memory_percent", ctypes.c_float),
+        ("temperature", ctypes.c_float),  # NaN when the board has no sensor
+        ("flags", ctypes.c_uint32),  # Device _health_* flags, codec.HEALTH_FLAGS bit order
+        ("dropped_frames", ctypes.c_uint32),  # Total across camera workers
+        ("worker_cpu", ctypes.c_float * MAX_SLOTS),
+        ("worker_rss_mb", ctypes.c_float * MAX_SLOTS),
+    ]
+
+
+AGGREGATES = {
+    "mean": lambda values: sum(values) / len(values),
+    "max": max,
+    "min": min,
+    "last": lambda values: values[-1],
+}
+
+
+def _number(value):
+    return None if value is None or math.isnan(value) else round(value, 2)
+
+
+class Health_History:
+    """Shared-memory ring buffer of health samples for one device"""
+    def __init__(self, health, capacity=HISTORY_CAPACITY):
+        self.health = health  # Health_Block, maps worker names to columns
+        self.capacity = capacity
+        self._samples = RawArray(_Sample, capacity)
+        self._count = RawValue(ctypes.c_uint64, 0)
+
+    def __len__(self):
+        return min(self._count.value, self.capacity)
+
+    def append(self, sample, slots=None):
+        """Record one Metrics_Sampler snapshot plus the health block's slots"""
+        slots = self.health.snapshot() if slots is None else slots
+        count = self._count.value
+        record = self._samples[count % self.capacity]
+
+        record.time = sample["time"]
+        record.cpu_percent = sample["cpu_percent"]
+        record.memory_percent = sample["memory"]["percent"]
+        temperature = sample.get("temperature")
+        record.temperature = math.nan if temperature is None else temperature
+        record.flags = pack_flags(slots.get("device", {}))
+        record.dropped_frames = sum(int(fields.get("dropped_frames", 0)) for fields in slots.values())
+
+        workers = sample.get("workers", {})
+        for name, slot in self.health.slots.items():
+            usage = workers.get(name) or {}
+            record.worker_cpu[slot.index] = math.nan if usage.get("cpu_percent") is None else usage["cpu_percent"]
+            record.worker_rss_mb[slot.index] = math.nan if usage.get("rss_mb") is None else usage["rss_mb"]
+
+        self._count.value = count + 1  # Publish only once the record is complete
+
+    def _copy(self, since=None):
+        """Consistent copy of the stored records, oldest first"""
+        count = self._count.value
+        first = max(0, count - self.capacity)
+        copies = [_Sample.from_buffer_copy(self._samples[i % self.capacity]) for i in range(first, count)]
+        # Anything the writer reached while we copied may be half overwritten, including the
+        # record it is filling right now: slot `count % capacity` is written before count moves
+        lapped = self._count.value - self.capacity + 1
+        records = copies[max(0, lapped - first):]
+        if since is not None:
+            records = [r for r in records if r.time >= since]
+        return records
+
+    def _row(self, records, aggregate):
+        row = {
+            "time": records[-1].time,
+            "cpu_percent": _number(aggregate([r.cpu_percent for r in records])),
+            "memory_percent": _number(aggregate([r.memory_percent for r in records])),
+            "temperature": _number(aggregate([r.temperature for r in records])),
+            "flags": unpack_flags(records[-1].flags),
+            "dropped_frames": records[-1].dropped_frames,
+            "workers": {},
+        }
+        for name, slot in self.health.slots.items():
+            row["workers"][name] = {
+                "cpu_percent": _number(aggregate([r.worker_cpu[slot.index] for r in records])),
+                "rss_mb": _number(aggregate([r.worker_rss_mb[slot.index] for r in records])),
+            }
+        return row
+
+    def query(self, since=None, points=None, aggregate="mean"):
+        """Samples newer than `since`, downsampled to at most `points` buckets.
+
+        Numeric columns in a bucket are combined with `aggregate` (mean, max,
+        min or last); flags and dropped frames come from the bucket's last sample.
+        """
+        if aggregate not in AGGREGATES:
+            raise ValueError(f"aggregate must be one of {', '.join(AGGREGATES)}")
+        records = self._copy(since)
+        if not records:
+            return []
+        points = len(records) if not points else min(points, len(records))
+        size = len(records) / points
+        combine = AGGREGATES[aggregate]
+        return [
+            self._row(records[int(i * size):int((i + 1) * size)], combine)
+            for i in range(points)
+        ]
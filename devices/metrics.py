@@ -0,0 +1,233 @@
+import ctypes
+import logging
+import math
+import threading
+from bisect import bisect_left
+from multiprocessing import Lock
+from multiprocessing.sharedctypes import RawArray
+
+MAX_SERIES = 512  # Shared cells for every counter, gauge and histogram bucket
+
+# ----------------------------------------
+# Shared Counters
+# ----------------------------------------
+# Every series is one double in a RawArray allocated before the workers fork,
+# so any process can update it and the Config API only reads. Register every
+# metric and label set in the main process before starting workers: cells
+# handed out after the fork are invisible to the other processes.
+
+def _escape(text, quotes=True):
+    """Backslash, newline and (in label values) double quote, as the text format requires"""
+    text = str(text).replace("\\", "\\\\").replace("\n", "\\n")
+    return text.replace('"', '\\"') if quotes else text
+
+
+def _labels_text(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+def _number(value):
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(int(value)) if value == int(value) else repr(value)
+
+
+class Series:
+    """One counter or gauge cell"""
+    __slots__ = ("metrics", "index")
+
+    def __init__(self, metrics, index):
+        self.metrics = metrics
+        self.index = index
+
+    @property
+    def value(self):
+        return self.metrics._cells[self.index]
+
+    def inc(self, amount=1):
+        with self.metrics._lock:
+            self.metrics._cells[self.index] += amount
+
+    def set(self, value):
+        self.metrics._cells[self.index] = value  # A single aligned double, no lock needed
+
+
+class Metric:
+    """A counter or gauge family, `labels()` returns its series"""
+    def __init__(self, metrics, name, kind, help, label_names=()):
+        self.metrics = metrics
+        self.name = name
+        self.kind = kind
+        self.help = help
+        self.label_names = tuple(label_names)
+        self.series = {}  # label values -> Series
+        if not self.label_names:
+            self.labels()
+
+    def labels(self, **labels):
+        key = tuple(str(labels[name]) for name in self.label_names)
+        if key not in self.series:
+            self.series[key] = Series(self.metrics, self.metrics._allocate(1))
+        return self.series[key]
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def set(self, value):
+        self.labels().set(value)
+
+    def samples(self):
+        for key, series in self.series.items():
+            yield self.name, tuple(zip(self.label_names, key)), series.value
+
+
+class Histogram:
+    """Fixed-bucket histogram: one cell per bucket plus sum and count"""
+    def __init__(self, metrics, name, help, buckets):
+        self.metrics = metrics
+        self.name = name
+        self.kind = "histogram"
+        self.help = help
+        self.buckets = tuple(buckets)
+        self._first = metrics._allocate(len(self.buckets) + 3)  # buckets, +Inf, sum, count
+
+    def observe(self, value):
+        cells = self.metrics._cells
+        bucket = self._first + bisect_left(self.buckets, value)
+        end = self._first + len(self.buckets) + 1
+        with self.metrics._lock:
+            cells[bucket] += 1
+            cells[end] += value
+            cells[end + 1] += 1
+
+    def samples(self):
+        cells = self.metrics._cells
+        cumulative = 0
+        for i, bound in enumerate(self.buckets + (math.inf,)):
+            cumulative += cells[self._first + i]
+            yield f"{self.name}_bucket", (("le", _number(bound)),), cumulative
+        end = self._first + len(self.buckets) + 1
+        yield f"{self.name}_sum", (), cells[end]
+        yield f"{self.name}_count", (), cells[end + 1]
+
+
+class Sharded_Counter:
+    """A counter family with its own row of cells per shard, samples are the sum of the rows.
+
+    A shard is a health slot index, so each process only ever adds to its own
+    row and needs no cross-process lock. For the hottest counters, e.g. logging.
+    """
+    kind = "counter"
+
+    def __init__(self, metrics, name, help, label_name, label_values, shards):
+        self.metrics = metrics
+        self.name = name
+        self.help = help
+        self.label_name = label_name
+        self.label_values = tuple(label_values)
+        self.shards = shards
+        self._first = metrics._allocate(shards * len(self.label_values))
+
+    def cell(self, shard, value):
+        """Index of one shard's cell for a label value"""
+        return self._first + shard * len(self.label_values) + self.label_values.index(value)
+
+    def samples(self):
+        cells = self.metrics._cells
+        width = len(self.label_values)
+        for i, value in enumerate(self.label_values):
+            total = sum(cells[self._first + shard * width + i] for shard in range(self.shards))
+            yield self.name, ((self.label_name, value),), total
+
+
+class Shared_Metrics:
+    """Prometheus style metrics backed by shared memory"""
+    def __init__(self, capacity=MAX_SERIES):
+        self._cells = RawArray(ctypes.c_double, capacity)
+        self._lock = Lock()  # Increments only, reads and gauge sets are lock free
+        self._used = 0
+        self.families = {}
+
+    def _allocate(self, count):
+        if self._used + count > len(self._cells):
+            raise ValueError(f"Shared metrics are full ({len(self._cells)} series)")
+        index = self._used
+        self._used += count
+        return index
+
+    def _register(self, metric):
+        if metric.name in self.families:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self.families[metric.name] = metric
+        return metric
+
+    def counter(self, name, help, labels=()):
+        return self.families.get(name) or self._register(Metric(self, name, "counter", help, labels))
+
+    def gauge(self, name, help, labels=()):
+        return self.families.get(name) or self._register(Metric(self, name, "gauge", help, labels))
+
+    def histogram(self, name, help, buckets):
+        return self.families.get(name) or self._register(Histogram(self, name, help, buckets))
+
+    def sharded_counter(self, name, help, label_name, label_values, shards):
+        return self.families.get(name) or self._register(
+            Sharded_Counter(self, name, help, label_name, label_values, shards))
+
+    def render(self):
+        """Text exposition format"""
+        return render_families(self.families.values())
+
+
+def render_families(families):
+    lines = []
+    for family in families:
+        lines.append(f"# HELP {family.name} {_escape(family.help, quotes=False)}")
+        lines.append(f"# TYPE {family.name} {family.kind}")
+        for name, labels, value in family.samples():
+            lines.append(f"{name}{_labels_text(labels)} {_number(value)}")
+    return "\n".join(lines) + "\n"
+
+
+class Static_Family:
+    """A family whose samples are computed at scrape time"""
+    def __init__(self, name, kind, help, samples):
+        self.name = name
+        self.kind = kind
+        self.help = help
+        self._samples = samples  # [(labels dict, value)]
+
+    def samples(self):
+        for labels, value in self._samples:
+            yield self.name, tuple(labels.items()), value
+
+# ----------------------------------------
+# Log Throughput
+# ----------------------------------------
+class Log_Counter(logging.Handler):
+    """Counts records per level; attach to the root logger to see every logger.
+
+    Writes this process's row of a Sharded_Counter (its health slot index), so
+    logging never waits on another process. The lock only orders this
+    process's own threads.
+    """
+    LEVELS = ("DEBUG", "INFO", "SUCCESS", "WARNING", "ERROR", "CRITICAL", "OTHER")
+
+    def __init__(self, counter, shard):
+        super().__init__(level=logging.DEBUG)
+        self._cells = counter.metrics._cells
+        self._index = {level: counter.cell(shard, level) for level in self.LEVELS}
+        self._other = self._index["OTHER"]
+        self._count_lock = threading.Lock()
+
+    def emit(self, record):
+        index = self._index.get(record.levelname, self._other)
+        with self._count_lock:
+            self._cells[index] += 1
+
+    def handle(self, record):
+        # No formatting and no handler lock needed, just count
+        self.emit(record)
+        return True
@@ -0,0 +1,84 @@
+import threading
+import time
+
+from utils.command_protocol import make_batch
+
+# ----------------------------------------
+# Reply Batcher
+# ----------------------------------------
+class Reply_Batcher:
+    """Coalesce replies to the same key that arrive within `window` seconds.
+
+    The first reply to a key opens a window, everything queued for that key
+    before it closes goes out as one message. A window of 0 sends immediately.
+    """
+    def __init__(self, send, window=0.02, logger=None):
+        self.send = send
+        self.window = window
+        self.logger = logger
+        self._cond = threading.Condition()
+        self._pending = {}  # key -> (deadline, [replies])
+        self._closed = False
+        self._thread = None
+        if self.window > 0:
+            self._thread = threading.Thread(target=self._run, name="reply_batcher", daemon=True)
+            self._thread.start()
+
+    def add(self, key, reply):
+        if self._thread is None:
+            self.send_now(key, reply)
+            return
+        with self._cond:
+            if not self._closed:
+                entry = self._pending.get(key)
+                if entry is None:
+                    self._pending[key] = (time.monotonic() + self.window, [reply])
+                    self._cond.notify()
+                else:
+                    entry[1].append(reply)
+                return
+        # Flushed already, nothing would pick it up: send now, a closed session only logs a warning
+        self.send_now(key, reply)
+
+    def send_now(self, key, reply):
+        """Send one reply unbatched, for acknowledgements the requester is timing"""
+        self._send(key, [reply])
+
+    def _due(self):
+        now = time.monotonic()
+        return [key for key, (deadline, _) in self._pending.items() if deadline <= now]
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._closed:
+                    if self._pending:
+                        timeout = min(deadline for deadline, _ in self._pending.values()) - time.monotonic()
+                        if timeout <= 0:
+                            break
+                    else:
+                        timeout = None
+                    self._cond.wait(timeout)
+                keys = list(self._pending) if self._closed else self._due()
+                batches = [(key, self._pending.pop(key)[1]) for key in keys]
+                closed = self._closed
+            for key, replies in batches:
+                self._send(key, replies)
+            if closed:
+                return
+
+    def _send(self, key, replies):
+        try:
+            self.send(key, make_batch(replies))
+        except Exception as e:
+            # The session is already closed when replying to `stop`
+            if self.logger:
+                self.logger.warning(f"Failed to send {len(replies)} reply(s) to {key}: {e}")
+
+    def flush(self):
+        """Send everything still pending and stop the batching thread, later replies go out unbatched"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
@@ -0,0 +1,76 @@
+import os
+import signal
+import time
+from multiprocessing.connection import wait
+
+STOP_DEADLINE = 5.0  # Seconds for the whole shutdown, however many workers there are
+ESCALATION_GRACE = 0.5  # SIGTERM this long before SIGKILL, SIGKILL this long before the deadline
+
+EXITED = "exited"
+TERMINATED = "terminated"
+KILLED = "killed"
+STUCK = "stuck"  # Still alive after SIGKILL, nothing more we can do
+
+# ----------------------------------------
+# Shutdown Coordinator
+# ----------------------------------------
+def stop_processes(processes, deadline=STOP_DEADLINE, logger=None):
+    """Stop every process at once and wait for all of them in parallel.
+
+    Each one is asked to stop through `request_stop()` (Workers) or SIGTERM
+    (anything else). Stragglers get SIGTERM at deadline - 2 * ESCALATION_GRACE
+    and SIGKILL at deadline - ESCALATION_GRACE.
+
+    Returns {name: {"seconds", "how", "exitcode"}}, `how` being one of
+    EXITED, TERMINATED, KILLED or STUCK.
+    """
+    start = time.monotonic()
+    report = {}
+    pending = {}
+    for process in processes:
+        if process.pid is None or not process.is_alive():
+            continue  # Never started, or already gone
+        request_stop = getattr(process, "request_stop", None)
+        if request_stop is not None:
+            request_stop()
+        else:
+            process.terminate()
+        pending[process.sentinel] = process
+
+    phases = [
+        (start + max(0.0, deadline - 2 * ESCALATION_GRACE), TERMINATED, signal.SIGTERM),
+        (start + max(0.0, deadline - ESCALATION_GRACE), KILLED, signal.SIGKILL),
+        (start + deadline, STUCK, None),
+    ]
+    how = EXITED
+    while pending:
+        until, next_how, sig = phases[0]
+        for sentinel in wait(list(pending), timeout=max(0.0, until - time.monotonic())):
+            process = pending.pop(sentinel)
+            process.join()  # Already exited, just reaps it
+            report[process.name] = {"seconds": round(time.monotonic() - start, 3), "how": how,
+                                    "exitcode": process.exitcode}
+        if not pending or time.monotonic() < until:
+            continue
+        phases.pop(0)
+        how = next_how
+        if sig is None:
+            break
+        for process in pending.values():
+            try:
+                os.kill(process.pid, sig)
+            except ProcessLookupError:
+                pass
+
+    for process in pending.values():
+        report[process.name] = {"seconds": round(time.monotonic() - start, 3), "how": STUCK, "exitcode": None}
+
+    if logger is not None:
+        for name, result in sorted(report.items(), key=lambda item: item[1]["seconds"]):
+            message = f"{name} {result['how']} after {result['seconds']:.2f}s (exit code {result['exitcode']})"
+            if result["how"] == EXITED:
+                logger.info(f"⏹️ {message}")
+            else:
+                logger.warning(f"⚠️ {message}")
+        logger.info(f"Stopped {len(report)} processes in {time.monotonic() - start:.2f}s")
+    return report
@@ -0,0 +1,58 @@
+import time
+
+from utils.setup_logger import get_log_listener, use_log_queue
+
+# launch.py starts workers from a fork server that imported the worker base once and never built
+# a Device: no copy of the parent's Zenoh session or Manager, while the imported code stays shared.
+# Worker processes are pickled as with spawn, which is why workers only carry a Worker_Context.
+# Only what several workers import is preloaded: the gi bindings are shared by the camera workers,
+# but Gst.init runs in each of them (see init_gstreamer) and FastAPI loads in the API process only.
+START_METHOD = "forkserver"
+FORKSERVER_PRELOAD = ["devices.workers.worker", "devices.workers.Shared_Camera_Functions"]
+
+# ----------------------------------------
+# Worker Context
+# ----------------------------------------
+class Worker_Context:
+    """What a worker process needs from its Device, and nothing more.
+
+    Plain values plus the shared memory and queues allocated before any worker
+    starts, so it pickles for the spawn and forkserver start methods. The Device
+    itself, with its Zenoh session, subscribers and command thread, stays in the
+    parent.
+    """
+    def __init__(self, device):
+        self.device_id = device.device_id
+        self.ip = device.ip
+        self.boot_time = device.boot_time
+        self.wire_format = device.wire_format
+        self.logger = device.logger
+        self.config = device.config  # Reloads itself when any process writes device.cfg
+        self.is_stopped = device.is_stopped
+        self.health = device.health
+        self.health_slot = device.health_slot
+        self.health_history = device.health_history
+        self.metrics = device.metrics
+        self.file_index = device.file_index
+        self.log_queue = get_log_listener().queue
+
+    def __setstate__(self, state):
+        # Unpickled in the worker process: loggers there have no handlers yet
+        self.__dict__.update(state)
+        use_log_queue(self.log_queue)
+
+    @property
+    def name(self):
+        return self.config.device_name
+
+    @name.setter
+    def name(self, value):
+        """Same as renaming the Device, device.cfg is shared by every process"""
+        old_name = self.config.device_name
+        if old_name == value:
+            return
+        self.config.update(device_name=value)
+        self.logger.info(f"Device renamed from '{old_name}' to '{value}'")
+
+    def uptime(self):
+        return time.time() - self.boot_time
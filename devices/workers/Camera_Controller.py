@@ -1,17 +1,15 @@
 import gi
 gi.require_version('Gst', '1.0')
-from gi.repository import Gst, GObject
+from gi.repository import Gst, GLib, GObject
 
-import time
 from .worker import Worker
+from .Shared_Camera_Functions import init_gstreamer
 import os
 from pathlib import Path
-from multiprocessing import Value
-
-Gst.init(None)
 
 CONFIG_PATH = Path("./device.cfg")
 TESTFILE_PATH = Path("./T_001_A.mp4")
+STOP_POLL_MS = 100  # How often the main loop checks for a stop request
 
 class Camera_Controller(Worker):
     def __init__(self, device, name, DEBUG=False, LETHAL=False, OVERWRITE_SHM=True,
@@ -21,10 +19,12 @@ class Camera_Controller(Worker):
         self.DEBUG = DEBUG
         self.LETHAL = LETHAL
 
-        self.device = device
 
-        self._health_shm = Value("i", 0)  # Health status: 0=OK, 1=Warning, 2=Error
-        self._health_camera_available = Value("i", 0)  # Health status: 0=OK, 1=Warning, 2=Error
+        self._health_shm = self.health.field("shm")  # Health status: 0=OK, 1=Warning, 2=Error
+        self._health_camera_available = self.health.field("camera_available")  # Health status: 0=OK, 1=Warning, 2=Error
+        self._health_dropped_frames = self.health.field("dropped_frames")  # Frames the leaky SHM queue threw away
+        self.milestone("first_frame")
+        self._first_frame = False
 
         if camera_device is not None:
             try:
@@ -33,6 +33,7 @@ class Camera_Controller(Worker):
                 raise ValueError(f"camera_device must be int, 0, 1, ..., got: {camera_device}")
         else:
             self.camera_device = 0
+        self.metrics = device.camera_metrics[self.camera_device]
 
         if shm_base is None:
             self.shm_base = "/tmp/pi_cam_shm_"
@@ -42,7 +43,7 @@ class Camera_Controller(Worker):
         self.shm_path = f"/tmp/pi_cam_shm_{self.camera_device}"
 
     def startup(self):
-            self.logger.info(f"[{self.device.device_id}][{self.name}] Starting up...")
+            self.logger.info(f"[{self.context.device_id}][{self.name}] Starting up...")
             # TODO fingerpint the camera and hardware
 
     def gstreamer_factory(self, mode, camera_int=0, width=640, height=480, framerate=30, format="I420", shm_size=13442688, show_preview=False):
@@ -54,7 +55,7 @@ class Camera_Controller(Worker):
                 "videotestsrc is-live=true pattern=ball",
                 f"video/x-raw, width={width}, height={height}, framerate={framerate}/1",
                 "tee name=t",
-                "t. ! queue leaky=downstream max-size-buffers=2",
+                "t. ! queue name=shm_queue leaky=downstream max-size-buffers=2",
                 f"videoconvert ! video/x-raw, format={format}",
                 f"shmsink socket-path={self.shm_path} shm-size={shm_size} sync=false wait-for-connection=false",
                 "t. ! fakesink"
@@ -73,7 +74,7 @@ class Camera_Controller(Worker):
                 "avdec_h264 ! "
                 f"videoconvert ! video/x-raw, width={width}, height={height}, framerate={framerate}/1 ! "
                 "tee name=t "
-                "t. ! queue leaky=downstream max-size-buffers=2 ! "
+                "t. ! queue name=shm_queue leaky=downstream max-size-buffers=2 ! "
                 f"shmsink socket-path={self.shm_path} shm-size={shm_size} sync=false wait-for-connection=false "
                 "t. ! fakesink"
             )
@@ -97,18 +98,18 @@ class Camera_Controller(Worker):
 
                 "videoconvert ! "
                 
-                f"textoverlay  halignment=center valignment=top text=\"{self.device.device_id}:{self.device.name}\" font-desc=\"Sans, 5\" ! "
+                f"textoverlay  halignment=center valignment=top text=\"{self.context.device_id}:{self.context.name}\" font-desc=\"Sans, 5\" ! "
                 "clockoverlay  halignment=right valignment=top time-format=\"%D_%H:%M:%S\" font-desc=\"Sans, 5\" ! "
                 "clockoverlay  halignment=left valignment=top time-format=\"%D_%H:%M:%S\" font-desc=\"Sans, 5\" ! "
 
-                f"textoverlay  halignment=center valignment=bottom text=\"{self.device.device_id}:{self.device.name}\" font-desc=\"Sans, 5\" ! "
+                f"textoverlay  halignment=center valignment=bottom text=\"{self.context.device_id}:{self.context.name}\" font-desc=\"Sans, 5\" ! "
                 "clockoverlay  halignment=right valignment=bottom time-format=\"%D_%H:%M:%S\" font-desc=\"Sans, 5\" ! "
                 "clockoverlay  halignment=left valignment=bottom time-format=\"%D_%H:%M:%S\" font-desc=\"Sans, 5\" ! "
 
                 "video/x-raw,width=2304,height=1296,framerate=30/1,format=I420 ! "
 
                 "tee name=t "
-                "t. ! queue leaky=downstream max-size-buffers=2 ! "
+                "t. ! queue name=shm_queue leaky=downstream max-size-buffers=2 ! "
                 # 3 × 4,480,896 = 13,442,688 bytes
                 # shm_size = width * height * 3 // 2 * num_frames
                 f"shmsink socket-path={self.shm_path} shm-size=13442688 sync=false wait-for-connection=false "
@@ -121,25 +122,26 @@ class Camera_Controller(Worker):
         return pipeline_str, camera_device
 
     def run(self):
+        init_gstreamer()
         self.startup()
         if self.DEBUG == 1:
-            self.logger.warning(f"[{self.device.device_id}][{self.name}] Running in DEBUG(1) mode...")
+            self.logger.warning(f"[{self.context.device_id}][{self.name}] Running in DEBUG(1) mode...")
             pipeline_str, camera_device = self.gstreamer_factory(mode="DEBUG", camera_int=self.camera_device)
 
         elif self.DEBUG == 2:
-            self.logger.warning(f"[{self.device.device_id}][{self.name}] Running in TESTFILE mode...")
+            self.logger.warning(f"[{self.context.device_id}][{self.name}] Running in TESTFILE mode...")
             if not TESTFILE_PATH.exists():
                 self.logger.error(f"❌ Test file not found: {TESTFILE_PATH}. Cannot run in TESTFILE mode, falling back to DEBUG(1) mode.")
                 pipeline_str, camera_device = self.gstreamer_factory(mode="DEBUG", camera_int=self.camera_device)
             else:
-                self.logger.info(f"[{self.device.device_id}][{self.name}] Using test file: {TESTFILE_PATH}")
+                self.logger.info(f"[{self.context.device_id}][{self.name}] Using test file: {TESTFILE_PATH}")
                 pipeline_str, camera_device = self.gstreamer_factory(mode="TESTFILE", camera_int=self.camera_device)
 
         elif self.DEBUG is False or self.DEBUG == 0:
-            self.logger.info(f"[{self.device.device_id}][{self.name}] Running in PRODUCTION mode...")
+            self.logger.info(f"[{self.context.device_id}][{self.name}] Running in PRODUCTION mode...")
             pipeline_str, camera_device = self.gstreamer_factory(mode="pi5_cam3", camera_int=self.camera_device)
 
-        self.logger.info(f"[{self.device.device_id}][{self.name}] GStreamer Pipeline: {pipeline_str}")
+        self.logger.info(f"[{self.context.device_id}][{self.name}] GStreamer Pipeline: {pipeline_str}")
 
         if os.path.exists(self.shm_path):
             if self.OVERWRITE_SHM:
@@ -156,10 +158,16 @@ class Camera_Controller(Worker):
 
         self.logger.info(f"Creating Pipeline with SHM Path: {self.shm_path}")
         pipeline = Gst.parse_launch(pipeline_str)
+
+        # Count frames entering the SHM queue; the leaky queue signals overrun each time it drops one
+        shm_queue = pipeline.get_by_name("shm_queue")
+        if shm_queue is not None:
+            shm_queue.get_static_pad("sink").add_probe(Gst.PadProbeType.BUFFER, self._on_frame_captured)
+            shm_queue.connect("overrun", self._on_frame_dropped)
         
         pipeline.set_state(Gst.State.READY)
         self.logger.info(f"{camera_device} is Ready...")
-        self.device._health_camera_is_ready.value = True
+        self.context.health_slot.update(camera_is_ready=True)
 
         if os.path.exists(self.shm_path):
             self.logger.info(f"✅ SHM Path exists: {self.shm_path}")
@@ -174,26 +182,42 @@ class Camera_Controller(Worker):
         
         pipeline.set_state(Gst.State.PLAYING)
         self.logger.info(f"{camera_device} is Playing...")
+        self.mark_ready()  # The SHM socket is up, the stream and recorders can attach
 
-        # Keep running until user interrupts
+        # Keep running until asked to stop
         try:
             self.logger.info(f"{camera_device} Launching...")
             loop = GObject.MainLoop()
+
+            def check_stop():
+                if self.stopping:
+                    loop.quit()
+                    return False
+                return True
+
+            GLib.timeout_add(STOP_POLL_MS, check_stop)
             loop.run()
         except KeyboardInterrupt:
             pass
         finally:
             pipeline.set_state(Gst.State.NULL)
+            self._remove_socket()
+
+    def _on_frame_captured(self, pad, info):
+        self.metrics["captured"].inc()
+        if not self._first_frame:
+            self._first_frame = True
+            self.mark("first_frame")
+        return Gst.PadProbeReturn.OK
+
+    def _on_frame_dropped(self, queue):
+        self._health_dropped_frames.value += 1
+        self.metrics["dropped"].inc()
 
-    def stop(self):
-        self.is_stopped.value = True
-        self.logger.info(f"[{self.device.device_id}][{self.name}] Stopping ...")
-        # Attempt to clean up the shared memory socket file
+    def _remove_socket(self):
         try:
             if os.path.exists(self.shm_path):
                 os.remove(self.shm_path)
                 self.logger.info(f"🧹 Removed socket file: {self.shm_path}")
         except Exception as e:
             self.logger.info(f"⚠️ Failed to remove socket file: {e}")
-        time.sleep(1)  # Give some time for the process to stop gracefully
-        self.terminate()
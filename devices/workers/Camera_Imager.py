@@ -4,9 +4,9 @@
 from gi.repository import Gst, GLib
 import datetime
 import os
-Gst.init(None)
 
 from .worker import Worker
+from .Shared_Camera_Functions import init_gstreamer
 
 OUTPUT_DIR = os.path.join(os.getcwd(), "images")
 os.makedirs(OUTPUT_DIR, exist_ok=True)
@@ -15,7 +15,6 @@ class Camera_Recorder(Worker):
     def __init__(self, device, name, file_base= None, UPLOAD_ON_FINISH=True, DEBUG=False):
         super().__init__(device, name)
         self.DEBUG = DEBUG
-        self.device = device
         self.UPLOAD_ON_FINISH = UPLOAD_ON_FINISH
         self.file_base = file_base
 
@@ -23,25 +22,28 @@ class Camera_Recorder(Worker):
         if self.file_base is not None:
             self.imagename = os.path.join(OUTPUT_DIR, f"{timestamp}_{self.file_base}.png")
         else:
-            self.imagename = os.path.join(OUTPUT_DIR, f"{timestamp}_{self.device.device_id}_output.png")
+            self.imagename = os.path.join(OUTPUT_DIR, f"{timestamp}_{self.context.device_id}_output.png")
 
-        # Create a new, dedicated GLib main context
-        self.context = GLib.MainContext.new()
-
-        # Create the main loop using that context
-        self.loop = GLib.MainLoop(context=self.context)
-
-        # Needed for early Termination
+        # GLib and GStreamer objects belong to the worker process, they are created in run()
+        self.glib_context = None
+        self.loop = None
         self.pipeline = None
 
     def run(self):
+        init_gstreamer()
+
+        # Create a new, dedicated GLib main context
+        self.glib_context = GLib.MainContext.new()
+
+        # Create the main loop using that context
+        self.loop = GLib.MainLoop(context=self.glib_context)
         try:
             # Step 1: 
-            self.context.push_thread_default()
-            if GLib.MainContext.get_thread_default() == self.context:
-                self.logger.info("✅ Thread default context matches self.context.")
+            self.glib_context.push_thread_default()
+            if GLib.MainContext.get_thread_default() == self.glib_context:
+                self.logger.info("✅ Thread default context matches self.glib_context.")
             else:
-                self.logger.warning("🚨 Thread default context does NOT match self.context.")
+                self.logger.warning("🚨 Thread default context does NOT match self.glib_context.")
 
             # Step 2
             socket_path = "/tmp/testshm"
@@ -76,7 +78,7 @@ class Camera_Recorder(Worker):
             self.stop()
         finally:
             # Ensure cleanup happens
-            self.context.pop_thread_default()
+            self.glib_context.pop_thread_default()
             self.stop()
 
     def on_message(self, bus, message):
@@ -91,16 +93,18 @@ class Camera_Recorder(Worker):
 
     def stop(self):
         self.logger.info("Stopping the recorder gracefully...")
+        if self.glib_context is None:
+            return True  # run() never started, there is no pipeline or loop to stop
 
-        self.context.push_thread_default()
-        if GLib.MainContext.get_thread_default() == self.context:
-            self.logger.info("✅ Thread default context matches self.context.")
+        self.glib_context.push_thread_default()
+        if GLib.MainContext.get_thread_default() == self.glib_context:
+            self.logger.info("✅ Thread default context matches self.glib_context.")
         else:
-            self.logger.warning("🚨 Thread default context does NOT match self.context.")
+            self.logger.warning("🚨 Thread default context does NOT match self.glib_context.")
 
         def _shutdown():
             # Ensure we're running inside the correct GLib thread
-            if GLib.MainContext.get_thread_default() == self.context:
+            if GLib.MainContext.get_thread_default() == self.glib_context:
                 self.logger.info("🏠 Inside shutdown: correct thread context.")
             else:
                 self.logger.warning("🚨 Inside shutdown: wrong thread context.")
@@ -120,10 +124,10 @@ class Camera_Recorder(Worker):
             return False  # one-shot idle callback
 
         # Schedule shutdown on the correct context
-        GLib.idle_add(_shutdown, context=self.context)
+        GLib.idle_add(_shutdown, context=self.glib_context)
 
         # Poke the loop in case it's idle
-        GLib.idle_add(lambda: None, context=self.context)
+        GLib.idle_add(lambda: None, context=self.glib_context)
 
         # Upload can safely happen here in the current thread
         self.logger.info("✅ Gstreamer stop requested.")
@@ -3,12 +3,12 @@
 import gi
 gi.require_version('Gst', '1.0')
 gi.require_version('GstRtspServer', '1.0')
-from gi.repository import Gst, GstRtspServer, GLib
-
-Gst.init(None)
+from gi.repository import GstRtspServer, GLib
 
 from .worker import Worker
-from multiprocessing import Value
+from .Shared_Camera_Functions import init_gstreamer
+
+STOP_POLL_MS = 100  # How often the main loop checks for a stop request
 
 class TestFactory(GstRtspServer.RTSPMediaFactory):
     def __init__(self, camera_device=None, shm_base=None):
@@ -46,28 +46,28 @@ class Camera_RTPS(Worker):
         self.DEBUG = DEBUG
         self.LETHAL = LETHAL
 
-        self.device = device
         self.server = None
         self.main_loop = None
 
         self.camera_device = camera_device
         self.shm_base = shm_base
+        self.metrics = device.camera_metrics[self.camera_device]
 
-        self._health_shm = Value("i", 0)  # Health status: 0=OK, 1=Warning, 2=Error
-        self._health_RTPS_available = Value("i", 0)  # Health status: 0=OK, 1=Warning, 2=Error
-        self._health_streaming = Value("i", 0)  # Health status: 0=OK, 1=Warning, 2=Error
+        self._health_shm = self.health.field("shm")  # Health status: 0=OK, 1=Warning, 2=Error
+        self._health_RTPS_available = self.health.field("RTPS_available")  # Health status: 0=OK, 1=Warning, 2=Error
+        self._health_streaming = self.health.field("streaming")  # Health status: 0=OK, 1=Warning, 2=Error
 
     def run(self):
-        while self.device._health_camera_is_ready.value is False:
-            self.logger.info("Waiting for camera to be ready...")
-            GLib.timeout_add_seconds(1, lambda: None)
-        
+        # Started once Camera_Controller's SHM socket is ready, see depends_on
+        init_gstreamer()
         self.server = GstRtspServer.RTSPServer()
         self.port = 8554 + self.camera_device
         self.server.set_service(str(self.port))  # Set custom port
         self.logger.info(f"RTSP server Cam {self.camera_device} running on port {self.port}")
         mounts = self.server.get_mount_points()
         mounts.add_factory("/stream", TestFactory(camera_device=self.camera_device, shm_base=self.shm_base))
+        self.metrics["rtsp_clients"].set(0)
+        self.server.connect("client-connected", self._on_client_connected)
 
         res = self.server.attach(None)
         
@@ -76,28 +76,29 @@ class Camera_RTPS(Worker):
             self._health_RTPS_available.value = 2
             return
         else:
-            self.logger.info(f"✅ RTSP server running at rtsp://{self.device.ip}:8554/stream")
+            self.logger.info(f"✅ RTSP server running at rtsp://{self.context.ip}:8554/stream")
+            self.mark_ready()
 
         self.main_loop = GLib.MainLoop()
         
         # Check periodically if we should stop
         def check_stop():
-            if self.is_stopped.value:
+            if self.stopping:
                 self.main_loop.quit()
                 return False  # Don't repeat
             return True  # Continue checking
         
-        GLib.timeout_add_seconds(1, check_stop)
+        GLib.timeout_add(STOP_POLL_MS, check_stop)
         self.main_loop.run()
+        self._shutdown_server()
+
+    def _on_client_connected(self, server, client):
+        self.metrics["rtsp_clients"].inc()
+        client.connect("closed", lambda client: self.metrics["rtsp_clients"].inc(-1))
+
+    def _shutdown_server(self):
+        self.logger.info(f"[{self.context.device_id}][{self.name}] Stopping RTSP server...")
 
-    def stop(self):
-        self.logger.info(f"[{self.device.device_id}][{self.name}] Stopping RTSP server...")
-        self.is_stopped.value = True
-        
-        # Stop the main loop if it's running
-        if self.main_loop and self.main_loop.is_running():
-            self.main_loop.quit()
-        
         # Clean up the server
         if self.server:
             # Remove all mount points
@@ -105,7 +106,7 @@ class Camera_RTPS(Worker):
             mounts.remove_factory("/stream")
             self.server = None
         
-        self.logger.info(f"[{self.device.device_id}][{self.name}] RTSP server stopped")
+        self.logger.info(f"[{self.context.device_id}][{self.name}] RTSP server stopped")
 
 # RX gst-launch-1.0 -v rtspsrc location=rtsp://192.168.1.50:8554/stream latency=50 protocols=tcp ! rtph264depay ! avdec_h264 ! videoconvert ! autovideosink
 
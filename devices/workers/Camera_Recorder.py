@@ -5,13 +5,16 @@ import time
 from gi.repository import Gst, GLib
 import datetime
 import os
-Gst.init(None)
+from multiprocessing import Event
 
 from .worker import Worker
-from .Upload_Service import upload_file_in_chunks
+from .Shared_Camera_Functions import init_gstreamer
+from utils.file_index import UPLOAD_DONE, UPLOAD_FAILED
 
 OUTPUT_DIR = os.path.join(os.getcwd(), "trials")
 os.makedirs(OUTPUT_DIR, exist_ok=True)
+STOP_POLL_MS = 100  # How often the main loop checks for a stop request
+EOS_TIMEOUT_MS = 3000  # Longest wait for EOS to reach the muxer before quitting anyway
 
 class Camera_Recorder(Worker):
     def __init__(self, device, name, camera_device=None, shm_base=None,
@@ -20,10 +23,12 @@ class Camera_Recorder(Worker):
         super().__init__(device, name)
         
         self.DEBUG = DEBUG
-        self.device = device
         self.UPLOAD_ON_FINISH = UPLOAD_ON_FINISH
         self.file_base = file_base
         self.camera_device = camera_device
+        self.metrics = device.camera_metrics[self.camera_device]
+        self._bytes_reported = 0
+        self.finalized = Event()  # Set once the file is closed, before any upload
 
         if shm_base is None:
             self.shm_base = "/tmp/pi_cam_shm_"
@@ -37,25 +42,21 @@ class Camera_Recorder(Worker):
         if self.file_base is not None:
             self.filename = os.path.join(OUTPUT_DIR, f"{timestamp}_{self.file_base}_C{self.camera_device}.mkv").replace(" ", "_")
         else:
-            self.filename = os.path.join(OUTPUT_DIR, f"{timestamp}_{self.device.device_id}_output_C{self.camera_device}.mkv")
+            self.filename = os.path.join(OUTPUT_DIR, f"{timestamp}_{self.context.device_id}_output_C{self.camera_device}.mkv")
 
-        # Create a new, dedicated GLib main context
-        self.context = GLib.MainContext.new()
-
-        # Create the main loop using that context
-        self.loop = GLib.MainLoop(context=self.context)
-
-        # Needed for early Termination
-        self.pipeline = self.setup()
+        # GLib and GStreamer objects belong to the worker process, they are created in run()
+        self.glib_context = None
+        self.loop = None
+        self.pipeline = None
 
     def setup(self):
         try:
             # Step 1:
-            self.context.push_thread_default()
-            if GLib.MainContext.get_thread_default() == self.context:
-                self.logger.info("✅ Thread default context matches self.context.")
+            self.glib_context.push_thread_default()
+            if GLib.MainContext.get_thread_default() == self.glib_context:
+                self.logger.info("✅ Thread default context matches self.glib_context.")
             else:
-                self.logger.warning("🚨 Thread default context does NOT match self.context.")
+                self.logger.warning("🚨 Thread default context does NOT match self.glib_context.")
 
             # Step 2
             if not os.path.exists(self.shm_path):
@@ -71,7 +72,7 @@ class Camera_Recorder(Worker):
             t. ! queue ! videoconvert ! fakesink sync=false async=false
 
             t. ! queue ! videoconvert !
-            x264enc tune=zerolatency speed-preset=veryfast pass=qual quantizer=10 !
+            x264enc name=encoder tune=zerolatency speed-preset=veryfast pass=qual quantizer=10 !
             matroskamux !
             filesink location={self.filename} sync=false
             """
@@ -84,17 +85,40 @@ class Camera_Recorder(Worker):
             return None
 
     def run(self):
+        init_gstreamer()
+
+        # Create a new, dedicated GLib main context
+        self.glib_context = GLib.MainContext.new()
+
+        # Create the main loop using that context
+        self.loop = GLib.MainLoop(context=self.glib_context)
+
+        # Needed for early Termination
+        self.pipeline = self.setup()
         try:
             # Watch for bus messages to stop cleanly
             bus = self.pipeline.get_bus()
             bus.add_signal_watch()
             bus.connect("message", self.on_message)
 
+            # Encoded frame and file size counters for /metrics
+            encoder = self.pipeline.get_by_name("encoder")
+            encoder.get_static_pad("src").add_probe(Gst.PadProbeType.BUFFER, self._on_frame_encoded)
+            size_timer = GLib.timeout_source_new_seconds(1)
+            size_timer.set_callback(self._report_bytes)
+            size_timer.attach(self.glib_context)
+
+            # A stop request sends EOS so matroskamux can write its index before the file is closed
+            stop_timer = GLib.timeout_source_new(STOP_POLL_MS)
+            stop_timer.set_callback(self._check_stop)
+            stop_timer.attach(self.glib_context)
+
             # TODO May need to add syncronization here
             self.pipeline.set_state(Gst.State.PLAYING)
             self.logger.info(f"{type(self.pipeline)}")
 
             self.logger.info(f"🎥 Recording to {self.filename}...")
+            self.mark_ready()
 
             # Run the main loop
             self.loop.run()
@@ -102,69 +126,71 @@ class Camera_Recorder(Worker):
 
         except Exception as e:
             self.logger.error(f"❌ Error in Camera_Recorder.run(): {e}")
-            self.stop()
         finally:
             # Ensure cleanup happens
-            self.context.pop_thread_default()
-            self.stop()
+            if self.pipeline:
+                self.pipeline.set_state(Gst.State.NULL)
+            self._report_bytes()
+            self._index_recording()
+            self.glib_context.pop_thread_default()
+            self.finalized.set()
+            self._upload()
+
+    def _check_stop(self, *args):
+        if not self.stopping:
+            return True
+        self.logger.info("Sending EOS to finish the recording...")
+        self.pipeline.send_event(Gst.Event.new_eos())
+        eos_timer = GLib.timeout_source_new(EOS_TIMEOUT_MS)
+        eos_timer.set_callback(self._on_eos_timeout)
+        eos_timer.attach(self.glib_context)
+        return False
+
+    def _on_eos_timeout(self, *args):
+        self.logger.warning("⚠️ EOS did not arrive in time, closing the recording anyway.")
+        self.loop.quit()
+        return False
+
+    def _upload(self):
+        # A device shutdown leaves the file pending in the index instead of holding up the deadline
+        if not self.UPLOAD_ON_FINISH or self.is_stopped.value or not os.path.exists(self.filename):
+            return
+        from .Upload_Service import upload_file_in_chunks  # Pulls in requests, only needed after a recording
+        self.logger.info(f"📤 Uploading {self.filename}...")
+        uploaded = upload_file_in_chunks(self.filename, metrics=self.context.metrics)
+        self._index_recording(UPLOAD_DONE if uploaded else UPLOAD_FAILED)
+
+    def _index_recording(self, upload_status=None):
+        try:
+            self.context.file_index.upsert(self.filename, upload_status)
+        except Exception as e:
+            self.logger.warning(f"Failed to index {self.filename}: {e}")
+
+    def _on_frame_encoded(self, pad, info):
+        self.metrics["encoded"].inc()
+        return Gst.PadProbeReturn.OK
+
+    def _report_bytes(self, *args):
+        try:
+            size = os.path.getsize(self.filename)
+        except OSError:
+            return True
+        if size > self._bytes_reported:
+            self.metrics["recording_bytes"].inc(size - self._bytes_reported)
+            self._bytes_reported = size
+        return True  # Keep the timer running
 
     def on_message(self, bus, message):
         t = message.type
         if t == Gst.MessageType.ERROR:
             err, debug = message.parse_error()
             self.logger.error(f"❌ GStreamer Error: {err}, {debug}")
-            self.stop()
+            self.loop.quit()
         elif t == Gst.MessageType.EOS:
             self.logger.info("✅ End of Stream")
-            self.stop()
+            self.loop.quit()
 
     def stand_down(self):
-        self.context.push_thread_default()
+        """Finish the recording without waiting, the process uploads and exits on its own"""
         self.logger.info("Stopping recording...")
-        self.pipeline.set_state(Gst.State.NULL)
-        self.logger.info("✅ Recording Stand Down.")
-
-    def stop(self):
-        self.logger.info("Stopping the recorder gracefully...")
-
-        self.context.push_thread_default()
-        if GLib.MainContext.get_thread_default() == self.context:
-            self.logger.info("✅ Thread default context matches self.context.")
-        else:
-            self.logger.warning("🚨 Thread default context does NOT match self.context.")
-
-        def _shutdown():
-            # Ensure we're running inside the correct GLib thread
-            if GLib.MainContext.get_thread_default() == self.context:
-                self.logger.info("🏠 Inside shutdown: correct thread context.")
-            else:
-                self.logger.warning("🚨 Inside shutdown: wrong thread context.")
-
-            # Stop the pipeline safely
-            if self.pipeline:
-                self.logger.info("✅ Stopping GStreamer pipeline...")
-                self.pipeline.set_state(Gst.State.NULL)
-                self.logger.info("Recorder stopped.")
-
-            # Quit the GLib loop
-            if self.loop and self.loop.is_running():
-                self.logger.info("🔁 Quitting main loop...")
-                self.loop.quit()
-
-            return False  # one-shot idle callback
-
-        # Schedule shutdown on the correct context
-        GLib.idle_add(_shutdown, context=self.context)
-
-        # Poke the loop in case it's idle
-        GLib.idle_add(lambda: None, context=self.context)
-
-        # Upload can safely happen here in the current thread
-        self.logger.info("✅ Gstreamer stop requested.")
-
-        if self.UPLOAD_ON_FINISH and hasattr(self, 'filename') and os.path.exists(self.filename):
-            self.logger.info(f"📤 Uploading {self.filename}...")
-            upload_file_in_chunks(self.filename)
-
-        return True
-
+        self.request_stop()
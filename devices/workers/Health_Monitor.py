@@ -1,4 +1,5 @@
 from .worker import Worker
+from utils.codec import encode_health, pack_flags
 import zenoh
 import time
 
@@ -9,7 +10,7 @@ import time
 class Health_Monitor(Worker):
     def __init__(self, device, name, DEBUG=False, verbose=False):
         super().__init__(device, name)
-        self.logger.info(f"Health INITIALIZED for device {self.device.device_id}")
+        self.logger.info(f"Health INITIALIZED for device {self.context.device_id}")
         self.verbose = verbose
 
     def run(self):
@@ -22,16 +23,27 @@ class Health_Monitor(Worker):
         zenoh_client = zenoh.open(config)
         pub = zenoh_client.declare_publisher('local/health')
 
+        binary = self.context.wire_format == "binary"
         self.logger.info("Health Publisher Running.")
-        while not self.is_stopped.value:
+        self.mark_ready()
+        while not self.stopping:
             try:
-                ping = f"{time.time()}, {self.device.device_id}, {self.device.name}, {self.device.ip}"
+                if binary:
+                    ping = encode_health(time.time(), self.context.uptime(), self.health_flags(),
+                                         self.context.device_id, self.context.name, self.context.ip)
+                else:
+                    ping = f"{time.time()}, {self.context.device_id}, {self.context.name}, {self.context.ip}"
                 pub.put(ping)
                 if self.verbose:
                     self.logger.info(f"Health Ping: {ping}")
-                time.sleep(1)
+                self.stop_event.wait(1)
             except Exception as e:
                 self.logger.error(f"Health Publisher Error: {e}")
+        zenoh_client.close()  # Safe here, the worker never inherited the parent's Zenoh runtime
+
+    def health_flags(self):
+        # One seqlock read of the device slot; flags the device doesn't define stay unset
+        return pack_flags(self.context.health_slot.read())
 
     def kill(self):
         # If Health Conditions Fail Kill the Process
@@ -0,0 +1,15 @@
+import gi
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst
+
+# ----------------------------------------
+# GStreamer
+# ----------------------------------------
+def init_gstreamer():
+    """Initialize GStreamer in this process, a no-op if it already is.
+
+    Called at the top of each camera worker's run(), never at import: loading the
+    plugin registry is the expensive part, and only processes that build
+    pipelines need it.
+    """
+    Gst.init(None)
@@ -1,13 +1,13 @@
 import os
 import argparse
 import requests
-import json
 import hmac
 import hashlib
 import time
 import base64
 from hashlib import md5
 from utils.setup_logger import setup_logger
+from utils.config_store import Config_Store
 from tenacity import retry, stop_after_attempt, wait_fixed
 import sys
 
@@ -17,50 +17,28 @@ logger = setup_logger("Upload_Service")
 # Load configuration
 def load_config():
     config_path = os.path.join(os.path.dirname(__file__), '..', '..', 'device.cfg')
-    defaults = {
-        "upload_target": "10.0.0.1",
-        "upload_port": 9001,
-        "upload_api_endpoint": "/upload_chunk",
-        "upload_api_key": "your_default_api_key",
-        "upload_secret_key": "default_secret_key",
-        "upload_chunk_size": 10  # MB
+    if not os.path.exists(config_path):
+        logger.warning(f"Could not load config: {config_path} not found. Using defaults.")
+    store = Config_Store(config_path, logger)
+
+    # Typed accessors fall back to the upload defaults for missing or malformed keys
+    upload_target = store.upload_target
+    upload_port = store.upload_port
+    upload_endpoint = store.upload_api_endpoint
+
+    # Construct full URL
+    if not upload_target.startswith('http'):
+        upload_url = f"http://{upload_target}:{upload_port}{upload_endpoint}"
+    else:
+        upload_url = f"{upload_target}{upload_endpoint}"
+
+    return {
+        "upload_url": upload_url,
+        "api_key": store.upload_api_key,
+        "secret_key": store.upload_secret_key,
+        "device_id": store.device_id or "unknown_device",
+        "chunk_size": store.upload_chunk_size * 1024 * 1024  # Convert MB to bytes
     }
-    
-    try:
-        with open(config_path, 'r') as f:
-            config = json.load(f)
-        
-        upload_target = config.get("upload_target", defaults["upload_target"])
-        upload_port = config.get("upload_port", defaults["upload_port"])
-        upload_endpoint = config.get("upload_api_endpoint", defaults["upload_api_endpoint"])
-        upload_api_key = config.get("upload_api_key", defaults["upload_api_key"])
-        upload_secret_key = config.get("upload_secret_key", defaults["upload_secret_key"])
-        upload_chunk_size = config.get("upload_chunk_size", defaults["upload_chunk_size"])
-        device_id = config.get("device_id", "unknown_device")
-        
-        # Construct full URL
-        if not upload_target.startswith('http'):
-            upload_url = f"http://{upload_target}:{upload_port}{upload_endpoint}"
-        else:
-            upload_url = f"{upload_target}{upload_endpoint}"
-            
-        return {
-            "upload_url": upload_url,
-            "api_key": upload_api_key,
-            "secret_key": upload_secret_key,
-            "device_id": device_id,
-            "chunk_size": upload_chunk_size * 1024 * 1024  # Convert MB to bytes
-        }
-        
-    except (FileNotFoundError, json.JSONDecodeError) as e:
-        logger.warning(f"Could not load config: {e}. Using defaults.")
-        return {
-            "upload_url": f"http://{defaults['upload_target']}:{defaults['upload_port']}{defaults['upload_api_endpoint']}",
-            "api_key": defaults["upload_api_key"],
-            "secret_key": defaults["upload_secret_key"],
-            "device_id": "unknown_device",
-            "chunk_size": defaults["upload_chunk_size"] * 1024 * 1024
-        }
 
 # Load configuration values
 config = load_config()
@@ -142,7 +120,12 @@ def upload_chunk(filename, chunk_index, total_chunks, chunk_data):
         logger.error(f"❌ Request failed for chunk {chunk_index + 1}/{total_chunks}: {str(e)}")
         raise
 
-def upload_file_in_chunks(filepath):
+def _count(metrics, name, amount=1):
+    """Bump a shared /metrics counter when the caller passed the device's metrics"""
+    if metrics is not None and amount:
+        metrics.families[name].inc(amount)
+
+def upload_file_in_chunks(filepath, metrics=None):
     server_avalible = False
     try:
         if not os.path.exists(filepath):
@@ -171,15 +154,21 @@ def upload_file_in_chunks(filepath):
                 try:
                     upload_chunk(filename, index, total, chunk)
                     uploaded_chunks += 1
+                    _count(metrics, "herd_upload_bytes_total", len(chunk))
                 except Exception as e:
+                    _count(metrics, "herd_upload_failures_total")
                     logger.error(f"❌ Failed to upload chunk {index + 1}/{total} after all retries: {str(e)}")
                     logger.error(f"Upload stopped. {uploaded_chunks}/{total_chunks} chunks uploaded successfully")
                     return False
+                finally:
+                    # tenacity keeps the last call's attempt count
+                    _count(metrics, "herd_upload_retries_total", upload_chunk.statistics.get("attempt_number", 1) - 1)
             
             logger.info(f"✅ All {total_chunks} chunks uploaded successfully")
             return True
         else:
             logger.error("❌ Server is not reachable. Upload aborted.")
+            _count(metrics, "herd_upload_failures_total")
             return False
         
     except FileNotFoundError:
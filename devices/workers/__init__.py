@@ -1,10 +1,18 @@
+import importlib
+
 from .worker import Worker
-from .Camera_Controller import Camera_Controller
-from .Camera_Recorder import Camera_Recorder
-from .Camera_RTPS import Camera_RTPS
-from .Config_Controller import Config_Controller
-from .Health_Monitor import Health_Monitor
-from .Upload_Service import upload_file_in_chunks
+
+# Worker modules are imported on first access, so a process only loads the stack of the
+# workers it builds or runs: gi for the cameras, FastAPI and uvicorn for the config API.
+# Worker processes unpickle their own class, which imports just that module.
+_LAZY = {
+    'Camera_Controller': '.Camera_Controller',
+    'Config_Controller': '.Config_Controller',
+    'Camera_Recorder': '.Camera_Recorder',
+    'Camera_RTPS': '.Camera_RTPS',
+    'Health_Monitor': '.Health_Monitor',
+    'upload_file_in_chunks': '.Upload_Service',
+}
 
 __all__ = [
     'Worker',
@@ -14,4 +22,16 @@ __all__ = [
     "Camera_RTPS",
     "Health_Monitor",
     "upload_file_in_chunks"
-]
\ No newline at end of file
+]
+
+
+def __getattr__(name):
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_LAZY[name], __name__), name)
+    globals()[name] = value  # Replaces the submodule of the same name the import just bound here
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
@@ -0,0 +1,508 @@
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.middleware.cors import CORSMiddleware
+
+from pydantic import BaseModel
+from typing import List, Optional
+
+from pathlib import Path
+from datetime import datetime
+import time
+import psutil
+import json
+
+import asyncio
+
+from starlette.responses import StreamingResponse, PlainTextResponse
+
+from utils.metrics_sampler import Metrics_Sampler
+from utils.codec import HEALTH_FLAGS
+from .live_status import Live_Status
+from utils.log_reader import LOG_PATH, read_tail, read_since, level_filter, format_cursor, parse_cursor, end_cursor
+from utils.log_store import parse_time, query as query_logs
+from .file_download import Ranged_File_Response
+from .static_files import Precompressed_Static_Files
+from ..metrics import Static_Family, render_families
+
+# ----------------------------------------
+# Pydantic models
+# ----------------------------------------
+class DeviceRename(BaseModel):
+    name: str
+
+class VideoSettings(BaseModel):
+    resolution: str
+    framerate: str
+
+class DeviceStatus(BaseModel):
+    device_id: str
+    name: str
+    ip: str
+    stream_fps: int
+    uptime_sec: int
+    camera_endpoint: Optional[str] = None
+    build_path: Optional[str] = None
+
+class LogEntry(BaseModel):
+    time: str
+    level: str
+    msg: str
+    error: Optional[str] = None
+    raw: Optional[str] = None
+
+class FileEntry(BaseModel):
+    name: str
+    size: Optional[str] = None
+    modified: Optional[str] = None
+    size_bytes: Optional[int] = None
+    trial: Optional[str] = None
+    camera: Optional[int] = None
+    upload_status: Optional[str] = None
+
+
+LOG_POLL_INTERVAL = 0.5  # Seconds between checks for new lines in /logs/stream
+LOG_STREAM_BATCH = 200  # Lines per read while catching up
+MAX_DOWNLOADS = 2  # Concurrent file downloads, more would compete with the recorders for the disk
+DOWNLOAD_QUEUE_TIMEOUT = 10.0  # Seconds a download waits for a free slot before a 503
+DOWNLOAD_RATE_WHILE_RECORDING = 4 * 1024 * 1024  # Bytes/s per download while a recording is running
+
+# ----------------------------------------
+# Functions
+# ----------------------------------------
+# Helper function to determine health status
+def get_health_status(cpu_usage, memory_percent, temperature):
+    """Determine overall health status based on metrics"""
+    if cpu_usage > 80 or memory_percent > 85 or temperature > 80:
+        return "Critical"
+    elif cpu_usage > 60 or memory_percent > 75 or temperature > 70:
+        return "Warning"
+    else:
+        return "Good"
+    
+# ----------------------------------------
+# Sample Data
+# ----------------------------------------
+# In-memory storage (replace with actual database/file storage)
+device_config = {
+    "device_id": "DEV001",
+    "name": "Camera Device 01",
+    "stream_fps": 30,
+    "camera_endpoint": "http://192.168.1.100:8080/stream",
+    "start_time": time.time()
+}
+
+# Sample log entries
+sample_logs = [
+    {
+        "time": "2025-01-21 10:30:15",
+        "level": "INFO",
+        "msg": "Device started successfully"
+    },
+    {
+        "time": "2025-01-21 10:30:20",
+        "level": "INFO",
+        "msg": "Camera endpoint configured"
+    },
+    {
+        "time": "2025-01-21 10:31:00",
+        "level": "WARN",
+        "msg": "Memory usage above 75%"
+    },
+    {
+        "time": "2025-01-21 10:32:15",
+        "level": "ERROR",
+        "msg": "Network connection timeout",
+        "error": "Connection timeout after 30 seconds"
+    }
+]
+
+# Sample file entries
+sample_files = [
+    {
+        "name": "config.json",
+        "size": "2.1 KB",
+        "modified": "2025-01-21 09:15:30"
+    },
+    {
+        "name": "device_logs.txt",
+        "size": "45.7 KB",
+        "modified": "2025-01-21 10:32:15"
+    },
+    {
+        "name": "video_stream.mp4",
+        "size": "1.2 GB",
+        "modified": "2025-01-21 10:30:00"
+    },
+    {
+        "name": "settings.ini",
+        "size": "512 B",
+        "modified": "2025-01-20 16:45:22"
+    }
+]
+
+# ----------------------------------------
+# FastAPI Config Server
+# ----------------------------------------
+def worker_pids(device):
+    """{worker name: pid} from the shared health block, valid in any process"""
+    return {name: fields["pid"] for name, fields in device.health.snapshot().items() if fields.get("pid")}
+
+
+def format_size(size):
+    if size < 1024**2:
+        return f"{size / 1024:.1f} KB"
+    if size < 1024**3:
+        return f"{size / (1024**2):.1f} MB"
+    return f"{size / (1024**3):.1f} GB"
+
+
+def pid_alive(pid):
+    if not pid:
+        return False
+    try:
+        return psutil.Process(pid).status() != psutil.STATUS_ZOMBIE
+    except psutil.Error:
+        return False
+
+
+def create_config_api(device, build_path: Path, sampler=None):
+    if sampler is None:
+        sampler = Metrics_Sampler(lambda: worker_pids(device), logger=device.logger)
+        sampler.sample()
+
+    app = FastAPI(
+        title="Device Configuration API",
+        description="API for device configuration and monitoring",
+        version="1.0.0"
+    )
+
+    # CORS middleware to allow React frontend
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["http://localhost:3000", "http://127.0.0.1:3000"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    ### Static Files for React Frontend
+    # .br/.gz variants when accepted, hashed assets are cached forever and the rest revalidated by ETag
+    app.mount("/static", Precompressed_Static_Files(directory=build_path / "static"), name="static")
+    build_files = Precompressed_Static_Files(directory=build_path)
+
+    @app.get("/")
+    async def serve_root(request: Request):
+        return build_files.serve("index.html", request.scope)
+
+    ### Device Status Info and Health Endpoints
+    @app.get("/status", response_model=DeviceStatus)
+    async def get_status():
+        """Get device status"""
+        try:
+            return DeviceStatus(
+                device_id=device.device_id,
+                name=device.name,
+                ip=device.ip,
+                stream_fps=device.target_framerate,
+                uptime_sec=round(time.time() - device.boot_time),
+                camera_endpoint=device.camera_endpoint,
+                build_path=str(build_path),
+            )
+        except Exception as e:
+            device.logger.error(f"Error getting status: {e}")
+            raise HTTPException(status_code=500, detail="Failed to get device status")
+        
+    @app.get("/health")
+    async def get_health():
+        """Get device health metrics from the background sampler's last snapshot"""
+        try:
+            sample = sampler.snapshot
+            memory, disk = sample["memory"], sample["disk"]
+            temperature = sample["temperature"] if sample["temperature"] is not None else 68  # Default/simulated value
+
+            return {
+                "cpu_usage": sample["cpu_percent"],
+                "cpu_per_core": sample["cpu_per_core"],
+                "memory_usage": {
+                    "used_gb": round(memory["used"] / (1024**3), 1),
+                    "total_gb": round(memory["total"] / (1024**3), 1),
+                    "percent": round(memory["percent"], 1)
+                },
+                "temperature": temperature,
+                "disk_usage": {
+                    "used_gb": round(disk["used"] / (1024**3), 1),
+                    "total_gb": round(disk["total"] / (1024**3), 1),
+                    "percent": disk["percent"]
+                },
+                "workers": sample["workers"],
+                "network_status": "Connected",
+                "overall_status": get_health_status(sample["cpu_percent"], memory["percent"], temperature),
+                "last_check": datetime.fromtimestamp(sample["time"]).strftime("%Y-%m-%d %H:%M:%S"),
+                "device_health": device.health.snapshot(),  # Lock-free read of the shared health block
+            }
+        except Exception as e:
+            device.logger.error(f"Error getting health metrics: {e}")
+            raise HTTPException(status_code=500, detail="Failed to get health metrics")
+
+    @app.get("/health/history")
+    async def get_health_history(seconds: Optional[float] = None, points: Optional[int] = 300,
+                                 aggregate: str = "mean"):
+        """Health samples from the shared ring buffer, downsampled to `points` buckets"""
+        since = time.time() - seconds if seconds else None
+        try:
+            samples = device.health_history.query(since=since, points=points, aggregate=aggregate)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return {"interval": sampler.interval, "capacity": device.health_history.capacity, "samples": samples}
+
+    ### Live Status Stream
+    def live_state():
+        flags = device.health_slot.read()
+        sample = sampler.snapshot
+        return {
+            "status": {"device_id": device.device_id, "name": device.name, "ip": device.ip,
+                       "boot_time": device.boot_time},
+            "health": {"cpu_usage": sample.get("cpu_percent"),
+                       "memory_percent": sample.get("memory", {}).get("percent"),
+                       "temperature": sample.get("temperature"), "last_check": sample.get("time")},
+            "recording": {name: flags[name] for name in HEALTH_FLAGS if name in flags},
+            "workers": {name: fields["status"] for name, fields in device.health.snapshot().items()
+                        if "status" in fields},
+        }
+
+    live = Live_Status(live_state)
+
+    @app.get("/events")
+    async def stream_events(request: Request):
+        """Server-Sent Events: a "snapshot" on connect, then "delta" events with changed keys only"""
+        return StreamingResponse(
+            live.stream(request),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    ### Prometheus Metrics
+    @app.get("/metrics")
+    async def get_metrics():
+        """Text exposition of the shared counters, plus liveness and system gauges read at scrape time"""
+        sample = sampler.snapshot
+        workers_up = [
+            ({"worker": name}, 1 if pid_alive(fields.get("pid", 0)) else 0)
+            for name, fields in device.health.snapshot().items() if name != "device"
+        ]
+        scrape = [
+            Static_Family("herd_worker_up", "gauge", "Worker process is running", workers_up),
+            Static_Family("herd_cpu_percent", "gauge", "System CPU usage", [({}, sample.get("cpu_percent", 0))]),
+            Static_Family("herd_memory_percent", "gauge", "System memory usage",
+                          [({}, sample.get("memory", {}).get("percent", 0))]),
+        ]
+        if sample.get("temperature") is not None:
+            scrape.append(Static_Family("herd_temperature_celsius", "gauge", "SoC temperature",
+                                        [({}, sample["temperature"])]))
+        body = device.metrics.render() + render_families(scrape)
+        return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
+    @app.get("/info")
+    async def get_info():
+        """Get additional device information"""
+        try:
+            return {
+                "api_version": "1.0.0",
+                "device_type": "Camera Device",
+                "firmware_version": "1.2.3",
+                "last_boot": datetime.fromtimestamp(device_config["start_time"]).strftime("%Y-%m-%d %H:%M:%S"),
+                "supported_resolutions": [
+                    "640x480",
+                    "1280x720", 
+                    "1920x1080",
+                    "2560x1440",
+                    "3840x2160"
+                ],
+                "supported_framerates": [15, 24, 30, 60, 120]
+            }
+        except Exception as e:
+            device.logger.error(f"Error getting device info: {e}")
+            raise HTTPException(status_code=500, detail="Failed to get device info")
+
+    ### Device Control Endpoints
+    @app.post("/restart")
+    async def restart_device():
+        """Restart the device"""
+        try:
+            device.logger.info("Device restart requested")
+            # Here you would implement actual device restart logic
+            # For simulation, we'll just reset the start time
+            device_config["start_time"] = time.time()
+            return {"message": "Device restart initiated"}
+        except Exception as e:
+            device.logger.error(f"Error restarting device: {e}")
+            raise HTTPException(status_code=500, detail="Failed to restart device")
+
+    ### Device Life Cycle Endpoints
+    @app.post("/rename")
+    async def rename_device(rename_data: DeviceRename):
+        """Rename the device"""
+        try:
+            device_config["name"] = rename_data.name
+            device.name = rename_data.name
+            print("Trying:", device.name)
+            device.logger.info(f"Device renamed to: {rename_data.name}")
+            return {"message": "Device renamed successfully", "name": rename_data.name}
+        except Exception as e:
+            device.logger.error(f"Error renaming device: {e}")
+            raise HTTPException(status_code=500, detail="Failed to rename device")
+
+    @app.post("/video-settings")
+    async def update_video_settings(video_settings: VideoSettings):
+        """Update video settings"""
+        try:
+            # Here you would typically update the actual video stream settings
+            # For now, we'll just log the settings
+            device.logger.info(f"Video settings updated: {video_settings.resolution} @ {video_settings.framerate} FPS")
+
+            # Update stream FPS in device config if provided
+            try:
+                device_config["stream_fps"] = int(video_settings.framerate)
+            except ValueError:
+                pass
+                
+            return {
+                "message": "Video settings updated successfully",
+                "resolution": video_settings.resolution,
+                "framerate": video_settings.framerate
+            }
+        except Exception as e:
+            device.logger.error(f"Error updating video settings: {e}")
+            raise HTTPException(status_code=500, detail="Failed to update video settings")
+
+    ### File and Log Endpoints
+    @app.get("/files", response_model=List[FileEntry])
+    async def get_files(response: Response, offset: int = 0, limit: int = 100, sort: str = "modified",
+                        order: str = "desc", trial: Optional[str] = None, camera: Optional[int] = None,
+                        upload_status: Optional[str] = None):
+        """One page of the trials index, the total match count is in X-Total-Count"""
+        try:
+            rows, total = device.file_index.query(
+                offset=max(0, offset), limit=max(1, min(limit, 1000)), sort=sort, descending=order != "asc",
+                trial=trial, camera=camera, upload_status=upload_status,
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            device.logger.error(f"Error getting files: {e}")
+            raise HTTPException(status_code=500, detail="Failed to get files")
+
+        response.headers["X-Total-Count"] = str(total)
+        return [
+            FileEntry(
+                name=row["name"],
+                size=format_size(row["size"]),
+                modified=datetime.fromtimestamp(row["mtime"]).strftime("%Y-%m-%d %H:%M:%S"),
+                size_bytes=row["size"],
+                trial=row["trial"],
+                camera=row["camera"],
+                upload_status=row["upload_status"],
+            )
+            for row in rows
+        ]
+
+    downloads = asyncio.Semaphore(MAX_DOWNLOADS)
+
+    def download_rate():
+        return DOWNLOAD_RATE_WHILE_RECORDING if device.health_slot.read().get("is_recording") else None
+
+    @app.api_route("/files/{name}/download", methods=["GET", "HEAD"])
+    async def download_file(name: str, request: Request):
+        """One recorded file, supports Range requests for seeking and resuming"""
+        root = device.file_index.root.resolve()
+        path = (root / name).resolve()
+        if path.parent != root or not device.file_index.indexable(path.name) or not path.is_file():
+            raise HTTPException(status_code=404, detail="File not found.")
+
+        try:
+            await asyncio.wait_for(downloads.acquire(), DOWNLOAD_QUEUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=503, detail="Too many downloads in progress.",
+                                headers={"Retry-After": str(int(DOWNLOAD_QUEUE_TIMEOUT))})
+        try:
+            return Ranged_File_Response(
+                path, range_header=request.headers.get("range"), if_range=request.headers.get("if-range"),
+                rate_limit=download_rate, on_close=downloads.release,
+            )
+        except OSError:
+            downloads.release()
+            raise HTTPException(status_code=404, detail="File not found.")
+
+    @app.get("/logs")
+    def get_logs(response: Response, tail: int = 200, since: Optional[str] = None,
+                 level: Optional[str] = None, limit: int = 1000, start: Optional[str] = None,
+                 end: Optional[str] = None, process: Optional[str] = None, logger: Optional[str] = None):
+        """Last `tail` lines, or the lines after cursor `since`. Resume from X-Log-Offset.
+
+        With start/end (epoch, ISO or HH:MM), process or logger the rotated segments are
+        searched as well, through their time index.
+        """
+        try:
+            if start or end or process or logger:
+                return query_logs(start=parse_time(start), end=parse_time(end), level=level,
+                                  process=process, logger=logger, limit=max(1, min(limit, 10000)))
+            if since is None:
+                entries, offset = read_tail(LOG_PATH, max(1, min(tail, limit)), level)
+            else:
+                entries, offset = read_since(LOG_PATH, since, max(1, limit), level)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="Log file not found.")
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        response.headers["X-Log-Offset"] = str(offset)
+        return entries
+
+    @app.get("/logs/stream")
+    async def stream_logs(request: Request, since: Optional[str] = None, level: Optional[str] = None):
+        """SSE live tail. Each event id is the line's cursor, so reconnects resume after it."""
+        try:
+            level_filter(level)
+            if since is not None:
+                parse_cursor(since)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        last_event_id = request.headers.get("last-event-id")
+        try:
+            resume_after = parse_cursor(last_event_id) if last_event_id else None
+        except ValueError:
+            resume_after = None
+        if resume_after is not None:
+            offset = last_event_id
+        elif since is not None:
+            offset = since
+        else:
+            try:
+                offset = end_cursor(LOG_PATH)
+            except FileNotFoundError:
+                offset = "0"
+
+        async def events():
+            nonlocal offset
+            idle = 0.0
+            while not await request.is_disconnected():
+                try:
+                    entries, offset = read_since(LOG_PATH, offset, LOG_STREAM_BATCH, level)
+                except FileNotFoundError:
+                    entries = []
+                inode = parse_cursor(offset)[0]
+                for entry in entries:
+                    if resume_after in ((inode, entry["offset"]), (None, entry["offset"])):
+                        continue  # The client already has this line
+                    yield f"id: {format_cursor(inode, entry['offset'])}\nevent: log\ndata: {json.dumps(entry)}\n\n"
+                if entries:
+                    idle = 0.0
+                    continue
+                await asyncio.sleep(LOG_POLL_INTERVAL)
+                idle += LOG_POLL_INTERVAL
+                if idle >= 15:
+                    idle = 0.0
+                    yield ": keepalive\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream",
+                                 headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+    return app
@@ -0,0 +1,119 @@
+import asyncio
+import mimetypes
+import os
+from email.utils import formatdate
+from urllib.parse import quote
+
+import anyio
+from starlette.responses import Response
+
+CHUNK_SIZE = 256 * 1024  # Bytes per send, also the throttling granularity
+
+# ----------------------------------------
+# Range Requests
+# ----------------------------------------
+class Range_Not_Satisfiable(Exception):
+    pass
+
+
+def parse_range(header, size):
+    """Single "bytes=" range -> (start, end) inclusive, None to serve the whole file.
+
+    Multi-range and malformed headers are ignored, which RFC 9110 allows.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    first, _, last = header[len("bytes="):].strip().partition("-")
+    try:
+        if first == "":
+            suffix = int(last)
+            if suffix <= 0 or size == 0:
+                raise Range_Not_Satisfiable()  # An empty file has no last N bytes
+            return max(0, size - suffix), size - 1
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size or start > end:
+        raise Range_Not_Satisfiable()
+    return start, end
+
+# ----------------------------------------
+# Response
+# ----------------------------------------
+class Ranged_File_Response(Response):
+    """File download with Range support that hands the bytes to sendfile when it can.
+
+    Uses the ASGI "http.response.zerocopysend" extension if the server offers it,
+    otherwise reads with os.pread in a worker thread. `rate_limit` (bytes/s or
+    None) is checked before every chunk so a download can be slowed mid-transfer.
+    """
+    def __init__(self, path, range_header=None, if_range=None, rate_limit=None, on_close=None):
+        self.path = path
+        self.rate_limit = rate_limit or (lambda: None)
+        self.on_close = on_close
+        self.background = None
+
+        stat = os.stat(path)
+        self.size = stat.st_size
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        self.start, self.end = 0, self.size - 1
+        self.status_code = 200
+
+        headers = {
+            "accept-ranges": "bytes",
+            "etag": etag,
+            "last-modified": formatdate(stat.st_mtime, usegmt=True),
+            "content-type": mimetypes.guess_type(path)[0] or "application/octet-stream",
+            "content-disposition": f"attachment; filename*=utf-8''{quote(os.path.basename(path))}",
+        }
+        if if_range is None or if_range == etag:  # A stale If-Range means "send it all"
+            try:
+                byte_range = parse_range(range_header, self.size)
+            except Range_Not_Satisfiable:
+                self.status_code = 416
+                headers["content-range"] = f"bytes */{self.size}"
+                byte_range = None
+                self.start, self.end = 0, -1
+            if byte_range is not None:
+                self.start, self.end = byte_range
+                self.status_code = 206
+                headers["content-range"] = f"bytes {self.start}-{self.end}/{self.size}"
+        headers["content-length"] = str(self.end - self.start + 1)
+        self.init_headers(headers)
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            if scope.get("method") == "HEAD" or self.end < self.start:
+                await send({"type": "http.response.body", "body": b""})
+                return
+            zerocopy = "http.response.zerocopysend" in scope.get("extensions", {})
+            with open(self.path, "rb") as f:
+                offset, remaining = self.start, self.end - self.start + 1
+                while remaining > 0:
+                    count = min(CHUNK_SIZE, remaining)
+                    remaining -= count
+                    if zerocopy:
+                        size = os.fstat(f.fileno()).st_size
+                        if size < offset + count:
+                            self._short(size)
+                        await send({"type": "http.response.zerocopysend", "file": f, "offset": offset,
+                                    "count": count, "more_body": remaining > 0})
+                    else:
+                        chunk = await anyio.to_thread.run_sync(os.pread, f.fileno(), count, offset)
+                        if len(chunk) < count:
+                            self._short(offset + len(chunk))
+                        await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+                    offset += count
+                    rate = self.rate_limit()
+                    if rate:
+                        await asyncio.sleep(count / rate)
+        finally:
+            if self.on_close is not None:
+                self.on_close()
+
+    def _short(self, at):
+        """The file shrank under the transfer. Raising aborts the connection, so the client
+        sees a failed download instead of one shorter than its content-length."""
+        raise OSError(f"{self.path} ends at byte {at}, {self.end + 1} were promised")
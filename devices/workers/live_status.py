@@ -0,0 +1,84 @@
+import asyncio
+import json
+
+CLIENT_QUEUE = 16  # Events buffered per client before it is resynced with a snapshot
+
+# ----------------------------------------
+# Live Status (Server-Sent Events)
+# ----------------------------------------
+def diff_state(old, new):
+    """Per-section keys of `new` that differ from `old`"""
+    delta = {}
+    for section, values in new.items():
+        previous = old.get(section, {})
+        changed = {key: value for key, value in values.items() if previous.get(key) != value}
+        if changed:
+            delta[section] = changed
+    return delta
+
+
+class Live_Status:
+    """One producer polls `collect` and pushes changes to every SSE client.
+
+    The producer only runs while at least one client is connected. New clients
+    start with a full "snapshot" event, then receive "delta" events holding just
+    the keys that changed. A client too slow to keep up is resynced with a snapshot.
+    """
+    def __init__(self, collect, interval=0.5, keepalive=15.0):
+        self.collect = collect  # () -> {section: {key: value}}
+        self.interval = interval
+        self.keepalive = keepalive
+        self._clients = set()
+        self._state = {}
+        self._task = None
+
+    @property
+    def clients(self):
+        return len(self._clients)
+
+    def subscribe(self):
+        queue = asyncio.Queue(maxsize=CLIENT_QUEUE)
+        if self._task is None:
+            self._state = self.collect()
+            self._task = asyncio.get_running_loop().create_task(self._produce())
+        queue.put_nowait(("snapshot", self._state))
+        self._clients.add(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        self._clients.discard(queue)
+
+    def _publish(self, event, data):
+        for queue in self._clients:
+            if queue.full():
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(("snapshot", self._state))
+            else:
+                queue.put_nowait((event, data))
+
+    async def _produce(self):
+        try:
+            while self._clients:
+                await asyncio.sleep(self.interval)
+                state = self.collect()
+                delta = diff_state(self._state, state)
+                self._state = state
+                if delta:
+                    self._publish("delta", delta)
+        finally:
+            self._task = None
+
+    async def stream(self, request):
+        """text/event-stream body for one client"""
+        queue = self.subscribe()
+        try:
+            while not await request.is_disconnected():
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), self.keepalive)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        finally:
+            self.unsubscribe(queue)
@@ -0,0 +1,139 @@
+import gzip
+import mimetypes
+import os
+import re
+
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+try:
+    import brotli
+except ImportError:  # Only .gz variants are generated and served without it
+    brotli = None
+
+# Build output with a content hash in the name (main.3f2a1b4c.js, 453.a1b2c3d4.chunk.css)
+# never changes, anything else is revalidated against its ETag on every load.
+HASHED_ASSET = re.compile(r"\.[0-9a-f]{8,}\.(?:chunk\.)?\w+$")
+CACHE_IMMUTABLE = "public, max-age=31536000, immutable"
+CACHE_REVALIDATE = "no-cache"
+
+COMPRESSIBLE = {".js", ".css", ".html", ".json", ".map", ".svg", ".txt", ".ico", ".webmanifest"}
+MIN_COMPRESS_SIZE = 1024  # Bytes, smaller files are not worth a variant
+
+# (Content-Encoding, file suffix, compress), in order of preference
+ENCODINGS = [("gzip", ".gz", lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+if brotli is not None:
+    ENCODINGS.insert(0, ("br", ".br", lambda data: brotli.compress(data, quality=11)))
+
+# ----------------------------------------
+# Precompression
+# ----------------------------------------
+def precompress(directory, logger=None):
+    """Write .br/.gz next to every compressible file whose variant is missing or stale.
+
+    Run after `npm run build` or on first start, repeated runs only redo changed
+    files. A variant that would not be smaller than the original is skipped.
+    """
+    written = 0
+    for root, _, names in os.walk(directory):
+        for name in names:
+            path = os.path.join(root, name)
+            if os.path.splitext(name)[1] not in COMPRESSIBLE:
+                continue
+            source = os.stat(path)
+            if source.st_size < MIN_COMPRESS_SIZE:
+                continue
+            data = None
+            for _, suffix, compress in ENCODINGS:
+                target = path + suffix
+                try:
+                    if os.stat(target).st_mtime >= source.st_mtime:
+                        continue
+                except FileNotFoundError:
+                    pass
+                if data is None:
+                    with open(path, "rb") as f:
+                        data = f.read()
+                compressed = compress(data)
+                if len(compressed) >= len(data):
+                    continue
+                temp = target + ".tmp"
+                with open(temp, "wb") as f:
+                    f.write(compressed)
+                os.replace(temp, target)  # Never serve a half written variant
+                written += 1
+    if logger and written:
+        logger.info(f"Precompressed {written} frontend files in {directory}")
+    return written
+
+
+def accepted_encodings(header):
+    """Codings from an Accept-Encoding header, minus any with q=0"""
+    accepted = set()
+    for part in (header or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if coding:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+# ----------------------------------------
+# Static Files
+# ----------------------------------------
+def cache_control(path):
+    return CACHE_IMMUTABLE if HASHED_ASSET.search(os.path.basename(path)) else CACHE_REVALIDATE
+
+
+class Precompressed_Static_Files(StaticFiles):
+    """StaticFiles that serves a .br/.gz variant when the client accepts it.
+
+    Every response carries Vary: Accept-Encoding and a Cache-Control chosen by
+    name. Each variant has its own strong ETag, so If-None-Match gets a 304
+    whichever encoding the client cached.
+    """
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        request_headers = Headers(scope=scope)
+        accepted = accepted_encodings(request_headers.get("accept-encoding"))
+        media_type = mimetypes.guess_type(str(full_path))[0] or "text/plain"
+
+        response = None
+        for encoding, suffix, _ in ENCODINGS:
+            if encoding not in accepted:
+                continue
+            try:
+                variant = os.stat(f"{full_path}{suffix}")
+            except FileNotFoundError:
+                continue
+            if variant.st_mtime >= stat_result.st_mtime:  # An older variant is from a previous build
+                response = FileResponse(f"{full_path}{suffix}", status_code=status_code, stat_result=variant,
+                                        media_type=media_type, headers={"content-encoding": encoding})
+                break
+        if response is None:
+            response = FileResponse(full_path, status_code=status_code, stat_result=stat_result,
+                                    media_type=media_type)
+
+        response.headers["vary"] = "Accept-Encoding"
+        response.headers["cache-control"] = cache_control(full_path)
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+    def serve(self, name, scope):
+        """Response for one file of the directory, for routes outside the mount"""
+        full_path, stat_result = self.lookup_path(name)
+        if stat_result is None:
+            raise HTTPException(status_code=404)
+        return self.file_response(full_path, stat_result, scope)
+
+
+if __name__ == "__main__":
+    import sys
+    precompress(sys.argv[1] if len(sys.argv) > 1 else "frontend/build")
@@ -1,10 +1,16 @@
-from multiprocessing import Process, Value
+import logging
+import signal
 import time
+from multiprocessing import Event, Pipe, Process
+
+from ..metrics import Log_Counter
+from ..shutdown import STOP_DEADLINE, stop_processes
 
 class Worker(Process):
     def __init__(self, device, name, DEBUG=False, LETHAL=False):
         super().__init__()
-        self.device = device
+        # Only the Worker_Context goes with the process, `device` is used here in the parent
+        self.context = device.context
         self.logger = device.logger
 
         self.DEBUG = DEBUG
@@ -12,40 +18,93 @@ class Worker(Process):
         
         self.name = name
 
-        self.is_stopped = self.device.is_stopped
+        self.is_stopped = self.context.is_stopped  # Device wide
+        self.stop_event = Event()  # This worker only, e.g. one recorder at the end of a trial
+
+        # Readiness: dependents are only started once every worker in `depends_on` called mark_ready()
+        self.depends_on = []
+        self.ready = Event()
+        self.ready_signal, self._ready_sender = Pipe(duplex=False)  # Lets the parent wait on ready and exit together
+
+        self.health = device.health.slot(name)  # This worker's slot in the shared health block
+        self._health_ = self.health.field("status", int, 0)  # Health status: 0=OK, 1=Warning, 2=Error
+        self._health_pid = self.health.field("pid", int, 0)  # Lets other processes find this worker
+        self._metric_starts = device.metrics.families["herd_worker_starts_total"].labels(worker=name)
+
+        # Boot timeline, wall clock times kept in the health slot so any process can read them
+        self.milestones = {}
+        self.milestone("started")
+        self.milestone("ready")
+
+    def __getstate__(self):
+        # Pickled for the spawn and forkserver start methods, dependencies are the parent's business (and may be running)
+        state = self.__dict__.copy()
+        state["depends_on"] = []
+        return state
+
+    def __setstate__(self, state):
+        # In the new worker process: Ctrl+C reaches the whole process group, the parent stops the workers
+        self.__dict__.update(state)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        # Count this process's log records in its own row, keyed by its health slot
+        root = logging.getLogger()
+        if not any(isinstance(h, Log_Counter) for h in root.handlers):
+            root.addHandler(Log_Counter(self.context.metrics.families["herd_log_records_total"], self.health.index))
+
+    def start(self):
+        self.health.update(**{f"{name}_at": 0.0 for name in self.milestones})  # A reused slot, e.g. the next recorder
+        self.mark("started")
+        super().start()
+        self._health_pid.value = self.pid
+        self._metric_starts.inc()
+
+    def milestone(self, name):
+        """Register a boot milestone, before the worker starts"""
+        self.milestones[name] = self.health.field(f"{name}_at", float, 0.0)
 
-        self._health_ = Value("i", 0)  # Health status: 0=OK, 1=Warning, 2=Error
+    def mark(self, name):
+        """Record when a milestone was first reached"""
+        field = self.milestones[name]
+        if not field.value:
+            field.value = time.time()
+
+    def milestones_reached(self):
+        values = self.health.read()
+        return {name: values[f"{name}_at"] for name in self.milestones if values[f"{name}_at"]}
+
+    def mark_ready(self):
+        """Called from run() once the worker can serve its dependents"""
+        if self.ready.is_set():
+            return
+        self.mark("ready")
+        self.ready.set()
+        self._ready_sender.send_bytes(b"")
+
+    @property
+    def stopping(self):
+        return self.stop_event.is_set() or self.is_stopped.value
+
+    def request_stop(self):
+        """Ask the process to stop, returns at once. run() loops watch `stopping`."""
+        self.stop_event.set()
 
     def run(self):
-        while not self.is_stopped.value:
-            time.sleep(1)
+        self.mark_ready()
+        while not self.stopping:
+            self.stop_event.wait(1)
             self.logger.info(f"Process {self.name} is running")
 
-    def stop(self):
-        if not self.is_stopped.value:
-            self.is_stopped.value = True
-
-        self.logger.info(f"[{self.device.device_id}][{self.name}] Stopping ...")
-        
-        time.sleep(1)  # Give some time for the process to stop gracefully
-        self.terminate()
-        self.logger.info(f"Process {self.name} has ended")
+    def stop(self, deadline=STOP_DEADLINE):
+        """Stop this worker alone, escalating to SIGTERM/SIGKILL past the deadline"""
+        self.logger.info(f"[{self.context.device_id}][{self.name}] Stopping ...")
+        return stop_processes([self], deadline, self.logger).get(self.name)
 
     def get_health_values(self):
-        health_values = {
-            k: v
-            for k, v in vars(self).items()
-            if k.startswith('_health_')
-        }
-        self.logger.info(f"Health Values for {self.name}:")
-        for key, value in health_values.items():
-            # Handle Synchronized wrapper types (multiprocessing.Value, etc.)
-            if hasattr(value, "value"):
-                self.logger.info(f"{key}: {value.value}")
-            else:
-                self.logger.info(f"{key}: {value}")
+        health_values = self.health.read()
+        self.logger.info(f"Health Values for {self.name}: {health_values}")
         return health_values
 
     def kill_device(self):
+        # The Device lives in the parent, a worker can only raise the device wide stop flag
         if self.LETHAL:
-            self.device.stop()
+            self.is_stopped.value = True
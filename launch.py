@@ -1,8 +1,15 @@
 
 
+import multiprocessing
 import signal
 import sys
-import time
+
+from devices.worker_context import START_METHOD, FORKSERVER_PRELOAD
+
+if __name__ == "__main__":
+    # Before anything creates a queue or lock, so they can be handed to the workers
+    multiprocessing.set_start_method(START_METHOD)
+    multiprocessing.set_forkserver_preload(FORKSERVER_PRELOAD)
 
 from devices.device_camera import Camera
 from utils.setup_logger import setup_logger
@@ -13,7 +20,7 @@ from utils.setup_logger import setup_logger
 # ----------------------------------------
 # Signal Handling
 # ----------------------------------------
-logger = setup_logger("Main")
+logger = None  # Set in __main__, spawned workers may import this module too
 devices = []
 _shutdown_triggered = False  # Global guard
 
@@ -33,27 +40,24 @@ def signal_handler(sig, frame):
         except Exception as e:
             logger.warning(f"Error during shutdown: {e}")
 
-    # Optional: give time for logs to flush
-    time.sleep(2)
-
-    # DO NOT raise the signal again — just exit cleanly
+    # DO NOT raise the signal again — just exit cleanly (the log listener drains at exit)
     sys.exit(0)
 
-# Register signal only once
-signal.signal(signal.SIGINT, signal_handler)
-
 # ----------------------------------------
 # Launch
 # ----------------------------------------
 if __name__ == "__main__":
+    logger = setup_logger("Main")
+    # Register signal only once
+    signal.signal(signal.SIGINT, signal_handler)
+
     camera = Camera(logger=logger, cameras=[0], DEBUG=False)
     devices = [
         camera
     ]
     for device in devices:
-        device.start()
+        device.start()  # Returns once every worker is ready
 
-    time.sleep(10)  # Allow some time for devices to initialize
     # camera.put_command("start_recorder", None)
     # time.sleep(5)  # Allow some time for the recorder to start
     camera.get_health_values()
@@ -1,12 +1,13 @@
 import signal
 import sys
-import pathlib
 import zenoh
 import time
 import socket
 import logging
 import json
 
+from utils.codec import encode_iff  # IFF.service puts the repo root on PYTHONPATH
+
 CONFIG_PATH = "/home/sheepdog/Herd_OS/device.cfg"
 LOGGER_PATH = "/home/sheepdog/Herd_OS/service_logs.txt"
 HOSTNAME = socket.gethostname()
@@ -42,12 +43,16 @@ class IFF_Device_Prototype:
         self.name = config.get('device_name', 'Unnamed_IFF')
         self.hostname = HOSTNAME
         self.ip = self.check_ip()
+        self.binary = config.get('wire_format', 'json') == 'binary'
 
     def listen(self):
         """Placeholder for listening logic"""
         logger.info(f"Listening on {self.ip}:{self.port}")
 
     def ping(self):
+        if self.binary:
+            return encode_iff(time.time(), self.device_id, self.name, self.ip, self.hostname)
+
         ping_message = {
             "device_id": self.device_id,
             "name": self.name,
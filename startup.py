@@ -2,22 +2,40 @@ import subprocess
 import sys
 import os
 import time
+import json
+import signal
+import threading
 import logging
+import urllib.request
 from datetime import datetime
 import ntplib
 from rich.console import Console
 from rich.logging import RichHandler
 from rich.text import Text
 import hashlib
-import json
 import uuid
 
+from utils.config_store import Config_Store
+from utils.log_store import LOG_DIR, ACTIVE_NAME, STARTUP_NAME, Json_Formatter
+from devices.boot import format_timeline
+from devices.workers.Config_Controller import CONFIG_API_PORT
+
 BRANCH = "main"
 MAX_RETRIES = 5
 RETRY_DELAY = 60  # seconds
-LOG_FILE = "logs.txt"
+GIT_TIMEOUT = 30  # Longest any one git command may take, a dead network fails the check instead of hanging it
+NTP_TIMEOUT = 3  # seconds
+LOG_FILE = os.path.join(LOG_DIR, ACTIVE_NAME)  # Appended before launch.py starts the log listener, which indexes it
+STARTUP_LOG = os.path.join(LOG_DIR, STARTUP_NAME)  # Once the listener owns LOG_FILE it is the only writer, and copies this in
 VENV = "myvenv"
 
+STATUS_URL = f"http://127.0.0.1:{CONFIG_API_PORT}/health"  # Config API of the running stack
+STATUS_TIMEOUT = 2  # seconds
+STACK_UP_TIMEOUT = 60  # Longest wait for the config API to answer after launch
+STACK_POLL = 0.25  # Seconds between config API checks while the stack boots
+SAFE_POLL = 30  # Seconds between "is a trial running" checks while an update waits
+STOP_TIMEOUT = 15  # Seconds launch.py gets after SIGINT before it is killed
+
 def in_venv():
     return sys.prefix != sys.base_prefix
 
@@ -48,10 +66,10 @@ SCRIPT_COLOR = pastel_color_from_name(SCRIPT_NAME)
 logger = logging.getLogger("AutoUpdater")
 logger.setLevel(logging.DEBUG)
 
-# File handler with standard formatting for log file
-file_formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(message)s')
+# File handler writing the same JSON lines as the log listener
+os.makedirs(LOG_DIR, exist_ok=True)
 file_handler = logging.FileHandler(LOG_FILE)
-file_handler.setFormatter(file_formatter)
+file_handler.setFormatter(Json_Formatter())
 
 # Rich console handler with script indicator
 class RichHandlerWithScript(RichHandler):
@@ -84,8 +102,8 @@ logger.addHandler(rich_handler)
 # -------------------------
 # Functions
 # -------------------------
-def run_cmd(cmd):
-    result = subprocess.run(cmd, capture_output=True, text=True)
+def run_cmd(cmd, timeout=GIT_TIMEOUT):
+    result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
     if result.returncode != 0:
         raise RuntimeError(f"Command failed: {' '.join(cmd)}\n{result.stderr}")
     return result.stdout.strip()
@@ -98,14 +116,19 @@ def has_updates():
     if local != remote:
         need_update = True
 
-    # Check submodules for updates
-    # Fetch submodule remotes
-    run_cmd(["git", "submodule", "update", "--remote", "--init", "--recursive"])
-    # Check if any submodule is not up to date
+    # Check submodules for updates without checking anything out, the stack is running from this tree
     sub_status = run_cmd(["git", "submodule", "status", "--recursive"])
     for line in sub_status.splitlines():
         if line.startswith('+') or line.startswith('-'):
             need_update = True
+    # Fetch submodule remotes, "<path> <checked out> <remote>" per submodule
+    heads = run_cmd(["git", "submodule", "foreach", "--quiet", "--recursive",
+                     f"git fetch --quiet origin && echo $sm_path $(git rev-parse HEAD origin/{BRANCH})"])
+    for line in heads.splitlines():
+        path, checked_out, upstream = line.split()
+        if checked_out != upstream:
+            logger.info(f"[yellow]Submodule {path} is behind origin/{BRANCH}[/yellow]")
+            need_update = True
     return need_update
 
 def pull_and_restart():
@@ -137,14 +160,14 @@ def pull_and_restart():
                 logger.info(f"[magenta]Submodule status {status_char}: {sub_info}[/magenta]")
 
         logger.info("[bold yellow]🔄 Updating submodules...[/bold yellow]")
-        run_cmd(["git", "submodule", "update", "--init", "--recursive"])
+        run_cmd(["git", "submodule", "update", "--remote", "--init", "--recursive"])
         # git pull origin heads/main
         logger.info("[bold green]✅ Submodules updated.[/bold green]")
 
         logger.info("[bold green]Restarting...[/bold green]")
     except Exception as e:
         logger.error(f"[bold red]❌ Update or submodule update failed: {e}[/bold red]")
-        sys.exit(1)
+        return  # The caller starts the current version again
 
     python = sys.executable
     os.execv(python, [python] + sys.argv)
@@ -156,7 +179,7 @@ def sync_time_from_nist():
     try:
         client = ntplib.NTPClient()
         before = time.time()
-        response = client.request('time.nist.gov', version=3)
+        response = client.request('time.nist.gov', version=3, timeout=NTP_TIMEOUT)
         nist_time = response.tx_time
         after = time.time()
         delta_before = nist_time - before
@@ -168,14 +191,16 @@ def sync_time_from_nist():
     
         if delta_before > 0.1:
             logger.warning("You may want to add that HW update for time sync to your startup script.. tsk tsk tsk")
+        return True
     
     except Exception as e:
         logger.warning(f"[yellow]NIST time sync failed: {e}[/yellow]")
+        return False
 
 def get_version():
     try:
         # Use `git describe` if you use tags, otherwise fallback to short hash
-        return run_cmd(["git", "describe", "--always", "--dirty"])
+        return run_cmd(["git", "describe", "--always", "--dirty"], timeout=5)
     except Exception as e:
         logger.warning(f"Could not determine version: {e}")
         return "unknown"
@@ -185,24 +210,17 @@ def has_local_changes():
     return bool(status.strip())
 
 def startup_device_id():
-    device_id = None
-    if os.path.exists(CFG_FILE):
-        try:
-            with open(CFG_FILE, "r") as f:
-                data = json.load(f)
-                device_id = data.get("device_id")
-        except Exception as e:
-            logger.warning(f"[yellow]Failed to read {CFG_FILE}: {e}[/yellow]")
+    store = Config_Store(CFG_FILE, logger)
+    device_id = store.device_id
 
-    if not device_id or device_id is None or device_id == "":
+    if not device_id:
         device_id = str(uuid.uuid4())
-        try:
-            with open(CFG_FILE, "w") as f:
-                json.dump({"device_id": device_id}, f)
-            logger.info(f"[green]Generated new device_id: {device_id}[/green]")
-        except Exception as e:
-            logger.error(f"[red]Failed to write {CFG_FILE}: {e}[/red]")
+        # Merge the new ID into device.cfg, keeping every other key
+        store.update(device_id=device_id)
+        if not store.flush():
+            logger.error(f"[red]Failed to write {CFG_FILE}[/red]")
             sys.exit(1)
+        logger.info(f"[green]Generated new device_id: {device_id}[/green]")
     else:
         logger.info(f"[cyan]Device ID: {device_id}[/cyan]")
 
@@ -212,41 +230,175 @@ def startup_device_id():
 CFG_FILE = "./device.cfg"
 
 # -------------------------
-# Main logic
+# Boot Timeline
 # -------------------------
-def main_loop():
-    logger.info("\n\n[bold blue]🐑 Starting Herd OS...[/bold blue]")
-    logger.info(f"[green]Version {get_version()}[/green] | [cyan]Branch: {BRANCH}[/cyan] \n")
+class Boot_Timeline:
+    """When each boot phase started and how long it took, phases may overlap"""
+    def __init__(self):
+        self.start = time.monotonic()
+        self.events = []
+        self.lock = threading.Lock()
+
+    def record(self, name, started, ok=True):
+        outcome = "done" if ok is not False else "failed"
+        with self.lock:
+            self.events.append((round(started - self.start, 3), name, f"{outcome} in {time.monotonic() - started:.3f}s"))
+
+    def background(self, name, target, *args):
+        """Run one phase in a daemon thread, a False return counts as failed"""
+        def run():
+            started = time.monotonic()
+            ok = False
+            try:
+                ok = target(*args)
+            finally:
+                self.record(name, started, ok)
+        thread = threading.Thread(target=run, name=name, daemon=True)
+        thread.start()
+        return thread
+
+    def log_when_done(self, threads):
+        def report():
+            for thread in threads:
+                thread.join()
+            with self.lock:
+                events = sorted(self.events)
+            logger.info("[bold blue]⏱️ Boot timeline:[/bold blue]\n" + format_timeline(events))
+        threading.Thread(target=report, name="boot_timeline", daemon=True).start()
 
-    startup_device_id()
+# -------------------------
+# Camera Stack
+# -------------------------
+def use_startup_log():
+    """From launch on the log listener of launch.py owns LOG_FILE, this script appends to STARTUP_LOG.
+    The listener copies those records into the log store, so /logs shows them too."""
+    if file_handler not in logger.handlers:
+        return
+    logger.removeHandler(file_handler)
+    file_handler.close()
+    startup_handler = logging.FileHandler(STARTUP_LOG)
+    startup_handler.setFormatter(Json_Formatter())
+    logger.addHandler(startup_handler)
+
+def launch_stack():
+    use_startup_log()
+    python = sys.executable
+    return subprocess.Popen([python, "launch.py"])
 
+def stack_status():
+    """The config API's /health, None while it does not answer"""
+    try:
+        with urllib.request.urlopen(STATUS_URL, timeout=STATUS_TIMEOUT) as response:
+            return json.load(response)
+    except (OSError, ValueError):
+        return None
+
+def wait_for_stack(stack, timeout=STACK_UP_TIMEOUT):
+    """True once the config API answers, False if the stack exits or the timeout passes first"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline and stack.poll() is None:
+        if stack_status() is not None:
+            return True
+        time.sleep(STACK_POLL)
+    logger.warning(f"[yellow]Config API not answering {timeout}s after launch.[/yellow]")
+    return False
+
+def trial_running():
+    """True or False from the stack's health flags, None if the stack can't tell"""
+    status = stack_status()
+    if status is None:
+        return None
+    flags = status.get("device_health", {}).get("device", {})
+    return bool(flags.get("is_recording") or flags.get("in_trial"))
+
+def stop_stack(stack):
+    if stack.poll() is not None:
+        return
+    logger.info("[bold yellow]🛑 Stopping the camera stack...[/bold yellow]")
+    stack.send_signal(signal.SIGINT)  # launch.py stops every device on Ctrl+C
+    try:
+        stack.wait(STOP_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        logger.warning(f"[yellow]Stack still running {STOP_TIMEOUT}s after SIGINT, killing it.[/yellow]")
+        stack.kill()
+        stack.wait()
+
+def supervise(stack, update_ready):
+    """Wait on the stack. Returns its exit code, or None once it was stopped for a pending update."""
+    while True:
+        try:
+            return stack.wait(SAFE_POLL if update_ready.is_set() else 1.0)
+        except subprocess.TimeoutExpired:
+            pass
+        if update_ready.is_set():
+            running = trial_running()
+            if running is False:
+                stop_stack(stack)
+                return None
+            logger.debug("Update pending, waiting for the trial to end." if running else
+                         "Update pending, the stack can't report whether a trial is running.")
+
+# -------------------------
+# Update Check
+# -------------------------
+def check_for_updates(update_ready):
     retries = 0
     while retries < MAX_RETRIES:
         try:
             if has_updates():
-                pull_and_restart()
-            break  # No updates, continue
+                logger.info("[bold yellow]🔄 Update available, applying it once no trial is running.[/bold yellow]")
+                update_ready.set()
+            return True
         except Exception as e:
             retries += 1
             logger.warning(f"[yellow]Update check failed ({retries}/{MAX_RETRIES}): {e}[/yellow]")
-            time.sleep(RETRY_DELAY)
-    else:
-        logger.error("[red]Maximum retry limit reached. Exiting.[/red]")
-        sys.exit(1)
+            if retries < MAX_RETRIES:
+                time.sleep(RETRY_DELAY)
+    logger.error("[red]Maximum retry limit reached, running the installed version.[/red]")
+    return False
 
-    # Perform self-check and time sync after update check
-    self_check()
+# -------------------------
+# Main logic
+# -------------------------
+def main_loop():
+    timeline = Boot_Timeline()
+    logger.info("\n\n[bold blue]🐑 Starting Herd OS...[/bold blue]")
+    logger.info(f"[green]Version {get_version()}[/green] | [cyan]Branch: {BRANCH}[/cyan] \n")
 
-    # Sync time from NIST / GPS
-    sync_time_from_nist()
+    started = time.monotonic()
+    startup_device_id()  # launch.py reads the ID, the one step that has to come first
+    self_check()
+    timeline.record("device id", started)
 
-    # LAUNCH:
+    # LAUNCH: right away, updates and time sync don't hold up the cameras
     logger.info("[bold green]✅ Setup Passed. Starting main application...[/bold green]")
-
-    python = sys.executable
-    os.execv(python, [python, "launch.py"])
-
-    logger.info("[bold green]Startup completed successfully.[/bold green]")
+    started = time.monotonic()
+    stack = launch_stack()
+    timeline.record("launch", started)
+
+    update_ready = threading.Event()
+    timeline.log_when_done([
+        timeline.background("config API up", wait_for_stack, stack),
+        # Sync time from NIST / GPS
+        timeline.background("time sync", sync_time_from_nist),
+        timeline.background("update check", check_for_updates, update_ready),
+    ])
+
+    while True:
+        try:
+            code = supervise(stack, update_ready)
+        except KeyboardInterrupt:
+            # Ctrl+C reached launch.py as well, let it finish stopping
+            stop_stack(stack)
+            sys.exit(0)
+        if not update_ready.is_set():
+            logger.info(f"Camera stack exited with code {code}.")
+            sys.exit(code)
+
+        pull_and_restart()  # Restarts this script on success
+        update_ready.clear()
+        logger.warning("[yellow]Starting the installed version again.[/yellow]")
+        stack = launch_stack()
 
 if __name__ == "__main__":
     main_loop()
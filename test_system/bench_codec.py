@@ -0,0 +1,73 @@
+# python -m test_system.bench_codec --count 100000
+# Encode/decode throughput and payload size, binary codec vs the JSON each message used before.
+
+import argparse
+import json
+import socket
+import time
+
+from utils import codec
+from utils.command_protocol import make_request, make_reply, encode, decode
+
+DEVICE_ID = "dev-234567"
+NAME = "Gait Camera 0"
+IP = "192.168.4.23"
+
+
+def samples():
+    now = time.time()
+    health_result = {
+        "_health_camera_is_ready": True, "_health_in_trial": False, "_health_is_recording": True,
+        "command_latency": {"status": {"queue_wait": {"count": 12, "p50_ms": 0.5}, "execution": {"count": 12, "p50_ms": 1}}},
+    }
+    return {
+        "command": (
+            lambda: json.dumps(make_request("start_trial", {"trial_name": "T_001"}, "c" * 32, "reply/" + "r" * 32)).encode(),
+            lambda: encode(make_request("start_trial", {"trial_name": "T_001"}, "c" * 32, "reply/" + "r" * 32)),
+            lambda payload: decode(payload),
+        ),
+        "reply": (
+            lambda: json.dumps(make_reply("completed", "c" * 32, DEVICE_ID, "health", result=health_result)).encode(),
+            lambda: encode(make_reply("completed", "c" * 32, DEVICE_ID, "health", result=health_result)),
+            lambda payload: decode(payload),
+        ),
+        "health": (
+            lambda: f"{now}, {DEVICE_ID}, {NAME}, {IP}".encode(),
+            lambda: codec.encode_health(now, 1234.5, 0b1001, DEVICE_ID, NAME, IP),
+            lambda payload: codec.decode(payload),
+        ),
+        "iff": (
+            lambda: json.dumps({"device_id": DEVICE_ID, "name": NAME, "ip": IP,
+                                "hostname": socket.gethostname(), "timestamp": now}).encode(),
+            lambda: codec.encode_iff(now, DEVICE_ID, NAME, IP, socket.gethostname()),
+            lambda payload: codec.decode(payload),
+        ),
+    }
+
+
+def rate(fn, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        fn()
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Zenoh payload codec benchmark")
+    parser.add_argument("--count", type=int, default=100000)
+    args = parser.parse_args()
+
+    print(f"msgpack: {'yes' if codec.msgpack is not None else 'no (JSON bodies)'}")
+    print(f"{'message':<8} {'json B':>7} {'binary B':>9} {'saved':>6} {'json enc/s':>12} {'bin enc/s':>12} "
+          f"{'json dec/s':>12} {'bin dec/s':>12}")
+    for label, (make_json, make_binary, decoder) in samples().items():
+        json_payload, binary_payload = make_json(), make_binary()
+        saved = 1 - len(binary_payload) / len(json_payload)
+        print(f"{label:<8} {len(json_payload):>7} {len(binary_payload):>9} {saved:>6.0%} "
+              f"{rate(make_json, args.count):>12,.0f} {rate(make_binary, args.count):>12,.0f} "
+              f"{rate(lambda: decoder(json_payload), args.count):>12,.0f} "
+              f"{rate(lambda: decoder(binary_payload), args.count):>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
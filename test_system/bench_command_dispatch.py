@@ -0,0 +1,63 @@
+# python -m test_system.bench_command_dispatch --count 5000
+# Commands per second through put_command for a bare Device and a Camera.
+# Run from the repo root on the target device; nothing is started, only the command thread runs.
+
+import argparse
+import logging
+import threading
+import time
+
+from devices.device import Device
+
+
+def bench(device, count):
+    done = threading.Event()
+    device.register_command("bench_noop", lambda **properties: None)
+    device.register_command("bench_done", lambda **properties: done.set())
+
+    start = time.perf_counter()
+    for _ in range(count):
+        device.put_command("bench_noop")
+    device.put_command("bench_done")
+    done.wait()
+    elapsed = time.perf_counter() - start
+
+    device.remove_command("bench_noop")
+    device.remove_command("bench_done")
+    return count / elapsed
+
+
+def teardown(device):
+    device.is_stopped.value = True
+    device.command_lanes.close()
+    device.worker_thread.join(timeout=2)
+    device.session.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Command dispatch micro-benchmark")
+    parser.add_argument("--count", type=int, default=5000)
+    parser.add_argument("--verbose", action="store_true", help="Keep INFO logging on the hot path")
+    args = parser.parse_args()
+
+    level = logging.DEBUG if args.verbose else logging.WARNING
+
+    targets = [("Device", lambda: Device())]
+    try:
+        from devices.device_camera import Camera
+        targets.append(("Camera", lambda: Camera(cameras=[0], DEBUG=1)))
+    except ImportError as e:
+        print(f"Skipping Camera: {e}")
+
+    for label, factory in targets:
+        device = factory()
+        device.logger.setLevel(level)
+        try:
+            rate = bench(device, args.count)
+            print(f"{label:<8} {rate:>12,.0f} commands/s  ({args.count} commands)")
+        finally:
+            teardown(device)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# python -m test_system.bench_config_store --count 100000
+# Device.name lookups: the old property (lock + open + json.load per access) vs Config_Store.
+
+import argparse
+import json
+import tempfile
+import time
+from multiprocessing import Lock
+from pathlib import Path
+
+from utils.config_store import Config_Store
+
+
+def legacy_name(path, lock):
+    """Device.name as it was before Config_Store"""
+    with lock:
+        try:
+            if path.exists():
+                with path.open("r") as f:
+                    data = json.load(f)
+                    return str(data.get("device_name", "unknown"))
+            return "unknown"
+        except Exception:
+            return "unknown"
+
+
+def rate(fn, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        fn()
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="device.cfg access benchmark")
+    parser.add_argument("--count", type=int, default=100000)
+    parser.add_argument("--config", default="device.cfg", help="Config file to copy for the run")
+    args = parser.parse_args()
+
+    with open(args.config) as f:
+        config = json.load(f)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "device.cfg"
+        path.write_text(json.dumps(config, indent=2))
+        lock = Lock()
+        store = Config_Store(path)
+
+        legacy = rate(lambda: legacy_name(path, lock), args.count)
+        cached = rate(lambda: store.device_name, args.count)
+
+        # Write through the store, then measure the first read that has to reload
+        def write_then_read():
+            with store.lock:
+                path.write_text(json.dumps(config, indent=2))
+                store.invalidate()
+            return store.device_name
+        reload = rate(write_then_read, max(1, args.count // 100))
+
+    print(f"{'access':<22} {'reads/s':>14} {'us/read':>9}")
+    for label, value in (("legacy property", legacy), ("Config_Store", cached), ("write + reload", reload)):
+        print(f"{label:<22} {value:>14,.0f} {1e6 / value:>9.2f}")
+    print(f"speedup: {cached / legacy:,.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# python -m test_system.bench_import_time [--top 10]
+# Import time and memory of what launch.py imports and of each worker module, each in a fresh
+# interpreter with -X importtime. The "run" rows are what a worker only imports once it runs:
+# the web stack in the config API process, the GStreamer registry in the camera processes.
+# Run from the repo root on the target device.
+
+import argparse
+import json
+import subprocess
+import sys
+
+TARGETS = [
+    ("launch.py", "import devices.device_camera, utils.setup_logger"),
+    ("Camera_Controller", "import devices.workers.Camera_Controller"),
+    ("Camera_Recorder", "import devices.workers.Camera_Recorder"),
+    ("Camera_RTPS", "import devices.workers.Camera_RTPS"),
+    ("Health_Monitor", "import devices.workers.Health_Monitor"),
+    ("Config_Controller", "import devices.workers.Config_Controller"),
+    ("Config API run", "import devices.workers.config_api, uvicorn"),
+    ("Camera run", "from devices.workers.Shared_Camera_Functions import init_gstreamer; init_gstreamer()"),
+]
+
+# Runs in the child: time the statement, then report wall time and peak RSS on stdout
+CHILD = """
+import resource, time
+start = time.perf_counter()
+exec({code!r})
+import json
+print(json.dumps({{"wall": time.perf_counter() - start, "maxrss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}}))
+"""
+
+
+def parse_importtime(stderr):
+    """[(self us, cumulative us, module)] from -X importtime output"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        rows.append((int(self_us), int(cumulative_us), module.strip()))
+    return rows
+
+
+def measure(code):
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", CHILD.format(code=code)],
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        return None, result.stderr.strip().splitlines()[-1]
+    stats = json.loads(result.stdout.strip().splitlines()[-1])
+    return stats, parse_importtime(result.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import time and memory per worker module")
+    parser.add_argument("--top", type=int, default=0, help="Also list the N slowest imports of each target")
+    args = parser.parse_args()
+
+    print(f"{'target':<20} {'wall ms':>8} {'import ms':>10} {'modules':>8} {'max rss MB':>11}")
+    for name, code in TARGETS:
+        stats, rows = measure(code)
+        if stats is None:
+            print(f"{name:<20} failed: {rows}")
+            continue
+        print(f"{name:<20} {stats['wall'] * 1000:>8.1f} {sum(r[0] for r in rows) / 1000:>10.1f} "
+              f"{len(rows):>8} {stats['maxrss_kb'] / 1024:>11.1f}")
+        if args.top:
+            for self_us, cumulative_us, module in sorted(rows, key=lambda r: -r[0])[:args.top]:
+                print(f"    {self_us / 1000:>8.1f} ms  {module}")
+
+
+if __name__ == "__main__":
+    main()
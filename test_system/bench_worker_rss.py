@@ -0,0 +1,65 @@
+# python -m test_system.bench_worker_rss
+# Memory per worker process with the fork start method (the whole Device copied into every
+# worker), spawn (a fresh interpreter that only gets the Worker_Context) and forkserver
+# (forked from a server that preloaded the worker base, what launch.py uses).
+# Run from the repo root on the target device. Each start method runs in its own interpreter.
+
+import argparse
+import multiprocessing
+import subprocess
+import sys
+import time
+
+MB = 1024 * 1024
+
+
+def measure(method, settle):
+    multiprocessing.set_start_method(method)
+    if method == "forkserver":
+        from devices.worker_context import FORKSERVER_PRELOAD
+        multiprocessing.set_forkserver_preload(FORKSERVER_PRELOAD)
+
+    import psutil
+    from devices.device import Device
+    from devices.workers.worker import Worker
+
+    device = Device()
+    device.logger.setLevel("WARNING")
+    device._processes.append(Worker(device, "Idle_Worker"))
+    device.start()
+    time.sleep(settle)  # Let lazy imports and first requests settle
+
+    rows = []
+    for process in device.process_list:
+        info = psutil.Process(process.pid).memory_full_info()
+        rows.append((process.name, info.rss / MB, info.uss / MB, getattr(info, "pss", 0) / MB))
+    parent = psutil.Process().memory_full_info()
+    # Everything this run costs: parent, log listener, fork server and workers
+    tree = [psutil.Process()] + psutil.Process().children(recursive=True)
+    tree_pss = sum(getattr(p.memory_full_info(), "pss", 0) for p in tree) / MB
+    device.stop()
+
+    print(f"{method}: parent rss {parent.rss / MB:.1f} MB")
+    print(f"  {'worker':<16} {'rss MB':>8} {'uss MB':>8} {'pss MB':>8}")
+    for name, rss, uss, pss in rows:
+        print(f"  {name:<16} {rss:>8.1f} {uss:>8.1f} {pss:>8.1f}")
+    print(f"  {'total':<16} {sum(r[1] for r in rows):>8.1f} {sum(r[2] for r in rows):>8.1f} {sum(r[3] for r in rows):>8.1f}")
+    print(f"  all {len(tree)} processes pss {tree_pss:.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-worker memory by start method")
+    parser.add_argument("--method", choices=["fork", "spawn", "forkserver"], help="Measure one start method in this interpreter")
+    parser.add_argument("--settle", type=float, default=3.0, help="Seconds to wait after start before measuring")
+    args = parser.parse_args()
+
+    if args.method:
+        measure(args.method, args.settle)
+        return
+    for method in ("fork", "spawn", "forkserver"):
+        subprocess.run([sys.executable, "-m", "test_system.bench_worker_rss", "--method", method,
+                        "--settle", str(args.settle)], check=True)
+
+
+if __name__ == "__main__":
+    main()
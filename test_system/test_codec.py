@@ -0,0 +1,88 @@
+import json
+from unittest import mock
+
+import msgpack
+import pytest
+
+from devices.device import Device
+from utils import codec
+from utils.command_protocol import decode, decode_command, encode, make_batch, make_reply, make_request
+
+HEADER = bytes([codec.MAGIC, codec.VERSION])
+
+
+def test_command_and_reply_round_trip():
+    request = make_request("start_recording", {"trial": "T1", "cameras": [0, 1]}, reply_to="reply/x")
+    reply = make_reply("completed", request["correlation_id"], "dev-1", "start_recording", result={"ok": True})
+    batch = make_batch([reply, reply])
+    for message, kind in ((request, codec.KIND_COMMAND), (reply, codec.KIND_REPLY), (batch, codec.KIND_REPLY)):
+        for binary in (True, False):
+            assert codec.decode(encode(message, binary)) == (kind, message)
+
+
+def test_health_and_iff_round_trip():
+    flags = {"camera_is_ready": True, "in_trial": False, "is_passive": False, "is_recording": True, "is_streaming": False}
+    kind, health = codec.decode(codec.encode_health(1700000000.5, 12.5, codec.pack_flags(flags), "dev-1", "Cam", "10.0.0.2"))
+    assert kind == codec.KIND_HEALTH
+    assert health == {"timestamp": 1700000000.5, "uptime": 12.5, "flags": flags,
+                      "device_id": "dev-1", "name": "Cam", "ip": "10.0.0.2"}
+    kind, iff = codec.decode(codec.encode_iff(1.0, "dev-1", "Cam", "10.0.0.2", "pi"))
+    assert kind == codec.KIND_IFF
+    assert iff["hostname"] == "pi"
+
+
+def test_legacy_payloads():
+    assert codec.decode(b'{"command": "ping"}') == (codec.KIND_COMMAND, {"command": "ping"})
+    kind, health = codec.decode(b"1700000000.0, dev-1, Cam, 10.0.0.2")
+    assert kind == codec.KIND_HEALTH and health["device_id"] == "dev-1"
+
+
+def test_long_strings_are_truncated():
+    _, iff = codec.decode(codec.encode_iff(1.0, "d" * 300, "n", "ip", "h"))
+    assert iff["device_id"] == "d" * 255
+
+
+@pytest.mark.parametrize("payload", [
+    HEADER,                                                # Header cut short
+    HEADER + bytes([codec.KIND_HEALTH]) + b"\x00" * 4,     # Truncated health body
+    bytes([codec.MAGIC, 99, codec.KIND_COMMAND]) + b"{}",  # Unknown version
+    HEADER + bytes([9]) + b"{}",                           # Unknown kind
+    HEADER + bytes([codec.KIND_COMMAND]) + b"not json",
+    b"[1, 2]",
+    b"not a payload",
+])
+def test_malformed_payloads_raise(payload):
+    with pytest.raises(ValueError):  # What listener() catches, Codec_Error is one
+        decode(payload)
+
+
+@pytest.mark.parametrize("kind, body", [
+    (codec.KIND_COMMAND | codec.BODY_MSGPACK, msgpack.packb(7)),
+    (codec.KIND_COMMAND | codec.BODY_MSGPACK, msgpack.packb(["a", 1])),
+    (codec.KIND_REPLY | codec.BODY_MSGPACK, msgpack.packb("text")),
+    (codec.KIND_COMMAND, b"[1, 2]"),
+])
+def test_non_map_bodies_raise_codec_error(kind, body):
+    with pytest.raises(codec.Codec_Error):
+        decode(HEADER + bytes([kind]) + body)
+
+
+def test_decode_command_rejects_other_kinds():
+    reply = make_reply("completed", "c1", "dev-1", "ping")
+    for payload in (codec.encode_health(1.0, 1.0, 0, "dev-1", "Cam", "ip"), codec.encode_iff(1.0, "d", "n", "ip", "h"),
+                    encode(reply), json.dumps(reply).encode()):
+        with pytest.raises(codec.Codec_Error):
+            decode_command(payload)
+
+
+@pytest.mark.parametrize("payload", [
+    HEADER + bytes([codec.KIND_COMMAND | codec.BODY_MSGPACK]) + msgpack.packb(7),
+    codec.encode_health(1.0, 1.0, 0, "dev-1", "Cam", "ip"),
+    b"\xb7",
+])
+def test_listener_drops_malformed_payloads(payload):
+    device = mock.MagicMock(ignored_reply_keys=set())
+    Device.listener(device, mock.Mock(payload=payload))
+    device.logger.warning.assert_called_once()
+    device._reply.assert_not_called()
+    device.put_command.assert_not_called()
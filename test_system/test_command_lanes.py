@@ -0,0 +1,144 @@
+import threading
+import time
+
+import pytest
+
+from devices.command_lanes import (Command_Lanes, Command_Policy, DEFAULT_POLICY, CONTROL_POLICY,
+                                   SERIAL, FREE, EXCLUSIVE, PRIORITY_HIGH)
+
+
+@pytest.fixture
+def lanes():
+    """Command_Lanes with a dispatcher thread doing what Device._handle_command does"""
+    lanes = Command_Lanes(max_lanes=4)
+
+    def dispatch():
+        while not lanes.closed:
+            entry = lanes.get(timeout=0.1)
+            if entry is not None:
+                policy, item = entry
+                lanes.submit(policy, item)
+
+    thread = threading.Thread(target=dispatch, daemon=True)
+    thread.start()
+    yield lanes
+    lanes.close()
+    thread.join(timeout=2)
+
+
+def recorder():
+    """(log, make): make(name, seconds) is a command that sleeps, then appends name to log"""
+    log, lock = [], threading.Lock()
+
+    def make(name, seconds=0.0):
+        def run():
+            time.sleep(seconds)
+            with lock:
+                log.append((name, time.monotonic()))
+        return run
+    return log, make
+
+
+def wait_for(log, count, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while len(log) < count and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(log) >= count, f"only {len(log)} of {count} commands ran"
+
+
+def test_serial_burst_holds_one_lane(lanes):
+    log, make = recorder()
+    start = time.monotonic()
+    for i in range(6):
+        lanes.put(DEFAULT_POLICY, make(f"dev{i}", 0.3))
+    time.sleep(0.05)
+    lanes.put(Command_Policy(FREE), make("free"))
+    wait_for(log, 1)
+    assert log[0][0] == "free"
+    assert log[0][1] - start < 0.2
+    wait_for(log, 7)
+    assert [name for name, _ in log[1:]] == [f"dev{i}" for i in range(6)]
+
+
+def test_other_resources_run_beside_a_busy_one(lanes):
+    log, make = recorder()
+    for i in range(6):
+        lanes.put(Command_Policy(SERIAL, "a"), make(f"a{i}", 0.2))
+    time.sleep(0.05)
+    lanes.put(Command_Policy(SERIAL, "b"), make("b"))
+    wait_for(log, 1)
+    assert log[0][0] == "b"
+
+
+def test_serial_order_survives_priorities(lanes):
+    log, make = recorder()
+    for i in range(20):
+        priority = PRIORITY_HIGH if i % 3 == 0 else DEFAULT_POLICY.priority
+        lanes.put(Command_Policy(SERIAL, "recorder", priority), make(i, 0.005))
+    wait_for(log, 20)
+    assert [name for name, _ in log] == list(range(20))
+
+
+def test_priority_reorders_across_resources():
+    lanes = Command_Lanes(max_lanes=1)
+    log, make = recorder()
+    lanes.put(Command_Policy(SERIAL, "a"), make("a"))
+    lanes.put(Command_Policy(SERIAL, "b", PRIORITY_HIGH), make("b"))
+    for _ in range(2):
+        policy, item = lanes.get(timeout=1)
+        item()
+        lanes.release(policy)
+    lanes.close()
+    assert [name for name, _ in log] == ["b", "a"]
+
+
+def test_control_skips_the_lane_limit():
+    lanes = Command_Lanes(max_lanes=1)
+    assert lanes.get(timeout=0) is None
+    lanes.put(DEFAULT_POLICY, "busy")
+    assert lanes.get(timeout=1) == (DEFAULT_POLICY, "busy")  # Takes the only lane
+    lanes.put(Command_Policy(FREE), "waits")
+    lanes.put(CONTROL_POLICY, "stop")
+    assert lanes.get(timeout=1) == (CONTROL_POLICY, "stop")
+    assert lanes.get(timeout=0.05) is None
+    lanes.release(DEFAULT_POLICY)
+    assert lanes.get(timeout=1) == (Command_Policy(FREE), "waits")
+    lanes.close()
+
+
+def test_exclusive_runs_alone(lanes):
+    running, overlaps, lock = [0], [], threading.Lock()
+
+    def make(seconds):
+        def run():
+            with lock:
+                running[0] += 1
+                overlaps.append(running[0])
+            time.sleep(seconds)
+            with lock:
+                running[0] -= 1
+        return run
+
+    done = threading.Event()
+    for resource in ("a", "b", "c"):
+        lanes.put(Command_Policy(SERIAL, resource), make(0.1))
+    time.sleep(0.02)
+    lanes.put(Command_Policy(EXCLUSIVE), lambda: (overlaps.append(running[0] + 1), done.set()))
+    assert done.wait(5)
+    assert overlaps[-1] == 1
+
+
+def test_a_failing_command_keeps_its_chain_going(lanes):
+    log, make = recorder()
+
+    def fail():
+        time.sleep(0.05)
+        raise RuntimeError("boom")
+
+    lanes.put(DEFAULT_POLICY, fail)
+    lanes.put(DEFAULT_POLICY, make("after"))
+    wait_for(log, 1)
+    deadline = time.monotonic() + 1
+    while lanes._free != lanes.max_lanes and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert lanes._free == lanes.max_lanes
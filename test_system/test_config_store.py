@@ -0,0 +1,127 @@
+import json
+import multiprocessing
+import os
+import time
+
+import pytest
+
+from utils import config_store
+from utils.config_store import Config_Store
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = tmp_path / "device.cfg"
+    path.write_text(json.dumps({"device_name": "Cam", "cfg_port": "8090"}))
+    return path
+
+
+def read(path):
+    return json.loads(path.read_text())
+
+
+def wait_until(check, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not check() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return check()
+
+
+def test_typed_keys(path):
+    store = Config_Store(path)
+    assert store.device_name == "Cam"
+    assert store.cfg_port == 8090
+    assert store.group_id == "default_group"
+    store.update(cfg_port="not a port")
+    assert store.cfg_port == 8088  # Uncastable values fall back to the default
+
+
+def test_updates_are_coalesced(path, monkeypatch):
+    writes = []
+    real = config_store.write_json_atomic
+    monkeypatch.setattr(config_store, "write_json_atomic",
+                        lambda p, data: (writes.append(data) if p == path else None, real(p, data)))
+    store = Config_Store(path, write_interval=0.2)
+    store.update(counter=0)  # The first write after a quiet period goes out at once
+    assert wait_until(lambda: writes)
+    for i in range(1, 20):
+        store.update(counter=i)
+    store.update({"device_name": "Renamed"})
+    assert store.get("counter") == 19  # Visible before the write
+    assert read(path)["device_name"] == "Cam"
+    assert wait_until(lambda: len(writes) == 2)
+    time.sleep(0.3)
+    assert len(writes) == 2
+    assert read(path) == {"device_name": "Renamed", "cfg_port": "8090", "counter": 19}
+
+
+def test_flush_keeps_keys_written_by_others(path):
+    store = Config_Store(path, write_interval=10)
+    store.update(a=1)
+    path.write_text(json.dumps({**read(path), "b": 2}))
+    assert store.flush()
+    assert read(path) == {"device_name": "Cam", "cfg_port": "8090", "a": 1, "b": 2}
+
+
+def test_external_edit_is_reloaded(path, monkeypatch):
+    monkeypatch.setattr(config_store, "MTIME_CHECK_INTERVAL", 0.0)
+    store = Config_Store(path)
+    assert store.device_name == "Cam"
+    path.write_text(json.dumps({"device_name": "Edited"}))
+    os.utime(path, ns=(time.time_ns(), time.time_ns() + 10**9))  # Coarse mtime filesystems
+    assert store.device_name == "Edited"
+
+
+def read_name_after_write(store, written, results):
+    results.put(store.device_name)
+    store._next_check = float("inf")  # Only the shared generation may trigger the reload
+    written.wait(5)
+    results.put(store.device_name)
+
+
+def test_write_in_one_process_reloads_the_other(path):
+    store = Config_Store(path, write_interval=10)
+    written, results = multiprocessing.Event(), multiprocessing.Queue()
+    child = multiprocessing.Process(target=read_name_after_write, args=(store, written, results))
+    child.start()
+    assert results.get(timeout=30) == "Cam"
+    store.update(device_name="Renamed")
+    store.flush()
+    written.set()
+    assert results.get(timeout=5) == "Renamed"
+    child.join(5)
+
+
+def test_unreadable_file_keeps_the_last_good_values(path):
+    store = Config_Store(path)
+    path.write_text("{ torn")
+    store.invalidate()
+    assert store.device_name == "Cam"
+
+
+def test_failed_write_is_retried(path, monkeypatch):
+    real = config_store.write_json_atomic
+    failures = [OSError("read-only file system")] * 2
+
+    def flaky(p, data):
+        if failures:
+            raise failures.pop()
+        real(p, data)
+
+    monkeypatch.setattr(config_store, "write_json_atomic", flaky)
+    store = Config_Store(path, write_interval=0.05)
+    store.update(device_name="Renamed")
+    assert wait_until(lambda: read(path)["device_name"] == "Renamed")
+    assert store.pending() == []
+
+
+def test_failed_flush_reports_pending_keys(path, monkeypatch):
+    def fail(p, data):
+        raise OSError("read-only file system")
+
+    monkeypatch.setattr(config_store, "write_json_atomic", fail)
+    store = Config_Store(path, write_interval=10)
+    store.update(device_name="Renamed")
+    assert not store.flush()
+    assert store.pending() == ["device_name"]
+    assert store.device_name == "Renamed"
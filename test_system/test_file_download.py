@@ -0,0 +1,112 @@
+import asyncio
+import os
+
+import pytest
+
+from devices.workers import file_download
+from devices.workers.file_download import Range_Not_Satisfiable, Ranged_File_Response, parse_range
+
+
+@pytest.mark.parametrize("header, size, expected", [
+    (None, 100, None),
+    ("", 100, None),
+    ("items=0-1", 100, None),        # Other units are ignored
+    ("bytes=0-1,5-6", 100, None),    # So are multiple ranges
+    ("bytes=a-b", 100, None),        # And malformed ones
+    ("bytes=0-", 100, (0, 99)),
+    ("bytes=10-19", 100, (10, 19)),
+    ("bytes=90-500", 100, (90, 99)),  # The end is clamped
+    ("bytes=-10", 100, (90, 99)),
+    ("bytes=-500", 100, (0, 99)),
+    ("bytes=99-99", 100, (99, 99)),
+])
+def test_parse_range(header, size, expected):
+    assert parse_range(header, size) == expected
+
+
+@pytest.mark.parametrize("header, size", [
+    ("bytes=100-", 100),
+    ("bytes=20-10", 100),
+    ("bytes=-0", 100),
+    ("bytes=-5", 0),  # An empty file has no last 5 bytes
+    ("bytes=0-", 0),
+])
+def test_unsatisfiable_ranges(header, size):
+    with pytest.raises(Range_Not_Satisfiable):
+        parse_range(header, size)
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = tmp_path / "2024-01-01_00-00-00_trial_C0.mkv"
+    path.write_bytes(os.urandom(600_000))
+    return str(path)
+
+
+def serve(response, zerocopy=False, method="GET"):
+    """Run the response against a fake ASGI server: (status, headers, body)"""
+    messages, data = [], bytearray()
+
+    async def send(message):
+        messages.append(message)
+        if message["type"] == "http.response.zerocopysend":  # The file is only open until the response ends
+            data.extend(os.pread(message["file"].fileno(), message["count"], message["offset"]))
+        elif message["type"] == "http.response.body":
+            data.extend(message["body"])
+
+    scope = {"method": method, "extensions": {"http.response.zerocopysend": {}} if zerocopy else {}}
+    asyncio.run(response(scope, None, send))
+    start = messages[0]
+    assert not messages[-1].get("more_body")
+    return start["status"], {k.decode(): v.decode() for k, v in start["headers"]}, bytes(data)
+
+
+@pytest.mark.parametrize("zerocopy", [False, True])
+def test_full_and_ranged_downloads(path, zerocopy):
+    content = open(path, "rb").read()
+    status, headers, body = serve(Ranged_File_Response(path), zerocopy)
+    assert (status, headers["content-length"], body) == (200, "600000", content)
+    assert headers["accept-ranges"] == "bytes"
+
+    status, headers, body = serve(Ranged_File_Response(path, range_header="bytes=300000-"), zerocopy)
+    assert status == 206
+    assert headers["content-range"] == "bytes 300000-599999/600000"
+    assert body == content[300000:]
+
+
+def test_unsatisfiable_range_is_416(path):
+    status, headers, body = serve(Ranged_File_Response(path, range_header="bytes=600000-"))
+    assert (status, headers["content-range"], headers["content-length"], body) == (416, "bytes */600000", "0", b"")
+
+
+def test_suffix_range_of_an_empty_file_is_416(tmp_path):
+    path = tmp_path / "empty.mkv"
+    path.write_bytes(b"")
+    status, headers, _ = serve(Ranged_File_Response(str(path), range_header="bytes=-5"))
+    assert (status, headers["content-range"]) == (416, "bytes */0")
+
+
+def test_if_range(path):
+    etag = Ranged_File_Response(path).headers["etag"]
+    assert Ranged_File_Response(path, range_header="bytes=0-9", if_range=etag).status_code == 206
+    assert Ranged_File_Response(path, range_header="bytes=0-9", if_range='"stale"').status_code == 200
+
+
+def test_head_sends_no_body(path):
+    status, headers, body = serve(Ranged_File_Response(path), method="HEAD")
+    assert (status, headers["content-length"], body) == (200, "600000", b"")
+
+
+@pytest.mark.parametrize("zerocopy", [False, True])
+def test_file_shrinking_mid_transfer_aborts(path, zerocopy, monkeypatch):
+    monkeypatch.setattr(file_download, "CHUNK_SIZE", 100_000)
+    response = Ranged_File_Response(path)
+    os.truncate(path, 250_000)
+    with pytest.raises(OSError):
+        serve(response, zerocopy)
+
+
+def test_on_close_runs_once(path):
+    closed = []
+    serve(Ranged_File_Response(path, on_close=lambda: closed.append(1)))
+    assert closed == [1]
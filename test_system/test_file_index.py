@@ -0,0 +1,101 @@
+import os
+import threading
+
+import pytest
+
+from utils.file_index import File_Index, UPLOAD_DONE, UPLOAD_PENDING
+
+NAMES = [
+    "2024-01-01_10-00-00_alpha_C0.mkv",
+    "2024-01-01_10-00-00_alpha_C1.mkv",
+    "2024-01-02_10-00-00_alphabet_C0.mkv",
+    "2024-01-03_10-00-00_Alpha_C0.mkv",
+    "2024-01-04_10-00-00_al%pha_C0.mkv",
+    "2024-01-05_10-00-00_al_x_C1.mkv",
+    "notes.txt",
+]
+
+
+@pytest.fixture
+def index(tmp_path):
+    for i, name in enumerate(NAMES):
+        path = tmp_path / name
+        path.write_bytes(b"x" * (i + 1) * 10)
+        os.utime(path, (1000 + i, 1000 + i))
+    (tmp_path / ".hidden").write_bytes(b"x")
+    index = File_Index(tmp_path)
+    index.sync()
+    return index
+
+
+def names(rows):
+    return [row["name"] for row in rows]
+
+
+def test_sync_indexes_visible_files(index):
+    rows, total = index.query(limit=100)
+    assert total == len(NAMES)
+    assert names(rows) == list(reversed(NAMES))  # Newest first
+    assert {row["upload_status"] for row in rows} == {UPLOAD_PENDING}
+    notes = next(row for row in rows if row["name"] == "notes.txt")
+    assert (notes["trial"], notes["camera"]) == (None, None)
+
+
+def test_sort_and_paging(index):
+    rows, total = index.query(offset=2, limit=2, sort="size", descending=False)
+    assert total == len(NAMES)
+    assert names(rows) == NAMES[2:4]
+    with pytest.raises(ValueError):
+        index.query(sort="owner")
+
+
+@pytest.mark.parametrize("trial, expected", [
+    ("alpha", NAMES[0:3]),
+    ("alphab", NAMES[2:3]),
+    ("Alpha", NAMES[3:4]),   # Case sensitive, like the names on disk
+    ("al%", NAMES[4:5]),     # No wildcards
+    ("al_", NAMES[5:6]),
+    ("beta", []),
+])
+def test_trial_prefix(index, trial, expected):
+    rows, total = index.query(trial=trial, sort="name", descending=False)
+    assert (names(rows), total) == (sorted(expected), len(expected))
+
+
+def test_trial_filter_uses_its_index(index):
+    plan = index._connection().execute(
+        "EXPLAIN QUERY PLAN SELECT COUNT(*) FROM files WHERE trial >= ? AND trial < ?", ("a", "b")).fetchall()
+    assert "files_trial" in plan[0][-1]
+
+
+def test_camera_and_upload_filters(index):
+    index.set_upload_status(NAMES[1], UPLOAD_DONE)
+    assert names(index.query(camera=1)[0]) == [NAMES[5], NAMES[1]]
+    assert names(index.query(camera=1, upload_status=UPLOAD_DONE)[0]) == [NAMES[1]]
+
+
+def test_total_follows_writes(index, tmp_path):
+    assert index.query(trial="alpha")[1] == 3
+    index.remove(NAMES[0])
+    assert index.query(trial="alpha")[1] == 2  # This connection's own write
+
+    path = tmp_path / "2024-01-06_10-00-00_alpha_C2.mkv"
+    path.write_bytes(b"x")
+    thread = threading.Thread(target=index.upsert, args=(path,))  # Another connection's
+    thread.start()
+    thread.join()
+    assert index.query(trial="alpha")[1] == 3
+
+
+def test_upsert_keeps_upload_status(index, tmp_path):
+    index.set_upload_status(NAMES[0], UPLOAD_DONE)
+    (tmp_path / NAMES[0]).write_bytes(b"longer now")
+    index.upsert(tmp_path / NAMES[0])
+    row = next(row for row in index.query(limit=100)[0] if row["name"] == NAMES[0])
+    assert (row["size"], row["upload_status"]) == (10, UPLOAD_DONE)
+
+
+def test_sync_drops_deleted_files(index, tmp_path):
+    (tmp_path / NAMES[0]).unlink()
+    index.sync()
+    assert NAMES[0] not in names(index.query(limit=100)[0])
@@ -0,0 +1,64 @@
+import multiprocessing
+import time
+
+import pytest
+
+from devices import health_block
+from devices.health_block import Health_Block, MAX_FIELDS
+
+
+def test_typed_fields():
+    block = Health_Block()
+    slot = block.slot("Camera_Recorder_0")
+    recording = slot.field("is_recording", bool)
+    fps = slot.field("fps", float, 30.0)
+    assert block.slot("Camera_Recorder_0") is slot
+    assert slot.field("fps") is fps
+    assert (recording.value, fps.value) == (False, 30.0)
+    slot.update(is_recording=True, fps=29.5)
+    assert block.snapshot() == {"Camera_Recorder_0": {"is_recording": True, "fps": 29.5}}
+
+
+def test_limits():
+    block = Health_Block(slots=2)
+    block.slot("a")
+    slot = block.slot("b")
+    with pytest.raises(ValueError):
+        block.slot("c")
+    for i in range(MAX_FIELDS):
+        slot.field(f"f{i}")
+    with pytest.raises(ValueError):
+        slot.field("one_more")
+
+
+def write_pairs(slot, count):
+    for i in range(count):
+        slot.update(first=i, second=i)
+
+
+def test_reads_never_see_half_a_write():
+    block = Health_Block()
+    slot = block.slot("worker")
+    slot.field("first")
+    slot.field("second")
+    writer = multiprocessing.get_context("fork").Process(target=write_pairs, args=(slot, 200_000))
+    writer.start()
+    torn = 0
+    while writer.is_alive():
+        values = slot.read()
+        torn += values["first"] != values["second"]
+    writer.join()
+    assert torn == 0
+    assert slot.read() == {"first": 199_999, "second": 199_999}
+
+
+def test_a_writer_dying_mid_write_does_not_hang_readers(monkeypatch):
+    monkeypatch.setattr(health_block, "READ_TIMEOUT", 0.05)
+    block = Health_Block()
+    slot = block.slot("worker")
+    value = slot.field("value", int, 7)
+    block._slots[slot.index].seq += 1  # What a writer killed between its two increments leaves
+    start = time.monotonic()
+    assert slot.read() == {"value": 7}
+    assert time.monotonic() - start < 1
+    assert value.value == 7
@@ -0,0 +1,70 @@
+import json
+import os
+
+import pytest
+
+from utils.log_reader import end_cursor, parse_cursor, read_since, read_tail
+
+
+def write(path, levels, mode="a"):
+    with open(path, mode) as f:
+        for i, level in enumerate(levels):
+            f.write(json.dumps({"t": i, "level": level, "msg": f"{level}-{i}"}) + "\n")
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "logs.jsonl")
+
+
+def test_level_filter_tolerates_unknown_levels(path):
+    write(path, ["INFO", "TRACE", "ERROR", None, ["list"], 40, "WARNING"])
+    with open(path, "a") as f:
+        f.write(json.dumps({"t": 9, "msg": "no level"}) + "\n")
+        f.write("2024-01-01 00:00:00 [WARNING] legacy line\n")
+    assert [e["msg"] for e in read_tail(path, 10, "warning")[0]] == ["ERROR-2", "WARNING-6", "legacy line"]
+    assert [e["msg"] for e in read_since(path, "0", level="info")[0]] == ["INFO-0", "ERROR-2", "WARNING-6", "legacy line"]
+    assert len(read_since(path, "0")[0]) == 9
+    with pytest.raises(ValueError):
+        read_tail(path, 10, "loud")
+
+
+def test_tail_then_follow(path):
+    write(path, ["INFO"] * 50)
+    entries, cursor = read_tail(path, 3)
+    assert [e["msg"] for e in entries] == ["INFO-47", "INFO-48", "INFO-49"]
+    assert read_since(path, cursor) == ([], cursor)
+    with open(path, "a") as f:
+        f.write('{"t": 50, "level": "INFO", "msg": "half')  # Still being written
+    assert read_since(path, cursor)[0] == []
+    with open(path, "a") as f:
+        f.write(' a line"}\n')
+    assert [e["msg"] for e in read_since(path, cursor)[0]] == ["half a line"]
+
+
+def test_rotation_restarts_at_zero(path):
+    write(path, ["INFO"] * 50)
+    _, cursor = read_tail(path, 1)
+    os.replace(path, path + ".1")
+    write(path, ["ERROR"] * 5, "w")  # Shorter than the old offset would skip the first lines
+    entries, following = read_since(path, cursor)
+    assert [e["msg"] for e in entries] == [f"ERROR-{i}" for i in range(5)]
+    assert following == end_cursor(path)
+
+
+def test_truncation_restarts_at_zero(path):
+    write(path, ["INFO"] * 50)
+    _, cursor = read_tail(path, 1)
+    write(path, ["ERROR"], "w")
+    assert [e["msg"] for e in read_since(path, cursor)[0]] == ["ERROR-0"]
+
+
+@pytest.mark.parametrize("cursor, parsed", [("12:34", (12, 34)), ("34", (None, 34))])
+def test_cursors(cursor, parsed):
+    assert parse_cursor(cursor) == parsed
+
+
+@pytest.mark.parametrize("cursor", ["", "x", "1:x", "a:1", "-1", "1:-1"])
+def test_bad_cursors(cursor):
+    with pytest.raises(ValueError):
+        parse_cursor(cursor)
@@ -0,0 +1,140 @@
+import json
+import logging
+import os
+import threading
+
+import pytest
+
+from utils import log_store
+from utils.log_store import ACTIVE_NAME, Log_Follower, Log_Store_Handler, query, read_index, rotated_segments, segments
+
+
+def record(i, level=logging.INFO, logger="app", process="Main"):
+    entry = logging.LogRecord(logger, level, __file__, 0, f"m{i}", None, None)
+    entry.created = 1_000_000 + i
+    entry.processName = process
+    return entry
+
+
+def wait_for_compression(directory):
+    for thread in threading.enumerate():
+        if thread.name == "log_compress":
+            thread.join(5)
+    assert not [path for path in rotated_segments(directory) if not path.endswith(".gz")]
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """1000 records over several rotated segments, every 7th a WARNING from a camera"""
+    monkeypatch.setattr(log_store, "INDEX_BLOCK", 2048)
+    directory = str(tmp_path)
+    handler = Log_Store_Handler(directory, max_bytes=30_000)
+    for i in range(1000):
+        if i % 7:
+            handler.emit(record(i))
+        else:
+            handler.emit(record(i, logging.WARNING, logger="camera", process="Camera_Recorder_0"))
+    handler.flush()
+    wait_for_compression(directory)
+    yield directory
+    handler.close()
+
+
+def messages(entries):
+    return [entry["msg"] for entry in entries]
+
+
+def test_rotation_compresses_and_indexes(store):
+    paths = segments(store)
+    assert len(paths) > 3 and paths[-1].endswith(ACTIVE_NAME)
+    for path in paths:
+        entries = read_index(path)
+        assert entries or path.endswith(ACTIVE_NAME)
+        for (offset, length, first, last, _), following in zip(entries, entries[1:]):
+            assert offset + length == following[0] and first <= last <= following[2]
+    assert len(query(store, limit=5000)) == 1000
+
+
+def test_newest_matches_without_a_start(store):
+    assert messages(query(store, limit=3)) == ["m997", "m998", "m999"]
+    assert messages(query(store, level="warning", limit=2)) == ["m987", "m994"]
+    assert messages(query(store, end=1_000_500, limit=2)) == ["m499", "m500"]
+
+
+def test_start_reads_forwards(store):
+    assert messages(query(store, start=1_000_100, limit=3)) == ["m100", "m101", "m102"]
+    assert messages(query(store, start=1_000_100, end=1_000_102)) == ["m100", "m101", "m102"]
+
+
+def test_filters(store):
+    warnings = query(store, start=0, level="WARNING", limit=5000)
+    assert len(warnings) == 143 and {entry["level"] for entry in warnings} == {"WARNING"}
+    assert query(store, start=0, process="Camera_Recorder_0", limit=5000) == warnings
+    assert query(store, start=0, logger="camera", limit=5000) == warnings
+    with pytest.raises(ValueError):
+        query(store, level="loud")
+
+
+def test_index_skips_blocks_outside_the_range(store, monkeypatch):
+    reads = []
+    real = log_store._read_block
+    monkeypatch.setattr(log_store, "_read_block", lambda *args: (reads.append(args), real(*args))[1])
+    query(store, start=1_000_500, end=1_000_510)
+    blocks = sum(len(read_index(path)) for path in segments(store))
+    assert 0 < len(reads) <= 3 < blocks
+
+
+def test_reopen_continues_the_active_segment(store):
+    handler = Log_Store_Handler(store, max_bytes=30_000)
+    handler.emit(record(1000))
+    handler.close()
+    assert messages(query(store, limit=2)) == ["m999", "m1000"]
+
+
+def test_keep_prunes_the_oldest_segments(tmp_path):
+    directory = str(tmp_path)
+    handler = Log_Store_Handler(directory, max_bytes=2_000, keep=2)
+    for i in range(200):
+        handler.emit(record(i))
+    handler.flush()
+    wait_for_compression(directory)
+    handler.close()
+    assert len(rotated_segments(directory)) == 2
+    kept = query(directory, start=0, limit=5000)
+    assert messages(kept)[-1] == "m199" and len(kept) < 200
+
+
+def test_unparsable_lines_are_skipped(tmp_path):
+    directory = str(tmp_path)
+    with open(os.path.join(directory, ACTIVE_NAME), "w") as f:
+        f.write(json.dumps({"t": 1, "level": "INFO", "msg": "ok"}) + "\nnot json\n[1]\n{\"t\": 2, \"lev")
+    assert messages(query(directory)) == ["ok"]
+
+
+def test_follower_hands_out_each_complete_line_once(tmp_path):
+    path = str(tmp_path / "startup.jsonl")
+    assert Log_Follower(path).poll() == []
+    with open(path, "wb") as f:
+        f.write(b"a\nb\nhal")
+    follower = Log_Follower(path)
+    assert follower.poll() == [b"a", b"b"]
+    with open(path, "ab") as f:
+        f.write(b"f\n")
+    assert follower.poll() == [b"half"]
+    assert Log_Follower(path).poll() == []  # A restarted listener continues where the last one stopped
+    os.remove(path)
+    with open(path, "wb") as f:
+        f.write(b"new\n")
+    assert Log_Follower(path).poll() == [b"new"]
+
+
+def test_lines_from_another_writer_are_stored(tmp_path):
+    directory = str(tmp_path)
+    handler = Log_Store_Handler(directory)
+    handler.emit(record(0))
+    handler.append_line(json.dumps({"t": 1_000_001, "level": "ERROR", "logger": "STARTUP", "msg": "pull failed"}).encode())
+    handler.append_line(b"not json")
+    handler.emit(record(2))
+    handler.close()
+    assert messages(query(directory)) == ["m0", "pull failed", "m2"]
+    assert messages(query(directory, level="error")) == ["pull failed"]
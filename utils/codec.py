@@ -0,0 +1,160 @@
+import json
+import struct
+
+try:
+    import msgpack
+except ImportError:  # Binary envelope still works, dynamic bodies fall back to JSON
+    msgpack = None
+
+# ----------------------------------------
+# Wire Format (version 1)
+# ----------------------------------------
+# Every binary payload starts with a 3 byte header: MAGIC, VERSION, KIND (| BODY_MSGPACK).
+# JSON payloads never start with MAGIC, so both formats can share a topic.
+#
+#   COMMAND, REPLY  body: msgpack map, or UTF-8 JSON when msgpack is missing
+#   HEALTH          body: !dfI (timestamp, uptime, flags) + device_id, name, ip
+#   IFF             body: !d   (timestamp)               + device_id, name, ip, hostname
+# Strings are a one byte length followed by UTF-8, truncated to 255 bytes.
+
+MAGIC = 0xB7
+VERSION = 1
+
+KIND_COMMAND = 1
+KIND_REPLY = 2
+KIND_HEALTH = 3
+KIND_IFF = 4
+BODY_MSGPACK = 0x80
+
+# Bit order of the health flags field, append only
+HEALTH_FLAGS = ("camera_is_ready", "in_trial", "is_passive", "is_recording", "is_streaming")
+
+_HEADER = struct.Struct("!BBB")
+_HEALTH = struct.Struct("!dfI")
+_IFF = struct.Struct("!d")
+
+
+class Codec_Error(ValueError):
+    pass
+
+# ----------------------------------------
+# Helpers
+# ----------------------------------------
+def _pack_strings(*values):
+    out = bytearray()
+    for value in values:
+        raw = str(value).encode("utf-8")[:255]
+        out.append(len(raw))
+        out += raw
+    return bytes(out)
+
+
+def _unpack_strings(buf, offset, count):
+    values = []
+    for _ in range(count):
+        length = buf[offset]
+        values.append(bytes(buf[offset + 1:offset + 1 + length]).decode("utf-8", "replace"))
+        offset += 1 + length
+    return values
+
+
+def pack_flags(flags):
+    return sum(1 << i for i, name in enumerate(HEALTH_FLAGS) if flags.get(name))
+
+
+def unpack_flags(bits):
+    return {name: bool(bits >> i & 1) for i, name in enumerate(HEALTH_FLAGS)}
+
+
+def is_binary(payload):
+    return len(payload) >= _HEADER.size and payload[0] == MAGIC
+
+# ----------------------------------------
+# Encoders
+# ----------------------------------------
+def encode_message(kind, message):
+    """Command or reply dict -> binary payload"""
+    if msgpack is not None:
+        return _HEADER.pack(MAGIC, VERSION, kind | BODY_MSGPACK) + msgpack.packb(message, use_bin_type=True)
+    return _HEADER.pack(MAGIC, VERSION, kind) + json.dumps(message, separators=(",", ":")).encode("utf-8")
+
+
+def encode_health(timestamp, uptime, flags, device_id, name, ip):
+    return (_HEADER.pack(MAGIC, VERSION, KIND_HEALTH) + _HEALTH.pack(timestamp, uptime, flags)
+            + _pack_strings(device_id, name, ip))
+
+
+def encode_iff(timestamp, device_id, name, ip, hostname):
+    return _HEADER.pack(MAGIC, VERSION, KIND_IFF) + _IFF.pack(timestamp) + _pack_strings(device_id, name, ip, hostname)
+
+# ----------------------------------------
+# Decoder
+# ----------------------------------------
+def _guess_kind(message):
+    if "batch" in message or "status" in message:
+        return KIND_REPLY
+    if "command" in message:
+        return KIND_COMMAND
+    if "hostname" in message:
+        return KIND_IFF
+    return KIND_HEALTH
+
+
+def _decode_legacy(payload):
+    text = bytes(payload).decode("utf-8")
+    try:
+        message = json.loads(text)
+    except json.JSONDecodeError:
+        # Pre-codec Health_Monitor ping: "timestamp, device_id, name, ip"
+        parts = [p.strip() for p in text.split(",")]
+        if len(parts) != 4:
+            raise Codec_Error(f"Unrecognised payload: {text[:64]!r}")
+        return KIND_HEALTH, {"timestamp": float(parts[0]), "device_id": parts[1], "name": parts[2], "ip": parts[3]}
+    if not isinstance(message, dict):
+        raise Codec_Error("JSON payload must be an object")
+    return _guess_kind(message), message
+
+
+def decode(payload):
+    """Any supported payload -> (kind, dict). Legacy JSON and CSV health pings are accepted."""
+    buf = memoryview(bytes(payload))
+    if not is_binary(buf):
+        return _decode_legacy(buf)
+    try:
+        return _decode_binary(buf)
+    except (struct.error, IndexError) as e:
+        raise Codec_Error(f"Truncated payload: {e}")
+
+
+def _decode_binary(buf):
+    _, version, kind = _HEADER.unpack_from(buf)
+    if version != VERSION:
+        raise Codec_Error(f"Unsupported payload version: {version}")
+    body_msgpack = kind & BODY_MSGPACK
+    kind &= ~BODY_MSGPACK
+    offset = _HEADER.size
+
+    if kind in (KIND_COMMAND, KIND_REPLY):
+        body = bytes(buf[offset:])
+        if body_msgpack:
+            if msgpack is None:
+                raise Codec_Error("msgpack payload received but msgpack is not installed")
+            message = msgpack.unpackb(body, raw=False)
+        else:
+            message = json.loads(body.decode("utf-8"))
+        if not isinstance(message, dict):
+            raise Codec_Error(f"{'Command' if kind == KIND_COMMAND else 'Reply'} body must be a map, got {type(message).__name__}")
+        return kind, message
+
+    if kind == KIND_HEALTH:
+        timestamp, uptime, flags = _HEALTH.unpack_from(buf, offset)
+        device_id, name, ip = _unpack_strings(buf, offset + _HEALTH.size, 3)
+        return kind, {"timestamp": timestamp, "uptime": uptime, "flags": unpack_flags(flags),
+                      "device_id": device_id, "name": name, "ip": ip}
+
+    if kind == KIND_IFF:
+        (timestamp,) = _IFF.unpack_from(buf, offset)
+        device_id, name, ip, hostname = _unpack_strings(buf, offset + _IFF.size, 4)
+        return kind, {"timestamp": timestamp, "device_id": device_id, "name": name, "ip": ip, "hostname": hostname}
+
+    raise Codec_Error(f"Unknown payload kind: {kind}")
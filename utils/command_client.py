@@ -0,0 +1,185 @@
+# python -m utils.command_client status --target global --rounds 20
+# Send correlated commands to devices and measure per-device round-trip latency.
+
+import argparse
+import threading
+import time
+
+import zenoh
+
+from utils.command_protocol import (
+    ACCEPTED, FINAL_STATUSES, make_request, new_correlation_id, unpack_replies, encode, decode,
+)
+
+
+class _Pending:
+    def __init__(self, command, target):
+        self.command = command
+        self.target = target
+        self.sent_at = time.monotonic()
+        self.replies = {}  # device_id -> reply record
+
+
+class Command_Client:
+    """Send commands over Zenoh and collect the correlated replies per device.
+
+    Devices answer on the client's private `reply_to` key, so other
+    controllers never see these replies.
+    """
+    def __init__(self, session=None, reply_to=None, binary=False):
+        self._owns_session = session is None
+        self.binary = binary  # Plain JSON unless asked, every device decodes it
+        self.session = session if session is not None else zenoh.open(zenoh.Config())
+        self.reply_to = reply_to or f"reply/{new_correlation_id()}"
+        self._cond = threading.Condition()
+        self._pending = {}
+        self.subscriber = self.session.declare_subscriber(self.reply_to, self._on_reply)
+
+    def _on_reply(self, sample):
+        received_at = time.monotonic()
+        try:
+            replies = unpack_replies(decode(sample.payload))
+        except ValueError:
+            return
+        with self._cond:
+            for reply in replies:
+                self._record(reply, received_at)
+            self._cond.notify_all()
+
+    def _record(self, reply, received_at):
+        pending = self._pending.get(reply.get("correlation_id"))
+        if pending is None:
+            return
+        record = pending.replies.setdefault(reply.get("device_id"), {})
+        elapsed_ms = round((received_at - pending.sent_at) * 1000, 3)
+        if reply.get("status") == ACCEPTED:
+            record["accepted_ms"] = elapsed_ms
+        else:
+            record["completed_ms"] = elapsed_ms
+            record["status"] = reply.get("status")
+            record["result"] = reply.get("result")
+            record["error"] = reply.get("error")
+            record["queue_ms"] = reply.get("queue_ms")
+            record["exec_ms"] = reply.get("exec_ms")
+
+    def send(self, command, properties=None, target="global"):
+        """Publish a command on `<target>/COMMAND`, returns its correlation ID"""
+        request = make_request(command, properties, reply_to=self.reply_to)
+        with self._cond:
+            self._pending[request["correlation_id"]] = _Pending(command, target)
+        self.session.put(f"{target}/COMMAND", encode(request, self.binary))
+        return request["correlation_id"]
+
+    def wait(self, correlation_id, expected=None, timeout=2.0):
+        """Collect replies until `expected` devices finished or the timeout runs out.
+
+        Returns {device_id: {accepted_ms, completed_ms, status, result, ...}}.
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            pending = self._pending[correlation_id]
+
+            def finished():
+                done = sum(1 for r in pending.replies.values() if r.get("status") in FINAL_STATUSES)
+                return expected is not None and done >= expected
+
+            self._cond.wait_for(finished, max(0.0, deadline - time.monotonic()))
+            del self._pending[correlation_id]
+            return {device: dict(record) for device, record in pending.replies.items()}
+
+    def request(self, command, properties=None, target="global", expected=None, timeout=2.0):
+        correlation_id = self.send(command, properties, target)
+        return self.wait(correlation_id, expected=expected, timeout=timeout)
+
+    def measure_latency(self, command="status", properties=None, target="global", rounds=10,
+                        expected=None, timeout=2.0, interval=0.1):
+        """Round-trip latency per device over several rounds.
+
+        Returns {device_id: {"accepted": stats, "completed": stats, "missed": n}} where
+        stats holds min/p50/p95/max in milliseconds.
+        """
+        samples = {}
+        for _ in range(rounds):
+            replies = self.request(command, properties, target, expected=expected, timeout=timeout)
+            for device, record in replies.items():
+                entry = samples.setdefault(device, {"accepted": [], "completed": []})
+                for key in ("accepted", "completed"):
+                    if f"{key}_ms" in record:
+                        entry[key].append(record[f"{key}_ms"])
+            time.sleep(interval)
+
+        return {
+            device: {
+                "accepted": _summarize(entry["accepted"]),
+                "completed": _summarize(entry["completed"]),
+                "missed": rounds - len(entry["completed"]),
+            }
+            for device, entry in samples.items()
+        }
+
+    def close(self):
+        self.subscriber.undeclare()
+        if self._owns_session:
+            self.session.close()
+
+
+def summarize_replies(replies, mode="counts"):
+    """Aggregate per-device replies into one summary ACK.
+
+    mode "counts" keeps status counts, latency and the devices that failed;
+    "full" also carries every device's result.
+    """
+    statuses = {}
+    failed = {}
+    for device, record in replies.items():
+        status = record.get("status", "no_reply")
+        statuses[status] = statuses.get(status, 0) + 1
+        if record.get("error"):
+            failed[device] = record["error"]
+
+    summary = {
+        "devices": len(replies),
+        "statuses": statuses,
+        "failed": failed,
+        "completed_ms": _summarize([r["completed_ms"] for r in replies.values() if "completed_ms" in r]),
+    }
+    if mode == "full":
+        summary["results"] = {device: record.get("result") for device, record in replies.items()}
+    return summary
+
+
+def _summarize(values):
+    if not values:
+        return {}
+    values = sorted(values)
+    pick = lambda q: values[min(len(values) - 1, int(q * len(values)))]
+    return {"n": len(values), "min": values[0], "p50": pick(0.5), "p95": pick(0.95), "max": values[-1]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fleet command round-trip latency")
+    parser.add_argument("command", nargs="?", default="status")
+    parser.add_argument("--target", default="global", help="global, a group ID or a device ID")
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--expected", type=int, default=None, help="Stop waiting once this many devices replied")
+    parser.add_argument("--timeout", type=float, default=2.0)
+    parser.add_argument("--binary", action="store_true", help="Send the binary codec instead of plain JSON")
+    args = parser.parse_args()
+
+    client = Command_Client(binary=args.binary)
+    try:
+        time.sleep(0.5)  # Let the subscriber propagate before the first request
+        results = client.measure_latency(args.command, target=args.target, rounds=args.rounds,
+                                         expected=args.expected, timeout=args.timeout)
+    finally:
+        client.close()
+
+    print(f"{'device':<24} {'n':>4} {'accept p50':>11} {'accept p95':>11} {'done p50':>9} {'done p95':>9} {'missed':>7}")
+    for device, stats in sorted(results.items()):
+        accepted, completed = stats["accepted"], stats["completed"]
+        print(f"{device:<24} {completed.get('n', 0):>4} {accepted.get('p50', '-'):>11} {accepted.get('p95', '-'):>11} "
+              f"{completed.get('p50', '-'):>9} {completed.get('p95', '-'):>9} {stats['missed']:>7}")
+
+
+if __name__ == "__main__":
+    main()
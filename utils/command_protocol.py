@@ -0,0 +1,93 @@
+import json
+import time
+import uuid
+
+from utils import codec
+
+# ----------------------------------------
+# Command Request / Reply Protocol
+# ----------------------------------------
+# Request:  {"command", "properties", "correlation_id", "reply_to"}
+# Reply:    {"status", "correlation_id", "device_id", "command", "time", ...}
+#   accepted  -> queued on the device, sent as soon as the request is received
+#   rejected  -> unknown command, no completed reply follows
+#   completed -> handler returned, "result" holds its return value
+#   failed    -> handler raised, "error" holds the message
+# Replies go to the request's reply_to key, or <device_id>/ACK when it has none.
+# Replies to the same key inside a short window arrive as {"batch": [reply, ...]}.
+
+ACCEPTED = "accepted"
+REJECTED = "rejected"
+COMPLETED = "completed"
+FAILED = "failed"
+
+FINAL_STATUSES = (REJECTED, COMPLETED, FAILED)
+
+
+def new_correlation_id():
+    return uuid.uuid4().hex
+
+
+def make_request(command, properties=None, correlation_id=None, reply_to=None):
+    request = {
+        "command": command,
+        "properties": properties or {},
+        "correlation_id": correlation_id or new_correlation_id(),
+    }
+    if reply_to:
+        request["reply_to"] = reply_to
+    return request
+
+
+def make_reply(status, correlation_id, device_id, command, **fields):
+    reply = {
+        "status": status,
+        "correlation_id": correlation_id,
+        "device_id": device_id,
+        "command": command,
+        "time": time.time(),
+    }
+    reply.update(fields)
+    return reply
+
+
+def make_batch(replies):
+    return replies[0] if len(replies) == 1 else {"batch": replies}
+
+
+def unpack_replies(message):
+    return message["batch"] if "batch" in message else [message]
+
+
+def to_payload(value):
+    """Convert handler results (including multiprocessing Values) to JSON-safe data"""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, dict):
+        return {str(k): to_payload(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        return [to_payload(v) for v in value]
+    if hasattr(value, "value"):  # Synchronized wrapper types (multiprocessing.Value, etc.)
+        return to_payload(value.value)
+    return str(value)
+
+
+def encode(message, binary=True):
+    """Binary (utils/codec.py) by default, plain JSON for tools that predate the codec"""
+    if not binary:
+        return json.dumps(message).encode("utf-8")
+    kind = codec.KIND_REPLY if "status" in message or "batch" in message else codec.KIND_COMMAND
+    return codec.encode_message(kind, message)
+
+
+def decode(payload):
+    """Binary or JSON payload -> message dict"""
+    return codec.decode(payload)[1]
+
+
+def decode_command(payload):
+    """Like decode, but anything other than a command request raises Codec_Error"""
+    kind, message = codec.decode(payload)
+    if kind != codec.KIND_COMMAND:
+        raise codec.Codec_Error(f"Not a command request (payload kind {kind})")
+    return message
@@ -0,0 +1,75 @@
+import threading
+from bisect import bisect_left
+
+# Bucket upper bounds in milliseconds, anything slower lands in the overflow bucket
+LATENCY_BUCKETS_MS = (0.1, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# ----------------------------------------
+# Latency Histogram
+# ----------------------------------------
+class Latency_Histogram:
+    """Fixed-bucket latency histogram, values in milliseconds."""
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms):
+        self.counts[bisect_left(self.buckets, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the q-th percentile (0-100)."""
+        if self.count == 0:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return self.buckets[i] if i < len(self.buckets) else self.max_ms
+        return self.max_ms
+
+    def snapshot(self):
+        labels = [f"<={b}" for b in self.buckets] + [f">{self.buckets[-1]}"]
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "buckets": {label: n for label, n in zip(labels, self.counts) if n},
+        }
+
+# ----------------------------------------
+# Per-Command Stats
+# ----------------------------------------
+class Command_Stats:
+    """Queue-wait and execution-time histograms for every command a device runs."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._commands = {}
+
+    def record(self, command, wait_s, exec_s):
+        with self._lock:
+            stats = self._commands.get(command)
+            if stats is None:
+                stats = self._commands[command] = (Latency_Histogram(), Latency_Histogram())
+            stats[0].observe(wait_s * 1000)
+            stats[1].observe(exec_s * 1000)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                command: {
+                    "queue_wait": wait.snapshot(),
+                    "execution": execution.snapshot(),
+                }
+                for command, (wait, execution) in self._commands.items()
+            }
@@ -0,0 +1,241 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from multiprocessing import RLock, RawValue
+from pathlib import Path
+
+CONFIG_PATH = Path("device.cfg")
+
+# How often a process re-checks device.cfg's mtime when nobody announced a change
+MTIME_CHECK_INTERVAL = 1.0
+
+# Updates inside this window are merged into a single write (SD card wear)
+WRITE_INTERVAL = 1.0
+
+# A failed write is retried after write_interval, doubling up to this many seconds
+MAX_RETRY_INTERVAL = 60.0
+
+# ----------------------------------------
+# Atomic Writes
+# ----------------------------------------
+def write_json_atomic(path, data):
+    """Write JSON to a temp file, fsync it and rename it over `path`.
+
+    A power cut leaves either the old or the new file on disk, never a torn one.
+    """
+    path = Path(path)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            os.chmod(tmp_path, os.stat(path).st_mode & 0o777)
+        except FileNotFoundError:
+            os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+    # Persist the rename itself
+    dir_fd = os.open(path.parent, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+# ----------------------------------------
+# Typed Keys
+# ----------------------------------------
+class _Config_Key:
+    """Typed, defaulted accessor for one device.cfg key."""
+    def __init__(self, key, cast, default):
+        self.key = key
+        self.cast = cast
+        self.default = default
+
+    def __get__(self, store, owner):
+        if store is None:
+            return self
+        value = store.get(self.key, self.default)
+        try:
+            return self.cast(value)
+        except (TypeError, ValueError):
+            return self.cast(self.default)
+
+# ----------------------------------------
+# Config Store
+# ----------------------------------------
+class Config_Store:
+    """device.cfg parsed once and cached in memory.
+
+    Create it before starting worker processes: the generation counter lives in
+    shared memory, so a write in any process makes every other process reload on
+    its next access. Edits made outside the store are picked up by an mtime check
+    at most once per MTIME_CHECK_INTERVAL.
+
+    update() merges keys into the file: bursts are coalesced into one atomic
+    write per write_interval, and pending values are visible locally right away.
+    """
+    device_id = _Config_Key("device_id", str, "")
+    group_id = _Config_Key("group_id", str, "default_group")
+    device_name = _Config_Key("device_name", str, "unknown")
+    cfg_port = _Config_Key("cfg_port", int, 8088)
+    wire_format = _Config_Key("wire_format", str, "json")  # "binary" opts in to utils/codec.py, once every subscriber decodes it
+    health_sample_interval = _Config_Key("health_sample_interval", float, 2.0)  # Seconds
+    video_starting_port = _Config_Key("video_starting_port", int, 5555)
+    cached_frames = _Config_Key("cached_frames", int, 3)
+    shm_path = _Config_Key("shm_path", str, "/tmp/testshm")
+    shm_format = _Config_Key("shm_format", dict, {})
+    upload_port = _Config_Key("upload_port", int, 9001)
+    upload_target = _Config_Key("upload_target", str, "10.0.0.1")
+    upload_api_endpoint = _Config_Key("upload_api_endpoint", str, "/upload_chunk")
+    upload_api_key = _Config_Key("upload_api_key", str, "your_default_api_key")
+    upload_secret_key = _Config_Key("upload_secret_key", str, "default_secret_key")
+    upload_chunk_size = _Config_Key("upload_chunk_size", int, 10)  # MB
+    focus_depth = _Config_Key("focus_depth", dict, {})
+    camera_correction = _Config_Key("camera_correction", dict, {})
+
+    def __init__(self, path=CONFIG_PATH, logger=None, write_interval=WRITE_INTERVAL):
+        self.path = Path(path)
+        self.logger = logger
+        self.write_interval = write_interval
+        self.lock = RLock()  # Serializes writers across processes
+        self._generation = RawValue("Q", 0)
+        self._local_lock = threading.Lock()
+        self._data = {}
+        self._seen_generation = -1
+        self._mtime_ns = None
+        self._next_check = 0.0
+        self._pending = {}
+        self._flush_timer = None
+        self._last_write = 0.0
+        self._retry_delay = 0.0
+        self._refresh(force=True)
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        # The parent's flush timer did not survive the fork and its pending keys are its own to write
+        self._local_lock = threading.Lock()
+        self._pending = {}
+        self._flush_timer = None
+
+    def __getstate__(self):
+        # Pickled for a spawn or forkserver worker: the shared generation and writer lock go along, local state does not
+        state = self.__dict__.copy()
+        del state["_local_lock"], state["_flush_timer"]
+        state["_pending"] = {}
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local_lock = threading.Lock()
+        self._flush_timer = None
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _warn(self, message):
+        if self.logger:
+            self.logger.warning(message)
+
+    def _refresh(self, force=False):
+        now = time.monotonic()
+        generation = self._generation.value
+        if not force and generation == self._seen_generation and now < self._next_check:
+            return
+
+        with self._local_lock:
+            self._next_check = now + MTIME_CHECK_INTERVAL
+            try:
+                mtime_ns = os.stat(self.path).st_mtime_ns
+            except FileNotFoundError:
+                mtime_ns = None
+            if force or generation != self._seen_generation or mtime_ns != self._mtime_ns:
+                self._data = self._read()
+                self._mtime_ns = mtime_ns
+            self._seen_generation = generation
+
+    def _read(self):
+        try:
+            with self.path.open("r") as f:
+                data = json.load(f)
+            if not isinstance(data, dict):
+                raise ValueError("top level must be an object")
+            return data
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            self._warn(f"Failed to read {self.path}: {e}")
+            return self._data
+
+    def get(self, key, default=None):
+        self._refresh()
+        pending = self._pending
+        if key in pending:
+            return pending[key]
+        return self._data.get(key, default)
+
+    def snapshot(self):
+        self._refresh()
+        return {**self._data, **self._pending}
+
+    def update(self, values=None, **kwargs):
+        """Merge keys into device.cfg, written within write_interval"""
+        with self._local_lock:
+            self._pending.update(values or {})
+            self._pending.update(kwargs)
+            self._schedule(max(0.0, self._last_write + self.write_interval - time.monotonic()))
+
+    def _schedule(self, delay):
+        """Arm the flush timer unless it already is, call with _local_lock held"""
+        if self._flush_timer is None:
+            self._flush_timer = threading.Timer(delay, self.flush)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def flush(self):
+        """Write pending updates now. Returns False if the write failed: they stay pending and
+        the write is retried, backing off up to MAX_RETRY_INTERVAL."""
+        # Taken before the pending keys, so a flush racing the timer's returns after its write
+        with self.lock:
+            with self._local_lock:
+                if self._flush_timer is not None:
+                    self._flush_timer.cancel()
+                    self._flush_timer = None
+                pending, self._pending = self._pending, {}
+                self._data = {**self._data, **pending}  # Stay visible while the write is in flight
+            if not pending:
+                return True
+
+            # Merge onto what is on disk now, other processes may have written other keys
+            data = dict(self._read())
+            data.update(pending)
+            try:
+                write_json_atomic(self.path, data)
+            except OSError as e:
+                with self._local_lock:
+                    self._pending = {**pending, **self._pending}
+                    self._retry_delay = min(max(self.write_interval, self._retry_delay * 2), MAX_RETRY_INTERVAL)
+                    self._schedule(self._retry_delay)
+                self._warn(f"Failed to write {self.path}, retrying in {self._retry_delay:.0f}s: {e}")
+                return False
+            self.invalidate()
+        self._last_write = time.monotonic()
+        self._retry_delay = 0.0
+        return True
+
+    def pending(self):
+        """Keys updated but not yet written"""
+        with self._local_lock:
+            return list(self._pending)
+
+    def invalidate(self):
+        """Tell every process sharing this store to reload on its next access"""
+        with self.lock:
+            self._generation.value += 1
@@ -0,0 +1,258 @@
+import ctypes
+import ctypes.util
+import os
+import re
+import select
+import sqlite3
+import struct
+import threading
+from pathlib import Path
+
+TRIALS_DIR = Path("./trials")
+INDEX_NAME = ".index.db"  # Dotfiles in the trials directory are never indexed
+POLL_INTERVAL = 5.0  # Seconds between directory checks when inotify is unavailable
+
+# Recorder output: <%Y-%m-%d_%H-%M-%S>_<trial or device>_C<camera>.<ext>
+FILENAME_PATTERN = re.compile(r"^(\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2})_(.+)_C(\d+)\.\w+$")
+
+SORT_COLUMNS = {"modified": "mtime", "size": "size", "name": "name"}
+UPLOAD_PENDING = "pending"
+UPLOAD_DONE = "uploaded"
+UPLOAD_FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    name TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    trial TEXT,
+    camera INTEGER,
+    upload_status TEXT NOT NULL DEFAULT 'pending'
+);
+CREATE INDEX IF NOT EXISTS files_mtime ON files (mtime);
+CREATE INDEX IF NOT EXISTS files_size ON files (size);
+CREATE INDEX IF NOT EXISTS files_trial ON files (trial);
+CREATE INDEX IF NOT EXISTS files_camera ON files (camera, mtime);
+CREATE INDEX IF NOT EXISTS files_upload ON files (upload_status, mtime);
+"""
+
+
+def _prefix_end(prefix):
+    """Smallest string above every string starting with prefix, in SQLite's binary order"""
+    stripped = prefix.rstrip(chr(0x10FFFF))
+    if not stripped:
+        return chr(0x10FFFF) * (len(prefix) + 1)  # Unreachable for real trial names
+    following = ord(stripped[-1]) + 1
+    return stripped[:-1] + chr(0xE000 if 0xD800 <= following < 0xE000 else following)  # Surrogates don't encode
+
+# ----------------------------------------
+# File Index
+# ----------------------------------------
+class File_Index:
+    """SQLite index of the trials directory.
+
+    Safe to create before forking or spawning: every process and thread opens its own
+    connection on first use. The database runs in WAL mode, so the Config API
+    can read while a recorder or the watcher writes.
+    """
+    def __init__(self, root=TRIALS_DIR, db_path=None, logger=None):
+        self.root = Path(root)
+        self.db_path = Path(db_path) if db_path else self.root / INDEX_NAME
+        self.logger = logger
+        self._local = threading.local()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_local"]  # Connections never cross processes
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    def _connection(self):
+        local = self._local
+        if getattr(local, "pid", None) != os.getpid():
+            self.root.mkdir(parents=True, exist_ok=True)
+            local.connection = sqlite3.connect(self.db_path, timeout=5.0, isolation_level=None)
+            local.connection.execute("PRAGMA journal_mode=WAL")
+            local.connection.execute("PRAGMA synchronous=NORMAL")
+            local.connection.executescript(_SCHEMA)
+            local.counts, local.version = {}, None
+            local.pid = os.getpid()
+        return local.connection
+
+    @staticmethod
+    def indexable(name):
+        return not name.startswith(".")
+
+    def upsert(self, path, upload_status=None):
+        """Add or refresh one file, keeps its upload status unless one is given"""
+        path = Path(path)
+        if not self.indexable(path.name):
+            return
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            self.remove(path.name)
+            return
+        match = FILENAME_PATTERN.match(path.name)
+        trial, camera = (match.group(2), int(match.group(3))) if match else (None, None)
+        self._connection().execute(
+            "INSERT INTO files (name, size, mtime, trial, camera, upload_status) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET size=excluded.size, mtime=excluded.mtime, "
+            "upload_status=COALESCE(?, files.upload_status)",
+            (path.name, stat.st_size, stat.st_mtime, trial, camera, upload_status or UPLOAD_PENDING, upload_status),
+        )
+
+    def remove(self, name):
+        self._connection().execute("DELETE FROM files WHERE name = ?", (name,))
+
+    def set_upload_status(self, name, status):
+        self._connection().execute("UPDATE files SET upload_status = ? WHERE name = ?", (status, Path(name).name))
+
+    def sync(self):
+        """Reconcile with the directory. Full scan, only for startup and the polling fallback."""
+        if not self.root.is_dir():
+            return
+        on_disk = {}
+        with os.scandir(self.root) as entries:
+            for entry in entries:
+                if entry.is_file() and self.indexable(entry.name):
+                    stat = entry.stat()
+                    on_disk[entry.name] = (stat.st_size, stat.st_mtime)
+        connection = self._connection()
+        indexed = {name: (size, mtime) for name, size, mtime in connection.execute("SELECT name, size, mtime FROM files")}
+        for name in indexed.keys() - on_disk.keys():
+            self.remove(name)
+        for name, values in on_disk.items():
+            if indexed.get(name) != values:
+                self.upsert(self.root / name)
+
+    def query(self, offset=0, limit=100, sort="modified", descending=True,
+              trial=None, camera=None, upload_status=None):
+        """One page of files plus the total matching count"""
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"sort must be one of {', '.join(SORT_COLUMNS)}")
+        where, params = [], []
+        if trial:
+            # Prefix match as a range, so it can use files_trial (LIKE is case-insensitive and can't)
+            where.append("trial >= ? AND trial < ?")
+            params += [trial, _prefix_end(trial)]
+        if camera is not None:
+            where.append("camera = ?")
+            params.append(camera)
+        if upload_status:
+            where.append("upload_status = ?")
+            params.append(upload_status)
+        clause = f" WHERE {' AND '.join(where)}" if where else ""
+
+        connection = self._connection()
+        total = self._count(connection, clause, params)
+        rows = connection.execute(
+            f"SELECT name, size, mtime, trial, camera, upload_status FROM files{clause} "
+            f"ORDER BY {SORT_COLUMNS[sort]} {'DESC' if descending else 'ASC'}, name LIMIT ? OFFSET ?",
+            params + [limit, offset],
+        ).fetchall()
+        keys = ("name", "size", "mtime", "trial", "camera", "upload_status")
+        return [dict(zip(keys, row)) for row in rows], total
+
+    def _count(self, connection, clause, params):
+        """COUNT(*) scans every matching row, so keep it per filter until the table changes.
+        data_version moves on commits from other connections, total_changes on our own."""
+        local = self._local
+        version = (connection.execute("PRAGMA data_version").fetchone()[0], connection.total_changes)
+        if local.version != version:
+            local.counts, local.version = {}, version
+        key = (clause, tuple(params))
+        if key not in local.counts:
+            local.counts[key] = connection.execute(f"SELECT COUNT(*) FROM files{clause}", params).fetchone()[0]
+        return local.counts[key]
+
+# ----------------------------------------
+# Directory Watcher
+# ----------------------------------------
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_DELETE = 0x200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_EVENT = struct.Struct("iIII")
+
+
+def _inotify():
+    """libc with inotify symbols, or None off Linux"""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    except OSError:
+        return None
+    return libc if hasattr(libc, "inotify_init1") and hasattr(libc, "inotify_add_watch") else None
+
+
+class Index_Watcher:
+    """Keeps a File_Index current: inotify on Linux, directory mtime polling elsewhere"""
+    def __init__(self, index, logger=None):
+        self.index = index
+        self.logger = logger
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.index.root.mkdir(parents=True, exist_ok=True)
+        self.index.sync()
+        self._thread = threading.Thread(target=self._run, name="index_watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=POLL_INTERVAL + 1)
+
+    def _run(self):
+        libc = _inotify()
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC) if libc else -1
+        if fd < 0:
+            if self.logger:
+                self.logger.info("inotify unavailable, polling the trials directory instead.")
+            return self._poll()
+        try:
+            mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_DELETE
+            if libc.inotify_add_watch(fd, os.fsencode(self.index.root), mask) < 0:
+                return self._poll()
+            while not self._stop.is_set():
+                ready, _, _ = select.select([fd], [], [], 1.0)
+                if ready:
+                    self._handle(os.read(fd, 64 * 1024))
+        finally:
+            os.close(fd)
+
+    def _handle(self, buf):
+        offset = 0
+        while offset < len(buf):
+            _, mask, _, length = _EVENT.unpack_from(buf, offset)
+            offset += _EVENT.size
+            name = buf[offset:offset + length].rstrip(b"\0").decode("utf-8", "replace")
+            offset += length
+            if not name or not self.index.indexable(name):
+                continue
+            try:
+                if mask & (IN_DELETE | IN_MOVED_FROM):
+                    self.index.remove(name)
+                else:
+                    self.index.upsert(self.index.root / name)
+            except sqlite3.Error as e:
+                if self.logger:
+                    self.logger.warning(f"File index update failed for {name}: {e}")
+
+    def _poll(self):
+        last = None
+        while not self._stop.wait(POLL_INTERVAL):
+            try:
+                mtime = os.stat(self.index.root).st_mtime_ns
+                if mtime != last:
+                    self.index.sync()
+                    last = mtime
+            except (OSError, sqlite3.Error) as e:
+                if self.logger:
+                    self.logger.warning(f"File index poll failed: {e}")
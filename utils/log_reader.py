@@ -0,0 +1,149 @@
+import json
+import logging
+import os
+import re
+
+from utils.log_store import LOG_DIR, ACTIVE_NAME, level_number
+
+LOG_PATH = os.path.join(LOG_DIR, ACTIVE_NAME)  # The active segment, older ones are searched with log_store.query
+BLOCK_SIZE = 64 * 1024  # Bytes read per step when walking backwards from the end
+
+# Lines are JSON records written by utils/log_store.py. Plain "<asctime> [<LEVEL>] <message>"
+# lines from older builds are still parsed, anything else comes back with level None.
+LINE_PATTERN = re.compile(r"^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}(?:,\d{3})?) \[([A-Z]+)\] (.*)$")
+
+# ----------------------------------------
+# Parsing
+# ----------------------------------------
+def parse_line(raw, offset):
+    text = raw.decode("utf-8", "replace").rstrip("\r")
+    if text.startswith("{"):
+        try:
+            record = json.loads(text)
+            if isinstance(record, dict):
+                return {"offset": offset, **record}
+        except ValueError:
+            pass
+    match = LINE_PATTERN.match(text)
+    if match is None:
+        return {"offset": offset, "time": None, "level": None, "msg": text}
+    time_, level, msg = match.groups()
+    return {"offset": offset, "time": time_, "level": level, "msg": msg}
+
+
+def level_filter(level):
+    """Keep entries at `level` or above, None keeps everything"""
+    if not level:
+        return lambda entry: True
+    minimum = logging.getLevelName(level.upper())
+    if not isinstance(minimum, int):
+        raise ValueError(f"Unknown log level: {level}")
+    return lambda entry: level_number(entry.get("level")) >= minimum  # Unknown and custom names count as 0
+
+# ----------------------------------------
+# Cursors
+# ----------------------------------------
+# A position in the active segment is "<inode>:<offset>". Rotation renames the segment and
+# opens a new file, so a cursor from before it names another inode and restarts at 0.
+def format_cursor(inode, offset):
+    return f"{inode}:{offset}"
+
+
+def parse_cursor(cursor):
+    """(inode or None, offset) from a cursor, a bare offset from older clients has no inode"""
+    inode, _, offset = str(cursor).rpartition(":")
+    if not offset.isdigit() or (inode and not inode.isdigit()):
+        raise ValueError(f"Invalid log cursor: {cursor}")
+    return (int(inode) if inode else None), int(offset)
+
+
+def end_cursor(path):
+    """Cursor at the current end of the file, where a live tail starts"""
+    stat = os.stat(path)
+    return format_cursor(stat.st_ino, stat.st_size)
+
+# ----------------------------------------
+# Readers
+# ----------------------------------------
+def _last_line_end(f):
+    """Offset just past the last newline; a line still being written is left out"""
+    position = f.seek(0, 2)
+    while position > 0:
+        size = min(BLOCK_SIZE, position)
+        f.seek(position - size)
+        index = f.read(size).rfind(b"\n")
+        if index >= 0:
+            return position - size + index + 1
+        position -= size
+    return 0
+
+
+def read_tail(path, count, level=None):
+    """Last `count` matching lines, read backwards block by block.
+
+    Returns (entries oldest first, cursor). The cursor is just past the last
+    complete line, pass it to read_since to continue from there.
+    """
+    keep = level_filter(level)
+    entries = []
+    with open(path, "rb") as f:
+        inode = os.fstat(f.fileno()).st_ino
+        end = _last_line_end(f)
+        position = end
+        carry = b""
+        while position > 0 and len(entries) < count:
+            size = min(BLOCK_SIZE, position)
+            position -= size
+            f.seek(position)
+            data = f.read(size) + carry
+            lines = data.split(b"\n")
+            lines.pop()  # Empty: the block always ends on a newline (or the carried line's end)
+            # The first piece may continue into the previous block
+            if position > 0:
+                carry = lines.pop(0) + b"\n"
+                start = position + len(carry)
+            else:
+                carry = b""
+                start = 0
+
+            offsets = []
+            for line in lines:
+                offsets.append(start)
+                start += len(line) + 1
+            for line, offset in zip(reversed(lines), reversed(offsets)):
+                if not line:
+                    continue
+                entry = parse_line(line, offset)
+                if keep(entry):
+                    entries.append(entry)
+                    if len(entries) == count:
+                        break
+    entries.reverse()
+    return entries, format_cursor(inode, end)
+
+
+def read_since(path, cursor, limit=1000, level=None):
+    """Up to `limit` matching complete lines starting at `cursor`.
+
+    Returns (entries, next cursor). A cursor from another inode means the segment
+    was rotated, one past the end of the file that it was truncated: either way
+    reading starts over from the beginning.
+    """
+    keep = level_filter(level)
+    inode, offset = parse_cursor(cursor)
+    entries = []
+    with open(path, "rb") as f:
+        current = os.fstat(f.fileno()).st_ino
+        size = f.seek(0, 2)
+        if offset > size or inode not in (None, current):
+            offset = 0
+        f.seek(offset)
+        while len(entries) < limit:
+            line = f.readline()
+            if not line.endswith(b"\n"):
+                break  # End of file, or a line that is still being written
+            entry = parse_line(line[:-1], offset)
+            offset += len(line)
+            if line.strip() and keep(entry):
+                entries.append(entry)
+    return entries, format_cursor(current, offset)
@@ -0,0 +1,371 @@
+import gzip
+import itertools
+import json
+import logging
+import os
+import re
+import struct
+import threading
+import time
+from datetime import datetime
+
+LOG_DIR = "./logs"
+ACTIVE_NAME = "logs.jsonl"  # The segment being written, rotated ones are logs-<start>.jsonl.gz
+STARTUP_NAME = "startup.jsonl"  # startup.py's records while the stack runs, the log listener copies them in
+INDEX_SUFFIX = ".idx"
+POSITION_SUFFIX = ".pos"  # Log_Follower's read position
+SEGMENT_SIZE = 16 * 1024 * 1024  # Bytes before the active segment is rotated
+SEGMENT_AGE = 24 * 3600  # Seconds before the active segment is rotated, whatever its size
+KEEP_SEGMENTS = 30  # Rotated segments kept, the oldest are deleted past this
+INDEX_BLOCK = 64 * 1024  # Bytes of log lines per index entry, and per gzip member once compressed
+
+# Index entry per block: offset, length (compressed once rotated), first and last
+# record time, highest level number. Queries skip any block that can't match.
+_ENTRY = struct.Struct("<QQddH")
+_SEGMENT_NAME = re.compile(r"^logs-(\d{8}-\d{6})\.jsonl(\.gz)?$")
+
+# ----------------------------------------
+# Records
+# ----------------------------------------
+def level_number(name):
+    number = logging.getLevelName(name) if name and isinstance(name, str) else 0
+    return number if isinstance(number, int) else 0
+
+
+class Json_Formatter(logging.Formatter):
+    """One JSON object per record: t, time, level, logger, process, pid, msg"""
+    def format(self, record):
+        message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            message = f"{message}\n{record.exc_text}"
+        return json.dumps({
+            "t": round(record.created, 3),
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "process": record.processName,
+            "pid": record.process,
+            "msg": message,
+        }, ensure_ascii=False)
+
+
+def parse_time(value):
+    """Epoch seconds, an ISO date-time, or HH:MM[:SS] meaning today"""
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    if re.fullmatch(r"\d{1,2}:\d{2}(:\d{2})?", value):
+        value = f"{datetime.now():%Y-%m-%d}T{value}"
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise ValueError(f"Invalid time: {value}")
+
+# ----------------------------------------
+# Segment Index
+# ----------------------------------------
+def read_index(path):
+    try:
+        with open(path + INDEX_SUFFIX, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return []
+    usable = len(data) - len(data) % _ENTRY.size  # A torn last entry is ignored
+    return [_ENTRY.unpack_from(data, i) for i in range(0, usable, _ENTRY.size)]
+
+
+def rotated_segments(directory=LOG_DIR):
+    """Rotated segment paths, oldest first"""
+    found = {}
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    for name in names:
+        match = _SEGMENT_NAME.match(name)
+        if match and (match.group(2) or match.group(1) not in found):
+            found[match.group(1)] = os.path.join(directory, name)  # A .gz wins over a plain one mid compression
+    return [found[stamp] for stamp in sorted(found)]
+
+
+def segments(directory=LOG_DIR):
+    """Rotated segment paths oldest first, then the active one"""
+    paths = rotated_segments(directory)
+    active = os.path.join(directory, ACTIVE_NAME)
+    if os.path.exists(active):
+        paths.append(active)
+    return paths
+
+
+def _segment_time(path):
+    stamp = _SEGMENT_NAME.match(os.path.basename(path)).group(1)
+    return int(datetime.strptime(stamp, "%Y%m%d-%H%M%S").timestamp())
+
+
+def compress_segment(path):
+    """Rewrite a rotated segment as one gzip member per index block, then drop the plain file"""
+    target = path + ".gz"
+    entries = []
+    with open(path, "rb") as source, open(target + ".tmp", "wb") as out:
+        for offset, length, first, last, level in read_index(path):
+            source.seek(offset)
+            member = gzip.compress(source.read(length), compresslevel=6, mtime=0)
+            entries.append(_ENTRY.pack(out.tell(), len(member), first, last, level))
+            out.write(member)
+        out.flush()
+        os.fsync(out.fileno())
+    with open(target + INDEX_SUFFIX + ".tmp", "wb") as f:
+        f.write(b"".join(entries))
+    os.replace(target + INDEX_SUFFIX + ".tmp", target + INDEX_SUFFIX)
+    os.replace(target + ".tmp", target)
+    os.unlink(path)
+    os.unlink(path + INDEX_SUFFIX)
+
+# ----------------------------------------
+# Writer
+# ----------------------------------------
+class Log_Store_Handler(logging.Handler):
+    """Appends JSON lines to the active segment, rotates it by size and age.
+
+    Rotated segments are gzip compressed in a background thread and the oldest
+    are deleted past `keep`. Only one process may write: the log listener.
+    Nothing is flushed per record, the listener calls flush() once per batch.
+    """
+    def __init__(self, directory=LOG_DIR, max_bytes=SEGMENT_SIZE, max_age=SEGMENT_AGE, keep=KEEP_SEGMENTS):
+        super().__init__()
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.keep = keep
+        self.path = os.path.join(directory, ACTIVE_NAME)
+        self.setFormatter(Json_Formatter())
+        os.makedirs(directory, exist_ok=True)
+        rotated = rotated_segments(directory)
+        self.last_stamp = _segment_time(rotated[-1]) if rotated else 0
+        self._open()
+        # A crash between rotation and compression leaves plain segments behind
+        self._compress([path for path in rotated if not path.endswith(".gz")])
+
+    def _open(self):
+        self.stream = open(self.path, "ab")
+        self.index = open(self.path + INDEX_SUFFIX, "ab")
+        self.size = self.stream.tell()
+        entries = read_index(self.path)
+        self.block_start = entries[-1][0] + entries[-1][1] if entries else 0
+        self.index.truncate(len(entries) * _ENTRY.size)
+        self.block_first = self.block_last = None
+        self.block_level = 0
+        self.opened = time.time()
+        if self.size:
+            with open(self.path, "rb") as f:
+                try:
+                    self.opened = float(json.loads(f.readline())["t"])  # Age counts from the first record
+                except (ValueError, KeyError, TypeError):
+                    pass
+                # Lines after the last index entry (a previous run, startup.py) start the current block
+                f.seek(self.block_start)
+                for line in f:
+                    self._track(line)
+
+    def _track(self, line):
+        try:
+            entry = json.loads(line)
+            t = float(entry["t"])
+        except (ValueError, KeyError, TypeError):
+            return
+        self.block_first = t if self.block_first is None else min(self.block_first, t)
+        self.block_last = t if self.block_last is None else max(self.block_last, t)
+        self.block_level = max(self.block_level, level_number(entry.get("level")))
+
+    def _close_block(self):
+        if self.size > self.block_start:
+            # A block without a single JSON record (a legacy file) must never be skipped
+            first = self.block_first if self.block_first is not None else float("-inf")
+            last = self.block_last if self.block_last is not None else float("inf")
+            self.index.write(_ENTRY.pack(self.block_start, self.size - self.block_start, first, last, self.block_level))
+        self.block_start = self.size
+        self.block_first = self.block_last = None
+        self.block_level = 0
+
+    def emit(self, record):
+        try:
+            self._append((self.format(record) + "\n").encode("utf-8"), record.created, record.levelno)
+        except Exception:
+            self.handleError(record)
+
+    def append_line(self, line):
+        """Store one JSON record line formatted by another process, anything unparsable is dropped"""
+        try:
+            entry = json.loads(line)
+            created = float(entry["t"])
+        except (ValueError, KeyError, TypeError):
+            return
+        with self.lock:
+            self._append(line.rstrip(b"\n") + b"\n", created, level_number(entry.get("level")))
+
+    def _append(self, line, created, levelno):
+        if self.size and (self.size + len(line) > self.max_bytes or created - self.opened > self.max_age):
+            self._rotate()
+        self.stream.write(line)
+        self.size += len(line)
+        self.block_first = created if self.block_first is None else min(self.block_first, created)
+        self.block_last = created if self.block_last is None else max(self.block_last, created)
+        self.block_level = max(self.block_level, levelno)
+        if self.size - self.block_start >= INDEX_BLOCK:
+            self._close_block()
+
+    def flush(self):
+        with self.lock:
+            if self.stream:
+                self.stream.flush()
+                self.index.flush()
+
+    def _rotate(self):
+        self._close_block()
+        self.stream.close()
+        self.index.close()
+        # Names must keep increasing: pruning deletes whatever sorts first
+        self.last_stamp = max(int(self.opened), self.last_stamp + 1)
+        rotated = os.path.join(self.directory, f"logs-{datetime.fromtimestamp(self.last_stamp):%Y%m%d-%H%M%S}.jsonl")
+        os.replace(self.path + INDEX_SUFFIX, rotated + INDEX_SUFFIX)
+        os.replace(self.path, rotated)
+        self._open()
+        self._compress([rotated])
+
+    def _compress(self, paths):
+        if not paths:
+            return
+
+        def run():
+            for path in paths:
+                try:
+                    compress_segment(path)
+                except OSError:
+                    pass  # Left plain, retried on the next start
+            rotated = rotated_segments(self.directory)
+            for path in rotated[:max(0, len(rotated) - self.keep)]:
+                for stale in (path, path + INDEX_SUFFIX):
+                    try:
+                        os.unlink(stale)
+                    except FileNotFoundError:
+                        pass
+
+        threading.Thread(target=run, name="log_compress", daemon=True).start()
+
+    def close(self):
+        with self.lock:
+            if self.stream:
+                self._close_block()
+                self.stream.close()
+                self.index.close()
+                self.stream = None
+        super().close()
+
+# ----------------------------------------
+# Follower
+# ----------------------------------------
+class Log_Follower:
+    """Complete lines appended to a file by a process outside the log queue (startup.py).
+
+    How far it was read is kept in <path>.pos as "<inode>:<offset>", so every line
+    is handed out once across listener restarts, and a replaced file starts over.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.inode, self.offset = None, 0
+        try:
+            with open(path + POSITION_SUFFIX) as f:
+                inode, offset = f.read().split(":")
+            self.inode, self.offset = int(inode), int(offset)
+        except (FileNotFoundError, ValueError):
+            pass
+
+    def poll(self):
+        """Lines appended since the last call"""
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return []
+        with f:
+            stat = os.fstat(f.fileno())
+            if stat.st_ino != self.inode or stat.st_size < self.offset:
+                self.inode, self.offset = stat.st_ino, 0
+            f.seek(self.offset)
+            data = f.read(stat.st_size - self.offset)
+        end = data.rfind(b"\n") + 1  # A line still being written waits for the next call
+        if not end:
+            return []
+        self.offset += end
+        with open(self.path + POSITION_SUFFIX + ".tmp", "w") as f:
+            f.write(f"{self.inode}:{self.offset}")
+        os.replace(self.path + POSITION_SUFFIX + ".tmp", self.path + POSITION_SUFFIX)
+        return data[:end].splitlines()
+
+# ----------------------------------------
+# Queries
+# ----------------------------------------
+def _read_block(f, compressed, offset, length):
+    f.seek(offset)
+    data = f.read(length)
+    return gzip.decompress(data) if compressed else data
+
+
+def query(directory=LOG_DIR, start=None, end=None, level=None, process=None, logger=None, limit=1000):
+    """Records in [start, end] at `level` or above, oldest first.
+
+    Only index blocks whose time range and highest level can match are read,
+    plus the unindexed tail of the active segment. `process` and `logger` are
+    exact matches on the process name (Camera_Recorder_0) and logger name.
+    Without a start it is the last `limit` matches, read from the newest segment back.
+    """
+    minimum = level_number(level.upper()) if level else 0
+    if level and not minimum:
+        raise ValueError(f"Unknown log level: {level}")
+    latest = start is None
+    start = float("-inf") if start is None else start
+    end = float("inf") if end is None else end
+
+    results = list(itertools.islice(_matches(directory, start, end, minimum, process, logger, latest), limit))
+    return results[::-1] if latest else results
+
+
+def _matches(directory, start, end, minimum, process, logger, latest):
+    paths = segments(directory)
+    for path in reversed(paths) if latest else paths:
+        candidates = [path] if path.endswith(".gz") or path.endswith(ACTIVE_NAME) else [path, path + ".gz"]
+        for candidate in candidates:
+            try:
+                for entry in _scan_segment(candidate, start, end, minimum, latest):
+                    if (process and entry.get("process") != process) or (logger and entry.get("logger") != logger):
+                        continue
+                    yield entry
+                break
+            except FileNotFoundError:
+                continue  # Compressed (try the .gz) or pruned while we were listing
+
+
+def _scan_segment(path, start, end, minimum, backwards=False):
+    compressed = path.endswith(".gz")
+    entries = read_index(path)
+    with open(path, "rb") as f:
+        blocks = [(offset, length) for offset, length, first, last, top in entries
+                  if last >= start and first <= end and top >= minimum]
+        if not compressed:
+            indexed_end = entries[-1][0] + entries[-1][1] if entries else 0
+            tail = f.seek(0, 2) - indexed_end
+            if tail > 0:
+                blocks.append((indexed_end, tail))
+        for offset, length in reversed(blocks) if backwards else blocks:
+            lines = _read_block(f, compressed, offset, length).splitlines()
+            for line in reversed(lines) if backwards else lines:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # A line still being written, or a legacy one
+                if isinstance(entry, dict) and start <= entry.get("t", 0) <= end and level_number(entry.get("level")) >= minimum:
+                    yield entry
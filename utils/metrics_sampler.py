@@ -0,0 +1,108 @@
+import threading
+import time
+
+import psutil
+
+# ----------------------------------------
+# Background System Metrics
+# ----------------------------------------
+def read_temperature(default=None):
+    """First available sensor reading in °C, `default` where psutil has none"""
+    try:
+        temps = psutil.sensors_temperatures() if hasattr(psutil, "sensors_temperatures") else {}
+    except Exception:
+        return default
+    for entries in temps.values():
+        if entries:
+            return entries[0].current
+    return default
+
+
+class Metrics_Sampler:
+    """Samples CPU, memory, disk, temperature and per-worker usage on a thread.
+
+    Readers get the last snapshot, so serving it never waits on psutil.
+    `pids` returns {worker name: pid} and is called on every sample,
+    `on_sample` (optional) receives every new snapshot.
+    """
+    def __init__(self, pids=None, interval=2.0, disk_path="/", logger=None, on_sample=None):
+        self.pids = pids or (lambda: {})
+        self.on_sample = on_sample
+        self.interval = interval
+        self.disk_path = disk_path
+        self.logger = logger
+        self._processes = {}  # pid -> psutil.Process, kept so cpu_percent has a baseline
+        self._snapshot = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def snapshot(self):
+        return self._snapshot
+
+    def start(self):
+        # Prime the CPU counters so the first real sample covers a full interval
+        psutil.cpu_percent(interval=None, percpu=True)
+        self.sample()
+        self._thread = threading.Thread(target=self._run, name="metrics_sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.sample()
+            except Exception as e:
+                if self.logger:
+                    self.logger.warning(f"Metrics sample failed: {e}")
+
+    def _process(self, pid):
+        process = self._processes.get(pid)
+        if process is None:
+            process = psutil.Process(pid)
+            process.cpu_percent(interval=None)  # Baseline, the next call reports usage since now
+            self._processes[pid] = process
+        return process
+
+    def _sample_workers(self):
+        workers = {}
+        alive = set()
+        for name, pid in self.pids().items():
+            if not pid:
+                continue
+            try:
+                process = self._process(pid)
+                with process.oneshot():
+                    workers[name] = {
+                        "pid": pid,
+                        "cpu_percent": round(process.cpu_percent(interval=None), 1),
+                        "rss_mb": round(process.memory_info().rss / (1024**2), 1),
+                    }
+                alive.add(pid)
+            except psutil.Error:
+                workers[name] = {"pid": pid, "cpu_percent": None, "rss_mb": None}
+        for pid in set(self._processes) - alive:
+            del self._processes[pid]
+        return workers
+
+    def sample(self):
+        per_core = psutil.cpu_percent(interval=None, percpu=True)
+        memory = psutil.virtual_memory()
+        disk = psutil.disk_usage(self.disk_path)
+        # Build a new dict and swap it in, readers never see a half-filled snapshot
+        self._snapshot = {
+            "time": time.time(),
+            "cpu_percent": round(sum(per_core) / len(per_core), 1) if per_core else 0.0,
+            "cpu_per_core": [round(core, 1) for core in per_core],
+            "memory": {"used": memory.used, "total": memory.total, "percent": memory.percent},
+            "disk": {"used": disk.used, "total": disk.total, "percent": round(disk.used / disk.total * 100, 1)},
+            "temperature": read_temperature(),
+            "workers": self._sample_workers(),
+        }
+        if self.on_sample is not None:
+            self.on_sample(self._snapshot)
+        return self._snapshot
@@ -1,8 +1,16 @@
+import atexit
 import logging
+import multiprocessing
+import os
+import queue
+import signal
+from logging.handlers import QueueHandler
 from rich.logging import RichHandler
 from rich.console import Console
 from rich.style import Style
 
+from utils.log_store import LOG_DIR, STARTUP_NAME, Log_Follower, Log_Store_Handler
+
 # Define SUCCESS level between INFO and WARNING
 SUCCESS_LEVEL_NUM = 25
 logging.addLevelName(SUCCESS_LEVEL_NUM, "SUCCESS")
@@ -13,21 +21,52 @@ def success(self, message, *args, **kwargs):
 
 logging.Logger.success = success
 
-def setup_logger(name: str, logger_path: str = './logs.txt') -> logging.Logger:
-    logger = logging.getLogger(name)
-    logger.setLevel(logging.DEBUG)
+LOG_QUEUE_SIZE = 10000  # Records waiting for the listener, past this new records are dropped
+LOG_QUEUE_RESERVE = 1000  # Slots only WARNING and above may use, so a flood of debug lines can't push out errors
+LOG_BATCH = 500  # Records written per log store flush
+
+# ----------------------------------------
+# Handlers
+# ----------------------------------------
+class PIDRichHandler(RichHandler):
+    def emit(self, record):
+        message = record.getMessage()
+        record.message = f"[{record.process}]{message}"
+        record.msg = record.message
+        record.args = ()
+        super().emit(record)
+
+
+class Queue_Handler(QueueHandler):
+    """Hands records to the log listener without ever blocking the caller.
+
+    If the queue is full the record is dropped and counted, and a warning with
+    the count goes out ahead of the next record that fits. Records below WARNING
+    are dropped early, the last LOG_QUEUE_RESERVE slots are kept for the rest.
+    """
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
 
-    formatter = logging.Formatter('[%(process)d] %(message)s')
-    fh = logging.FileHandler(logger_path)
-    fh.setFormatter(formatter)
+    def enqueue(self, record):
+        if record.levelno < logging.WARNING and self.queue.qsize() >= LOG_QUEUE_SIZE - LOG_QUEUE_RESERVE:
+            self.dropped += 1
+            return
+        try:
+            if self.dropped:
+                self.queue.put_nowait(logging.makeLogRecord({
+                    "name": record.name, "levelno": logging.WARNING, "levelname": "WARNING",
+                    "msg": f"Log queue full, dropped {self.dropped} records.",
+                }))
+                self.dropped = 0
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
 
-    class PIDRichHandler(RichHandler):
-        def emit(self, record):
-            message = record.getMessage()
-            record.message = f"[{record.process}]{message}"
-            record.msg = record.message
-            record.args = ()
-            super().emit(record)
+
+def _build_handlers(log_dir):
+    # JSON lines, rotated and indexed by utils/log_store.py
+    fh = Log_Store_Handler(log_dir)
 
     ch = PIDRichHandler(
         markup=True,
@@ -36,9 +75,109 @@ def setup_logger(name: str, logger_path: str = './logs.txt') -> logging.Logger:
         show_path=True,
         log_time_format="[%H:%M:%S]"
     )
+    return fh, ch
+
+# ----------------------------------------
+# Log Listener
+# ----------------------------------------
+def _copy_startup_log(startup, store):
+    lines = startup.poll()
+    if lines:
+        for line in lines:
+            store.append_line(line)
+        store.flush()
+
+
+def _listen(log_queue, log_dir):
+    """Listener process: the only writer of the log store and the console"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C stops the device, the listener drains until told to stop
+    handlers = _build_handlers(log_dir)
+    startup = Log_Follower(os.path.join(log_dir, STARTUP_NAME))  # startup.py's records, it already printed them
+    parent = os.getppid()
+    running = True
+    while running:
+        _copy_startup_log(startup, handlers[0])
+        try:
+            batch = [log_queue.get(timeout=1.0)]
+        except queue.Empty:
+            if os.getppid() != parent:
+                break  # The main process died without stopping us
+            continue
+        while len(batch) < LOG_BATCH:
+            try:
+                batch.append(log_queue.get_nowait())
+            except queue.Empty:
+                break
+        for record in batch:
+            if record is None:
+                running = False
+                continue
+            for handler in handlers:
+                handler.handle(record)
+        handlers[0].flush()
+    _copy_startup_log(startup, handlers[0])
+    for handler in handlers:
+        handler.close()
+
+
+class Log_Listener:
+    """Owns the record queue and the listener process for one log directory.
+
+    Started by the first setup_logger call, which makes it the listener of every
+    process forked afterwards; spawn and forkserver ones get the queue in their Worker_Context.
+    Stopped at exit of the process that started it.
+    """
+    def __init__(self, log_dir):
+        self.queue = multiprocessing.Queue(LOG_QUEUE_SIZE)
+        self.process = multiprocessing.Process(target=_listen, args=(self.queue, log_dir),
+                                               name="Log_Listener", daemon=True)
+        self.owner = os.getpid()
+
+    def start(self):
+        self.process.start()
+        atexit.register(self.stop)
+
+    def stop(self, timeout=5.0):
+        """Flush what is queued and stop the listener, only from the process that started it"""
+        if os.getpid() != self.owner:
+            return
+        if self.process.is_alive():
+            self.queue.put(None)
+            self.process.join(timeout)
+        if self.process.is_alive() or self.process.exitcode:
+            self.queue.cancel_join_thread()  # Nobody is reading, don't hang at exit on a full pipe
+
+
+_listeners = {}  # log_dir -> Log_Listener
+
+
+def get_log_listener(log_dir=LOG_DIR):
+    listener = _listeners.get(log_dir)
+    if listener is None:
+        listener = _listeners[log_dir] = Log_Listener(log_dir)
+        listener.start()
+    return listener
+
+
+def use_log_queue(log_queue):
+    """Send every record of this process to a listener started elsewhere.
+
+    For spawn and forkserver workers: their loggers start without handlers, so one
+    Queue_Handler on the root logger catches everything they propagate.
+    """
+    root = logging.getLogger()
+    if not any(isinstance(h, Queue_Handler) for h in root.handlers):
+        root.addHandler(Queue_Handler(log_queue))
+    root.setLevel(logging.DEBUG)
+
+
+def setup_logger(name: str, log_dir: str = LOG_DIR) -> logging.Logger:
+    logger = logging.getLogger(name)
+    logger.setLevel(logging.DEBUG)
 
-    if not logger.handlers:
-        logger.addHandler(fh)
-        logger.addHandler(ch)
+    # Only the main process starts a listener. A forked worker inherits it, a spawn or forkserver
+    # one logs through the root logger once its context arrives (use_log_queue).
+    if not logger.handlers and (log_dir in _listeners or multiprocessing.current_process().name == "MainProcess"):
+        logger.addHandler(Queue_Handler(get_log_listener(log_dir).queue))
 
     return logger